@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Batch insight generation for many users
+Users whose requests canonicalise to the same cache key share one generation;
+the unique generations run highest priority first on a few worker threads
+(no more than the Ollama client has slots, so a batch queues on its own
+threads instead of timing out in the client's queue). Results are yielded as
+each user's insights finish, followed by a throughput report.
+
+    python batch_insights.py users.json --parallelism 2 > results.ndjson
+
+users.json is a list (or {"users": [...]}) of
+{"userId": ..., "kind": "insights" | "investment", "priority": 0, "data": {...}}
+where data is the body the single-user endpoint takes.
+"""
+
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from llm_service import FinancialInsightsAI
+
+KINDS = ('insights', 'investment')
+
+class _Job:
+    """One unique generation and the users waiting on it"""
+
+    def __init__(self, kind: str, key_inputs: Dict[str, Any], prompt: str, priority: float, order: int):
+        self.kind = kind
+        self.key_inputs = key_inputs
+        self.prompt = prompt
+        self.priority = priority
+        self.order = order
+        self.user_ids: List[Any] = []
+
+def run_batch(ai: FinancialInsightsAI, users: List[Dict[str, Any]],
+              parallelism: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Generate insights for every user, yielding events as they complete:
+      {"type": "result", "userId", "kind", "insights", "cached", "fallback", "deduplicated", "seconds"}
+      {"type": "error", "userId", "error"}   for an entry that can't be generated
+      {"type": "report", ...}   last, with users/min and tokens/s
+    Stopping iteration early stops scheduling new generations."""
+    start = time.perf_counter()
+    tokens_before = ai.client.stats()['generatedTokens']
+    max_parallelism = ai.client.max_concurrency
+    parallelism = max(1, min(parallelism or max_parallelism, max_parallelism))
+
+    jobs: Dict[str, _Job] = {}
+    errors = 0
+    for order, user in enumerate(users):
+        user_id = user.get('userId', order) if isinstance(user, dict) else order
+        kind = user.get('kind', 'insights') if isinstance(user, dict) else None
+        data = user.get('data') if isinstance(user, dict) else None
+        if kind not in KINDS or not isinstance(data, dict) or not data:
+            errors += 1
+            yield {'type': 'error', 'userId': user_id,
+                   'error': f"Unknown kind: {kind}" if kind not in KINDS else "No data provided"}
+            continue
+        key, key_inputs, prompt = ai.request_key(kind, data)
+        priority = float(user.get('priority', 0) or 0)
+        job = jobs.get(key)
+        if job is None:
+            job = jobs[key] = _Job(kind, key_inputs, prompt, priority, order)
+        job.priority = max(job.priority, priority)
+        job.user_ids.append(user_id)
+
+    pending: queue.PriorityQueue = queue.PriorityQueue()
+    for job in jobs.values():
+        pending.put((-job.priority, job.order, job))
+    results: queue.Queue = queue.Queue()
+    stop = threading.Event()
+
+    def worker():
+        while not stop.is_set():
+            try:
+                _, _, job = pending.get_nowait()
+            except queue.Empty:
+                return
+            job_start = time.perf_counter()
+            try:
+                outcome = ai.generate_checked(job.kind, job.key_inputs, job.prompt)
+            except Exception as e:
+                outcome = e
+            results.put((job, outcome, time.perf_counter() - job_start))
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(min(parallelism, len(jobs)))]
+    for thread in threads:
+        thread.start()
+
+    completed = cached = fallbacks = 0
+    try:
+        for _ in range(len(jobs)):
+            job, outcome, seconds = results.get()
+            if isinstance(outcome, Exception):
+                errors += len(job.user_ids)
+                for user_id in job.user_ids:
+                    yield {'type': 'error', 'userId': user_id, 'error': str(outcome)}
+                continue
+            insights, ok, shared = outcome
+            completed += len(job.user_ids)
+            cached += len(job.user_ids) if shared else 0
+            fallbacks += 0 if ok else len(job.user_ids)
+            for position, user_id in enumerate(job.user_ids):
+                yield {'type': 'result', 'userId': user_id, 'kind': job.kind, 'insights': insights,
+                       'cached': shared, 'fallback': not ok, 'deduplicated': position > 0,
+                       'seconds': round(seconds, 3)}
+    finally:
+        stop.set()
+
+    elapsed = time.perf_counter() - start
+    # Tokens counted by the shared client, so concurrent traffic outside the
+    # batch is included
+    tokens = ai.client.stats()['generatedTokens'] - tokens_before
+    yield {
+        'type': 'report',
+        'users': len(users),
+        'completed': completed,
+        'errors': errors,
+        'generations': len(jobs),
+        'deduplicated': sum(len(job.user_ids) - 1 for job in jobs.values()),
+        'cached': cached,
+        'fallbacks': fallbacks,
+        'parallelism': parallelism,
+        'seconds': round(elapsed, 3),
+        'usersPerMinute': round(completed / elapsed * 60, 1) if elapsed else 0.0,
+        'tokens': tokens,
+        'tokensPerSecond': round(tokens / elapsed, 1) if elapsed else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute insights for many users")
+    parser.add_argument('users', help="JSON file with a list of users (- for stdin)")
+    parser.add_argument('--parallelism', type=int, help="Generations at once (default and cap: --max-concurrency)")
+    parser.add_argument('--max-concurrency', type=int, default=int(os.environ.get('OLLAMA_MAX_CONCURRENCY', 2)),
+                        help="Generations Ollama serves at once")
+    parser.add_argument('--ollama-url', default=os.environ.get('OLLAMA_URL', 'http://localhost:11434'))
+    args = parser.parse_args()
+
+    from ollama_client import OllamaClient
+
+    with (sys.stdin if args.users == '-' else open(args.users)) as f:
+        users = json.load(f)
+    if isinstance(users, dict):
+        users = users.get('users', [])
+
+    client = OllamaClient(args.ollama_url, max_concurrency=args.max_concurrency)
+    ai = FinancialInsightsAI(ollama_url=args.ollama_url, client=client)
+    for event in run_batch(ai, users, args.parallelism):
+        if event['type'] == 'report':
+            report = event
+        else:
+            print(json.dumps(event), flush=True)
+
+    print(f"{report['completed']}/{report['users']} users in {report['seconds']:.1f}s "
+          f"({report['generations']} generations, {report['deduplicated']} deduplicated, "
+          f"{report['fallbacks']} fallbacks, {report['errors']} errors): "
+          f"{report['usersPerMinute']:.1f} users/min, {report['tokensPerSecond']:.1f} tokens/s",
+          file=sys.stderr)
+    sys.exit(1 if report['errors'] or report['fallbacks'] else 0)
+
+if __name__ == "__main__":
+    main()
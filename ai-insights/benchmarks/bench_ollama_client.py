@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pooled, concurrency-limited Ollama client vs a bare requests.post per call
+Runs both against the stub Ollama server (a fixed number of generation
+slots, optional 503s) from many threads and reports throughput, failed
+generations, TCP connections opened, and the client's queue vs generation time.
+Usage: python benchmarks/bench_ollama_client.py [--requests 60] [--threads 12] [--failure-rate 0.05]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ollama_client import OllamaClient
+from stub_ollama import start_stub
+
+PAYLOAD = {'model': 'llama3.2:3b', 'prompt': 'benchmark', 'stream': False}
+
+def run(label, stub, call, count, threads):
+    stub.connections = stub.requests = 0
+    failures = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        for ok in pool.map(lambda _: call(), range(count)):
+            failures += not ok
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8} {count / elapsed:6.2f} req/s  {failures:3d} failed  "
+          f"{stub.requests:3d} HTTP requests over {stub.connections:3d} connections")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared Ollama client against a stub")
+    parser.add_argument('--requests', type=int, default=60)
+    parser.add_argument('--threads', type=int, default=12)
+    parser.add_argument('--slots', type=int, default=2, help="Generations the stub serves at once")
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--tokens-per-second', type=float, default=2000)
+    parser.add_argument('--failure-rate', type=float, default=0.05)
+    args = parser.parse_args()
+
+    stub = start_stub(latency=args.latency, tokens_per_second=args.tokens_per_second, slots=args.slots,
+                      failure_rate=args.failure_rate)
+    url = f"http://127.0.0.1:{stub.server_address[1]}"
+
+    def bare():
+        try:
+            response = requests.post(f"{url}/api/generate", json=PAYLOAD, timeout=60)
+            return response.status_code == 200
+        except requests.RequestException:
+            return False
+
+    client = OllamaClient(url, max_concurrency=args.slots, backoff_seconds=0.05)
+
+    def pooled():
+        try:
+            client.generate(PAYLOAD)
+            return True
+        except Exception:
+            return False
+
+    print(f"{args.requests} generations from {args.threads} threads; stub: {args.slots} slots, "
+          f"{args.latency}s latency, {args.failure_rate:.0%} 503s")
+    run('bare', stub, bare, args.requests, args.threads)
+    run('pooled', stub, pooled, args.requests, args.threads)
+
+    stats = client.stats()
+    for name in ('queueSeconds', 'generationSeconds'):
+        timing = stats[name]
+        print(f"  {name:<18} p50 {timing['p50']:.3f}s  p95 {timing['p95']:.3f}s  p99 {timing['p99']:.3f}s")
+    print(f"  retried {stats['retried']}, failed {stats['failed']}, rejected {stats['rejected']}")
+
+if __name__ == "__main__":
+    main()
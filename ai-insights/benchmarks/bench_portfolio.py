@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark: portfolio analytics on large portfolios
+Times the previous approach (sort every holding to take the best and worst)
+against portfolio_analytics, which also computes concentration and
+day-change attribution, on synthetic portfolios. "array build" is the part of
+the analytics spent converting the holdings' dicts to an array; the rest is
+the vectorized pass. "prompt build" is the whole investment prompt.
+Usage: python benchmarks/bench_portfolio.py [--sizes 10000 100000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_service import FinancialInsightsAI
+from portfolio_analytics import _holding_array, portfolio_analytics
+
+def synthetic_portfolio(size: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    holdings = []
+    for i in range(size):
+        shares = rng.randint(1, 500)
+        price = rng.uniform(1, 900)
+        cost = price / (1 + rng.uniform(-0.6, 1.5))
+        day_change = price * rng.uniform(-0.05, 0.05)
+        holdings.append({
+            'symbol': f"S{i:06d}", 'shares': shares, 'averageCost': cost, 'currentPrice': price,
+            'dayChange': day_change, 'dayChangePercent': day_change / (price - day_change) * 100,
+            'totalValue': shares * price, 'totalGainLoss': (price - cost) * shares,
+            'totalGainLossPercent': (price - cost) / cost * 100
+        })
+    return holdings
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+def sort_best_worst(investments):
+    ordered = sorted(investments, key=lambda x: x.get('totalGainLossPercent', 0), reverse=True)
+    return ordered[0], ordered[-1], investments[:5]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized portfolio analytics")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    ai = FinancialInsightsAI()
+    print(f"{'positions':>10} {'sort best/worst':>16} {'analytics':>10} {'array build':>12} {'prompt build':>13}"
+          f"   (best of {args.repeat}, ms)")
+    for size in args.sizes:
+        investments = synthetic_portfolio(size)
+        request = {'investments': investments, 'portfolioSummary': {'investmentCount': size}}
+        print(f"{size:>10} {best_of(lambda: sort_best_worst(investments), args.repeat):>16.2f} "
+              f"{best_of(lambda: portfolio_analytics(investments), args.repeat):>10.2f} "
+              f"{best_of(lambda: _holding_array(investments), args.repeat):>12.2f} "
+              f"{best_of(lambda: ai._investment_request(request), args.repeat):>13.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: shared system-prompt prefix vs instructions mixed with the data
+"Before" embeds each user's data between the instructions and the response
+schema in one prompt, as the original prompt builder did, so Ollama can only
+reuse the opening sentence from its prompt cache. "After" sends the fixed
+system prompt plus the compact data message, after one warm-up. Reports
+prompt tokens evaluated, prompt-eval time and total latency per request.
+By default runs against the stub (whose prompt evaluation costs
+--prompt-tokens-per-second per uncached token); pass --url for a real Ollama.
+Usage: python benchmarks/bench_prompt.py [--users 20] [--url http://localhost:11434]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_service import FinancialInsightsAI, SYSTEM_PROMPTS
+from ollama_client import OllamaClient
+
+CATEGORIES = ['Food & Dining', 'Rent', 'Entertainment', 'Transportation', 'Shopping', 'Utilities']
+MERCHANTS = ['Starbucks', 'Chipotle', 'Uber', 'Amazon', 'Target', 'Netflix']
+
+def sample_user(rng: random.Random) -> dict:
+    spending = [{'category': c, 'amount': round(rng.uniform(20, 900), 2)} for c in CATEGORIES]
+    total = sum(c['amount'] for c in spending)
+    income = round(total * rng.uniform(0.8, 1.4), 2)
+    return {
+        'totalIncome': income, 'totalSpending': total, 'netFlow': income - total,
+        'currentBalance': round(rng.uniform(0, 5000), 2),
+        'spendingByCategory': spending,
+        'topMerchants': [{'merchant': m, 'totalAmount': round(rng.uniform(10, 200), 2), 'count': rng.randint(1, 12)}
+                         for m in rng.sample(MERCHANTS, 3)],
+        'goals': [{'title': 'Emergency fund', 'currentAmount': rng.randint(0, 900), 'targetAmount': 1000}],
+        'monthlyTrend': [{'amount': round(total * rng.uniform(0.8, 1.2), 2)}, {'amount': total}]
+    }
+
+def legacy_request(ai: FinancialInsightsAI, data_message: str) -> dict:
+    """One prompt with the data between the instructions and the schema"""
+    intro, rest = SYSTEM_PROMPTS['insights'].split('\n\n', 1)
+    request = ai._ollama_request(f"{intro}\n\n{data_message}\n\n{rest}", False)
+    del request['system']
+    return request
+
+def run(label, client, requests_):
+    prompt_tokens, prompt_seconds, totals = [], [], []
+    for request in requests_:
+        start = time.perf_counter()
+        result = client.generate(request)
+        totals.append(time.perf_counter() - start)
+        prompt_tokens.append(result.get('prompt_eval_count', 0))
+        prompt_seconds.append(result.get('prompt_eval_duration', 0) / 1e9)
+    print(f"{label:<7} prompt tokens {statistics.mean(prompt_tokens):7.1f}  "
+          f"prompt eval {statistics.mean(prompt_seconds) * 1000:7.1f} ms  "
+          f"total p50 {statistics.median(totals) * 1000:7.1f} ms  max {max(totals) * 1000:7.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prompt prefix reuse")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--url', help="Ollama URL (default: start a stub)")
+    parser.add_argument('--prompt-tokens-per-second', type=float, default=400,
+                        help="Stub prompt evaluation speed")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    url = args.url
+    if url is None:
+        from stub_ollama import start_stub
+        stub = start_stub(latency=0.02, tokens_per_second=0, slots=1,
+                          prompt_tokens_per_second=args.prompt_tokens_per_second)
+        url = f"http://127.0.0.1:{stub.server_address[1]}"
+
+    client = OllamaClient(url, max_concurrency=1)
+    ai = FinancialInsightsAI(ollama_url=url, client=client)
+    rng = random.Random(args.seed)
+    messages = [ai._insights_request(sample_user(rng))[1] for _ in range(args.users)]
+
+    print(f"{args.users} users, one at a time against {url}")
+    run('before', client, [legacy_request(ai, message) for message in messages])
+    ai.warm_up(['insights'])
+    run('after', client, [ai._ollama_request(message, False) for message in messages])
+
+if __name__ == "__main__":
+    main()
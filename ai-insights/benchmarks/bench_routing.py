@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark: deadline-aware routing vs always waiting for the LLM
+Sends distinct users' insight requests from several threads to a stub Ollama
+with injected latency, first with no budget (every request waits for the
+model) and then with a latency budget (requests the model can't answer in
+time get the local analytic insights). Reports p50/p99 latency and where
+the insights came from.
+Usage: python benchmarks/bench_routing.py [--requests 40] [--budget-ms 2500] [--latency 0.8 --jitter 1.5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_prompt import sample_user
+from llm_service import FinancialInsightsAI
+from ollama_client import OllamaClient
+from stub_ollama import start_stub
+
+def quantile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def run(label, ai, users, threads, budget):
+    def one(user):
+        start = time.perf_counter()
+        source = ai.route_insights(user, budget)['source']
+        return time.perf_counter() - start, source
+
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(one, users))
+    latencies = [seconds for seconds, _ in results]
+    sources = Counter(source for _, source in results)
+    print(f"{label:<14} p50 {quantile(latencies, 0.5) * 1000:7.1f} ms  p99 {quantile(latencies, 0.99) * 1000:7.1f} ms  "
+          + "  ".join(f"{source} {count}" for source, count in sorted(sources.items())))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark deadline-aware insights routing")
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--budget-ms', type=float, default=2500)
+    parser.add_argument('--latency', type=float, default=0.8, help="Stub seconds per generation")
+    parser.add_argument('--jitter', type=float, default=1.5, help="Extra random stub latency, up to this many seconds")
+    parser.add_argument('--slots', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    stub = start_stub(latency=args.latency, latency_jitter=args.jitter, tokens_per_second=0, slots=args.slots)
+    url = f"http://127.0.0.1:{stub.server_address[1]}"
+    rng = random.Random(args.seed)
+    users = [sample_user(rng) for _ in range(args.requests)]
+
+    print(f"{args.requests} users from {args.threads} threads; stub {args.latency}s + up to {args.jitter}s, "
+          f"{args.slots} slots")
+    # Fresh service per run, no cache, so both runs start without latency history
+    for label, budget in (('no budget', None), (f'{args.budget_ms:.0f} ms budget', args.budget_ms / 1000)):
+        client = OllamaClient(url, max_concurrency=args.slots, queue_timeout=120)
+        run(label, FinancialInsightsAI(ollama_url=url, client=client), users, args.threads, budget)
+
+if __name__ == "__main__":
+    main()
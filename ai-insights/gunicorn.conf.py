@@ -0,0 +1,38 @@
+"""
+Gunicorn configuration for the AI insights service
+Usage: gunicorn -c gunicorn.conf.py server:app
+
+The app is imported once in the master (preload_app), so Flask, requests and
+the FinancialInsightsAI instance are set up before workers are forked.
+"""
+
+import multiprocessing
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5001)}"
+
+# Requests mostly wait on Ollama, so a few processes with several threads
+# each; Ollama itself only runs a handful of generations at a time
+workers = int(os.environ.get('WEB_CONCURRENCY', min(4, multiprocessing.cpu_count())))
+threads = int(os.environ.get('WEB_THREADS', 8))
+worker_class = 'gthread'
+preload_app = True
+
+# Generations can take up to the 60 s Ollama timeout
+timeout = int(os.environ.get('WEB_TIMEOUT', 90))
+graceful_timeout = 30
+keepalive = 5
+
+# OLLAMA_MAX_CONCURRENCY is a cap across all workers, not per worker: each
+# generation holds one of that many lock files in this shared directory
+os.environ.setdefault('OLLAMA_SLOTS_DIR', os.path.join(tempfile.gettempdir(), 'ai-insights-ollama-slots'))
+
+accesslog = '-'
+errorlog = '-'
+
+def post_worker_init(worker):
+    # After the fork, so the warm-up request doesn't leave pooled connections
+    # shared between workers
+    from server import warm_up_in_background
+    warm_up_in_background()
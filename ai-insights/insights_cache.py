@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Insights response cache with request coalescing
+Generated insights are cached under a hash of the canonicalised prompt inputs
+(amounts rounded, so cents-level changes reuse an answer) with a TTL and LRU
+eviction. Concurrent requests for the same key share one in-flight LLM call.
+The cache is per process; under gunicorn each worker keeps its own.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+def canonical_key(kind: str, inputs: Any, amount_step: float = 1.0) -> str:
+    """Stable hash of prompt inputs, with every number rounded to amount_step"""
+    def canonical(value):
+        if isinstance(value, bool) or value is None or isinstance(value, str):
+            return value
+        if isinstance(value, (int, float)):
+            return round(round(float(value) / amount_step) * amount_step, 6)
+        if isinstance(value, dict):
+            return {str(k): canonical(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [canonical(v) for v in value]
+        return str(value)
+
+    payload = json.dumps([kind, canonical(inputs)], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class _Flight:
+    """One in-progress generation that identical requests wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.cacheable = False
+        self.seconds = 0.0
+
+class InsightsCache:
+    """TTL + LRU cache of generated insights with single-flight coalescing"""
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # key -> (value, expires_at, seconds the LLM took to produce it)
+        self.entries: OrderedDict = OrderedDict()
+        self.inflight: Dict[str, _Flight] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.llm_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def get_or_compute(self, key: str, compute: Callable[[], Tuple[Any, bool]]) -> Any:
+        """Cached value for key, or compute() -> (value, cacheable); callers that
+        arrive while the same key is being computed wait for that result"""
+        return self.fetch(key, compute)[0]
+
+    def fetch(self, key: str, compute: Callable[[], Tuple[Any, bool]],
+              wait_seconds: Optional[float] = None) -> Tuple[Any, bool, bool]:
+        """get_or_compute() that also reports (value, cacheable, shared): shared
+        is True when the value came from the cache or another caller's generation.
+        Waiting on another caller's generation raises TimeoutError after wait_seconds"""
+        with self.lock:
+            entry = self._fresh(key)
+            if entry is not None:
+                return entry[0], True, True
+            flight = self.inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.inflight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not flight.done.wait(wait_seconds):
+                raise TimeoutError(f"identical generation still running after {wait_seconds:.1f}s")
+            if flight.error is not None:
+                raise flight.error
+            with self.lock:
+                self.saved_seconds += flight.seconds
+            return flight.value, flight.cacheable, True
+
+        start = time.perf_counter()
+        try:
+            value, cacheable = compute()
+        except BaseException as e:
+            flight.error = e
+            with self.lock:
+                del self.inflight[key]
+            flight.done.set()
+            raise
+        flight.value = value
+        flight.cacheable = cacheable
+        flight.seconds = time.perf_counter() - start
+        with self.lock:
+            self._put(key, value, flight.seconds, cacheable)
+            del self.inflight[key]
+        flight.done.set()
+        return value, cacheable, False
+
+    def lookup(self, key: str) -> Optional[Any]:
+        """Cached value for key or None (a miss), for callers that generate the
+        value themselves and hand it to store()"""
+        with self.lock:
+            entry = self._fresh(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            return entry[0]
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Cached value for key or None, without counting a miss"""
+        with self.lock:
+            entry = self._fresh(key)
+            return entry[0] if entry is not None else None
+
+    def store(self, key: str, value: Any, seconds: float, cacheable: bool = True):
+        """Record a generation that took `seconds`, caching its value if cacheable"""
+        with self.lock:
+            self._put(key, value, seconds, cacheable)
+
+    def _fresh(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        """Unexpired entry for key, counted as a hit (lock held)"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self.entries[key]
+            self.expirations += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        self.saved_seconds += entry[2]
+        return entry
+
+    def _put(self, key: str, value: Any, seconds: float, cacheable: bool):
+        """Account for a generation and cache its value (lock held)"""
+        self.llm_seconds += seconds
+        if cacheable and self.ttl_seconds > 0:
+            self.entries[key] = (value, time.monotonic() + self.ttl_seconds, seconds)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            requests = self.hits + self.coalesced + self.misses
+            return {
+                'entries': len(self.entries),
+                'maxEntries': self.max_entries,
+                'ttlSeconds': self.ttl_seconds,
+                'hits': self.hits,
+                'coalesced': self.coalesced,
+                'misses': self.misses,
+                'hitRate': (self.hits + self.coalesced) / requests if requests else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'inflight': len(self.inflight),
+                'llmSeconds': self.llm_seconds,
+                'savedLlmSeconds': self.saved_seconds
+            }
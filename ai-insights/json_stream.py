@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Incremental JSON parsing for streamed LLM output
+Fed the model's text as it arrives, IncrementalJSONParser reports each member
+of the top-level JSON object as soon as its value is complete, and each
+element of an array member as soon as that element is complete, without
+waiting for the rest of the object. Text before the opening brace is ignored.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+WHITESPACE = ' \t\r\n'
+
+# Returned by _load for text that isn't valid JSON (None is a valid value)
+_INVALID = object()
+
+# A comma before a closing bracket, which models often leave in
+_TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+
+class IncrementalJSONParser:
+    """Single-pass scanner over one top-level JSON object
+
+    feed() returns the events completed by the new text:
+      {"type": "section", "section": key, "data": value}   non-array members
+      {"type": "item", "section": key, "index": n, "data": value}   array elements
+    Trailing commas are tolerated and pieces that still fail to parse are skipped. `result` holds everything parsed so
+    far (array members as the list of their parsed elements) and `complete` is
+    set once the closing brace arrives.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.pos = 0
+        self.started = False
+        self.complete = False
+        self.result: Dict[str, Any] = {}
+        # Open containers ('{' or '['); the top-level object is stack[0]
+        self.stack: List[str] = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        # Top-level member being read: 'key', 'colon', 'value' (awaiting one),
+        # 'in_value' (reading one) or 'comma'
+        self.expect = 'key'
+        self.key: Optional[str] = None
+        self.value_start = 0
+        # Elements of a top-level array member
+        self.item_start: Optional[int] = None
+        self.item_index = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        events: List[Dict[str, Any]] = []
+        self.text += chunk
+        text = self.text
+        while self.pos < len(text) and not self.complete:
+            i = self.pos
+            char = text[i]
+            self.pos += 1
+
+            if not self.started:
+                if char == '{':
+                    self.started = True
+                    self.stack.append('{')
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    self._string_closed(i, events)
+                continue
+
+            depth = len(self.stack)
+            if depth == 1:
+                self._top_level(char, i, events)
+            elif depth == 2 and self.stack[1] == '[' and char not in WHITESPACE:
+                self._array_level(char, i, events)
+            elif char == '"':
+                self._open_string(i)
+            elif char in '{[':
+                self.stack.append(char)
+            elif char in '}]':
+                self._close(i, events)
+        return events
+
+    def _open_string(self, i: int):
+        self.in_string = True
+        self.string_start = i
+
+    def _string_closed(self, i: int, events: List[Dict[str, Any]]):
+        depth = len(self.stack)
+        if depth == 1 and self.expect == 'key':
+            key = self._load(self.text[self.string_start:i + 1])
+            self.key = None if key is _INVALID else key
+            self.expect = 'colon'
+        elif depth == 1 and self.expect == 'in_value':
+            self._emit_section(self.text[self.value_start:i + 1], events)
+        elif depth == 2 and self.stack[1] == '[' and self.item_start == self.string_start:
+            self._emit_item(self.text[self.item_start:i + 1], events)
+
+    def _top_level(self, char: str, i: int, events: List[Dict[str, Any]]):
+        if self.expect == 'in_value':
+            # Scalar member (number, true, false, null) ends at ',' or '}'
+            if char in ',}':
+                self._emit_section(self.text[self.value_start:i], events)
+                self.expect = 'key'
+                if char == '}':
+                    self._finish()
+            return
+        if char in WHITESPACE:
+            return
+        if char == '"':
+            self._open_string(i)
+            if self.expect == 'value':
+                self.value_start = i
+                self.expect = 'in_value'
+        elif char == ':' and self.expect == 'colon':
+            self.expect = 'value'
+        elif char == ',':
+            self.expect = 'key'
+        elif char == '}':
+            self._finish()
+        elif self.expect == 'value':
+            self.value_start = i
+            self.expect = 'in_value'
+            if char in '{[':
+                self.stack.append(char)
+                if char == '[':
+                    self.item_start = None
+                    self.item_index = 0
+                    if self.key is not None:
+                        self.result[self.key] = []
+
+    def _array_level(self, char: str, i: int, events: List[Dict[str, Any]]):
+        """Next non-whitespace character directly inside a top-level array member"""
+        if char in ',]':
+            if self.item_start is not None:
+                # Scalar element ends here
+                self._emit_item(self.text[self.item_start:i], events)
+            if char == ']':
+                self.stack.pop()
+                self.expect = 'comma'
+            return
+        if self.item_start is None:
+            self.item_start = i
+        if char == '"':
+            self._open_string(i)
+        elif char in '{[':
+            self.stack.append(char)
+
+    def _close(self, i: int, events: List[Dict[str, Any]]):
+        self.stack.pop()
+        depth = len(self.stack)
+        if depth == 1:
+            self._emit_section(self.text[self.value_start:i + 1], events)
+        elif depth == 2 and self.stack[1] == '[' and self.item_start is not None:
+            self._emit_item(self.text[self.item_start:i + 1], events)
+
+    def _emit_section(self, raw: str, events: List[Dict[str, Any]]):
+        self.expect = 'comma'
+        value = self._load(raw)
+        if value is not _INVALID and self.key is not None:
+            self.result[self.key] = value
+            events.append({'type': 'section', 'section': self.key, 'data': value})
+
+    def _emit_item(self, raw: str, events: List[Dict[str, Any]]):
+        self.item_start = None
+        value = self._load(raw)
+        if value is not _INVALID and self.key is not None:
+            self.result[self.key].append(value)
+            events.append({'type': 'item', 'section': self.key, 'index': self.item_index, 'data': value})
+            self.item_index += 1
+
+    def _finish(self):
+        self.stack.pop()
+        self.complete = True
+
+    @staticmethod
+    def _load(raw: str) -> Any:
+        try:
+            return json.loads(raw)
+        except ValueError:
+            pass
+        repaired = _TRAILING_COMMA.sub(r'\1', raw)
+        if repaired == raw:
+            return _INVALID
+        try:
+            return json.loads(repaired)
+        except ValueError:
+            return _INVALID
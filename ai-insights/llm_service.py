@@ -5,17 +5,234 @@ Generates personalized financial insights with humor and actionable advice
 """
 
 import json
-import requests
 import sys
-from typing import Dict, List, Any
+import time
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+
+from insights_cache import InsightsCache, canonical_key
+from json_stream import IncrementalJSONParser
+from ollama_client import OllamaBusy, OllamaClient
+from portfolio_analytics import portfolio_analytics
+from spending_analytics import analytic_insights, spending_analytics
+from structured_output import OutputStats, SCHEMAS, missing_sections, parse_insights, section_schema
+
+# Static instructions and response schema, sent as Ollama's system prompt so
+# every request starts with the same tokens and Ollama reuses their evaluation
+# from its cache; only the short data message after them is evaluated per request
+INSIGHTS_SYSTEM_PROMPT = """You are a fun, witty financial advisor for college students. Analyze the financial data you are given and provide insights with humor and actionable advice.
+
+Respond with insights in this JSON format:
+{
+  "spendingHighlights": {
+    "biggestExpense": "Funny comment about the biggest expense",
+    "overspendingAlert": "Witty alert about overspending (if applicable)",
+    "positiveReinforcement": "Encouraging message about good financial behavior"
+  },
+  "categoryInsights": [
+    {
+      "category": "Category name",
+      "insight": "Humorous insight about this category",
+      "suggestion": "Actionable tip to improve spending in this category"
+    }
+  ],
+  "predictions": [
+    {
+      "type": "goal_timeline",
+      "message": "Prediction about goal achievement timeline",
+      "actionable": "Specific step to improve timeline"
+    }
+  ],
+  "funFacts": [
+    "Humorous observation about spending patterns",
+    "Light-hearted comparison or joke"
+  ],
+  "actionableRecommendations": [
+    "Specific, realistic step 1",
+    "Specific, realistic step 2",
+    "Specific, realistic step 3"
+  ]
+}
+
+Keep it fun, relatable, and student-friendly. Use emojis sparingly. Make jokes about relatable college experiences. Be encouraging but honest about spending habits."""
+
+INVESTMENT_SYSTEM_PROMPT = """You are a fun, witty investment advisor for college students. Analyze the investment portfolio you are given and provide insights with humor and actionable advice.
+
+Respond with insights in this JSON format:
+{
+  "portfolioHighlights": {
+    "bestPerformer": "Witty comment about your best performing stock",
+    "worstPerformer": "Humorous observation about your worst performing stock",
+    "diversificationAlert": "Funny comment about portfolio diversification",
+    "riskAssessment": "Witty assessment of portfolio risk level"
+  },
+  "stockInsights": [
+    {
+      "symbol": "AAPL",
+      "insight": "Humorous insight about this specific stock",
+      "suggestion": "Actionable tip for this stock",
+      "performance": "Funny performance summary"
+    }
+  ],
+  "portfolioAnalysis": [
+    {
+      "type": "performance",
+      "message": "Witty analysis of overall portfolio performance",
+      "actionable": "Specific step to improve portfolio"
+    }
+  ],
+  "funFacts": [
+    "Humorous observation about the portfolio",
+    "Light-hearted comparison or joke about investing"
+  ],
+  "actionableRecommendations": [
+    {
+      "roast": "Funny roast about a specific investment decision",
+      "recommendation": "Specific, actionable advice",
+      "impact": "Expected impact of following the recommendation"
+    }
+  ]
+}
+
+Keep it fun, relatable, and student-friendly. Use emojis sparingly. Make jokes about relatable college investing experiences. Be encouraging but honest about investment decisions. Focus on education and building good investing habits."""
+
+SYSTEM_PROMPTS = {'insights': INSIGHTS_SYSTEM_PROMPT, 'investment': INVESTMENT_SYSTEM_PROMPT}
+
+# Rough characters per token, for the prompt token budget
+CHARS_PER_TOKEN = 4
+
+# Longest merchant, category or goal name put in a prompt
+NAME_CHARS = 40
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of text"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def _name(value: Any, default: str) -> str:
+    return str(value or default)[:NAME_CHARS]
 
 class FinancialInsightsAI:
-    def __init__(self, ollama_url: str = "http://localhost:11434"):
+    def __init__(self, ollama_url: str = "http://localhost:11434",
+                 cache: Optional[InsightsCache] = None, amount_step: float = 1.0,
+                 client: Optional[OllamaClient] = None, token_budget: int = 256,
+                 keep_alive: str = "30m", structured_output: bool = True, repair_attempts: int = 1,
+                 fast_model: Optional[str] = None):
         self.ollama_url = ollama_url
         self.model = "llama3.2:3b"
+        # Optional smaller model tried when a deadline is too tight for self.model
+        self.fast_model = fast_model
+        # Recent generation seconds per model (moving average), for deadline routing
+        self.latency_estimates: Dict[str, float] = {}
+        # Pooled, concurrency-limited connection to Ollama shared by all calls
+        self.client = client or OllamaClient(ollama_url)
+        # Optional response cache; amounts within amount_step of each other share an entry
+        self.cache = cache
+        self.amount_step = amount_step
+        # Most tokens a request's data message may take; lists are trimmed to fit
+        self.token_budget = token_budget
+        # How long Ollama keeps the model (and its cached prompt prefix) loaded
+        self.keep_alive = keep_alive
+        # Constrain output to each kind's JSON schema (Ollama 0.5+), and how
+        # many times to re-ask for sections a generation left out
+        self.structured_output = structured_output
+        self.repair_attempts = repair_attempts
+        self.output_stats = OutputStats()
     
     def generate_insights(self, financial_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate AI insights from financial data"""
+        return self._generate('insights', *self._insights_request(financial_data))
+    
+    def stream_insights(self, financial_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Generate AI insights as events, one per section as the model completes it"""
+        return self._stream('insights', *self._insights_request(financial_data))
+    
+    def generate_investment_insights(self, financial_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate AI insights for investment portfolio"""
+        return self._generate('investment', *self._investment_request(financial_data))
+    
+    def stream_investment_insights(self, financial_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Generate investment insights as events, one per completed section"""
+        return self._stream('investment', *self._investment_request(financial_data))
+    
+    def route_insights(self, financial_data: Dict[str, Any],
+                       budget_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Spending insights within a latency budget, as {"insights", "analytics",
+        "source", "model"}. The numbers are computed locally first; the LLM's
+        narrative is used if it is cached or the model (or the fast model) is
+        expected to answer in time, and the local insights are returned otherwise
+        or if the LLM misses the deadline. source is "cache", "llm" or "local"."""
+        deadline = time.monotonic() + budget_seconds if budget_seconds is not None else None
+        analytics = spending_analytics(financial_data)
+        key_inputs, prompt = self._insights_request(financial_data)
+        models = [self.model] + ([self.fast_model] if self.fast_model else [])
+        
+        def model_inputs(model):
+            return key_inputs if model == self.model else {**key_inputs, 'model': model}
+        
+        if self.cache is not None:
+            for model in models:
+                cached = self.cache.peek(canonical_key('insights', model_inputs(model), self.amount_step))
+                if cached is not None:
+                    return {'insights': cached, 'analytics': analytics, 'source': 'cache', 'model': model}
+        
+        for model in models:
+            if not self._fits(model, deadline):
+                continue
+            try:
+                insights, ok, shared = self.generate_checked('insights', model_inputs(model), prompt,
+                                                             model=model, deadline=deadline)
+            except TimeoutError:
+                break
+            if ok:
+                return {'insights': insights, 'analytics': analytics, 'source': 'cache' if shared else 'llm',
+                        'model': model}
+            break
+        
+        return {'insights': analytic_insights(analytics, financial_data), 'analytics': analytics,
+                'source': 'local', 'model': None}
+    
+    def _fits(self, model: str, deadline: Optional[float]) -> bool:
+        """Whether a generation on model is expected to finish before deadline,
+        counting the rounds of generations queued ahead of it"""
+        estimate = self.latency_estimates.get(model)
+        if deadline is None or estimate is None:
+            return True
+        ahead = self.client.load()
+        rounds = ahead // self.client.max_concurrency + 1
+        return rounds * estimate <= deadline - time.monotonic()
+    
+    def _observe_latency(self, model: str, seconds: float):
+        previous = self.latency_estimates.get(model)
+        self.latency_estimates[model] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+    
+    def request_key(self, kind: str, financial_data: Dict[str, Any]) -> Tuple[str, Dict[str, Any], str]:
+        """(cache key, key inputs, prompt) for a request of kind 'insights' or
+        'investment'; requests with equal keys get the same insights"""
+        if kind == 'insights':
+            key_inputs, prompt = self._insights_request(financial_data)
+        elif kind == 'investment':
+            key_inputs, prompt = self._investment_request(financial_data)
+        else:
+            raise ValueError(f"Unknown insights kind: {kind}")
+        return canonical_key(kind, key_inputs, self.amount_step), key_inputs, prompt
+    
+    def generate_checked(self, kind: str, key_inputs: Dict[str, Any], prompt: str,
+                         model: Optional[str] = None,
+                         deadline: Optional[float] = None) -> Tuple[Dict[str, Any], bool, bool]:
+        """Insights for a prepared request (see request_key) as (insights, ok,
+        shared): ok is False for fallback insights, shared is True when they came
+        from the cache or an identical in-flight request. With a deadline
+        (time.monotonic() value), waiting on an identical request raises
+        TimeoutError at the deadline"""
+        if self.cache is None:
+            insights, ok = self._call_ollama_checked(prompt, kind, model, deadline)
+            return insights, ok, False
+        key = canonical_key(kind, key_inputs, self.amount_step)
+        wait_seconds = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+        return self.cache.fetch(key, lambda: self._call_ollama_checked(prompt, kind, model, deadline),
+                                wait_seconds)
+    
+    def _insights_request(self, financial_data: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """Cache key inputs and prompt for spending insights"""
         
         # Extract key metrics
         total_income = financial_data.get('totalIncome', 0)
@@ -37,19 +254,29 @@ class FinancialInsightsAI:
         # Monthly trend
         monthly_trend = financial_data.get('monthlyTrend', [])
         
-        # Create the prompt
-        prompt = self._create_prompt(
-            total_income, total_spending, net_flow, current_balance,
-            top_categories, top_merchants, active_goals, monthly_trend
-        )
-        
-        # Generate insights using Ollama
-        insights = self._call_ollama(prompt)
+        # Create the prompt, dropping the least significant category, merchant or
+        # goal until it fits the token budget
+        active_goals = active_goals[:3]
+        while True:
+            prompt = self._create_prompt(
+                total_income, total_spending, net_flow, current_balance,
+                top_categories, top_merchants, active_goals, monthly_trend
+            )
+            if estimate_tokens(prompt) <= self.token_budget or not self._trim(top_merchants, active_goals, top_categories):
+                break
         
-        return insights
+        # Everything the prompt reads, for the cache key
+        key_inputs = {
+            'totals': [total_income, total_spending, net_flow, current_balance],
+            'categories': [[c.get('category'), c.get('amount', 0)] for c in top_categories],
+            'merchants': [[m.get('merchant'), m.get('totalAmount', 0), m.get('count', 0)] for m in top_merchants],
+            'goals': [[g.get('title'), g.get('currentAmount', 0), g.get('targetAmount', 0)] for g in active_goals],
+            'trend': [m.get('amount', 0) for m in monthly_trend[-2:]] if len(monthly_trend) >= 2 else []
+        }
+        return key_inputs, prompt
     
-    def generate_investment_insights(self, financial_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate AI insights for investment portfolio"""
+    def _investment_request(self, financial_data: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        """Cache key inputs and prompt for investment insights"""
         
         # Extract investment data
         investments = financial_data.get('investments', [])
@@ -62,238 +289,294 @@ class FinancialInsightsAI:
         day_change = portfolio_summary.get('dayChange', 0)
         investment_count = portfolio_summary.get('investmentCount', 0)
         
-        # Find best and worst performers
-        if investments:
-            sorted_investments = sorted(investments, key=lambda x: x.get('totalGainLossPercent', 0), reverse=True)
-            best_performer = sorted_investments[0]
-            worst_performer = sorted_investments[-1]
-        else:
-            best_performer = None
-            worst_performer = None
+        # Performance, concentration and day-change attribution in one
+        # vectorized pass; the prompt lists the largest positions
+        analytics = portfolio_analytics(investments)
+        
+        # Create the investment prompt, dropping the smallest listed position
+        # until it fits the token budget (from a copy; analytics stays whole)
+        holdings = list(analytics['largest'])
+        while True:
+            prompt = self._create_investment_prompt(
+                total_value, total_gain_loss, total_gain_loss_percent, day_change,
+                investment_count, holdings, analytics
+            )
+            if estimate_tokens(prompt) <= self.token_budget or not self._trim(holdings):
+                break
+        
+        # Everything the prompt reads, for the cache key
+        key_inputs = {
+            'totals': [total_value, total_gain_loss, total_gain_loss_percent, day_change, investment_count],
+            'holdings': [[inv[field] for field in ('symbol', 'shares', 'currentPrice', 'totalValue',
+                                                   'totalGainLossPercent', 'dayChangePercent')]
+                         for inv in holdings],
+            'best': [[inv['symbol'], inv['totalGainLossPercent']] for inv in analytics['best']],
+            'worst': [[inv['symbol'], inv['totalGainLossPercent']] for inv in analytics['worst']],
+            'concentration': [analytics['topNWeightPercent'], analytics['effectiveHoldings']],
+            'movers': [[m['symbol'], m['dayChange']] for m in analytics['gainers'] + analytics['losers']]
+        }
+        return key_inputs, prompt
+    
+    @staticmethod
+    def _trim(*lists: List[Dict]) -> bool:
+        """Drop the last entry of the longest list (earlier lists first on ties),
+        keeping at least one entry in each; False when nothing is left to drop"""
+        longest = max(lists, key=len)
+        if len(longest) <= 1:
+            return False
+        longest.pop()
+        return True
+    
+    def _generate(self, kind: str, key_inputs: Dict[str, Any], prompt: str) -> Dict[str, Any]:
+        """Run the prompt through the cache when there is one; fallback insights
+        (Ollama unavailable or unparseable) are returned but not cached"""
+        return self.generate_checked(kind, key_inputs, prompt)[0]
+    
+    def _stream(self, kind: str, key_inputs: Dict[str, Any], prompt: str) -> Iterator[Dict[str, Any]]:
+        """Stream the prompt's insights as "section"/"item" events (see
+        IncrementalJSONParser) and a final {"type": "done", "insights": ...}.
+        Cached insights are replayed; sections the model didn't complete (Ollama
+        unavailable, cut off or malformed) are filled in from the fallback"""
+        key = canonical_key(kind, key_inputs, self.amount_step) if self.cache is not None else None
+        cached = self.cache.lookup(key) if key else None
+        if cached is not None:
+            yield from self._section_events(cached)
+            yield {'type': 'done', 'insights': cached, 'cached': True, 'fallback': False}
+            return
+        
+        parser = IncrementalJSONParser()
+        start = time.perf_counter()
+        generated = False
+        try:
+            for text in self._stream_ollama(prompt, kind):
+                yield from parser.feed(text)
+                if parser.complete:
+                    break
+            generated = True
+        except Exception as e:
+            print(f"Error in streaming LLM call: {e}", file=sys.stderr)
         
-        # Create the investment prompt
-        prompt = self._create_investment_prompt(
-            total_value, total_gain_loss, total_gain_loss_percent, day_change,
-            investment_count, investments, best_performer, worst_performer
-        )
+        insights = parser.result
+        missing = missing_sections(kind, insights)
+        if generated:
+            self._record_output(kind, time.perf_counter() - start, missing)
+        if generated and missing:
+            repaired = self._regenerate_missing(prompt, kind, missing)
+            yield from self._section_events(repaired)
+            insights = {**insights, **repaired}
+            missing = missing_sections(kind, insights)
         
-        # Generate insights using Ollama
-        insights = self._call_ollama(prompt)
+        if key:
+            self.cache.store(key, insights, time.perf_counter() - start, cacheable=not missing)
+        if not missing:
+            yield {'type': 'done', 'insights': insights, 'cached': False, 'fallback': False}
+            return
         
-        return insights
+        filler = {section: value for section, value in self._create_fallback_insights("", kind).items()
+                  if section in missing or section not in insights}
+        yield from self._section_events(filler)
+        yield {'type': 'done', 'insights': {**insights, **filler}, 'cached': False, 'fallback': True}
+    
+    def _section_events(self, insights: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """The events a stream of these (already complete) insights would have produced"""
+        for section, value in insights.items():
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    yield {'type': 'item', 'section': section, 'index': index, 'data': item}
+            else:
+                yield {'type': 'section', 'section': section, 'data': value}
     
     def _create_prompt(self, total_income: float, total_spending: float, net_flow: float, 
                       current_balance: float, top_categories: List[Dict], 
                       top_merchants: List[Dict], goals: List[Dict], 
                       monthly_trend: List[Dict]) -> str:
-        """Create a detailed prompt for the LLM"""
+        """Create the data message for the LLM (instructions are in INSIGHTS_SYSTEM_PROMPT)"""
         
-        # Format category data
-        category_text = ""
-        for i, cat in enumerate(top_categories, 1):
-            category_text += f"{i}. {cat.get('category', 'Unknown')}: ${cat.get('amount', 0):,.2f}\n"
+        lines = [f"Income ${total_income:,.2f} | Spending ${total_spending:,.2f} | "
+                 f"Net ${net_flow:,.2f} | Balance ${current_balance:,.2f}"]
         
-        # Format merchant data
-        merchant_text = ""
-        for i, merchant in enumerate(top_merchants, 1):
-            merchant_text += f"{i}. {merchant.get('merchant', 'Unknown')}: ${merchant.get('totalAmount', 0):,.2f} ({merchant.get('count', 0)} transactions)\n"
+        if top_categories:
+            lines.append("Top categories: " + "; ".join(
+                f"{_name(cat.get('category'), 'Unknown')} ${cat.get('amount', 0):,.2f}" for cat in top_categories))
         
-        # Format goals data
-        goals_text = ""
-        for goal in goals[:3]:  # Top 3 goals
-            progress = (goal.get('currentAmount', 0) / goal.get('targetAmount', 1)) * 100
-            goals_text += f"- {goal.get('title', 'Goal')}: ${goal.get('currentAmount', 0):,.2f}/${goal.get('targetAmount', 0):,.2f} ({progress:.1f}%)\n"
+        if top_merchants:
+            lines.append("Top merchants: " + "; ".join(
+                f"{_name(merchant.get('merchant'), 'Unknown')} ${merchant.get('totalAmount', 0):,.2f} "
+                f"({merchant.get('count', 0)}x)" for merchant in top_merchants))
+        
+        if goals:
+            goal_text = []
+            for goal in goals:
+                progress = (goal.get('currentAmount', 0) / (goal.get('targetAmount') or 1)) * 100
+                goal_text.append(f"{_name(goal.get('title'), 'Goal')} ${goal.get('currentAmount', 0):,.2f}/"
+                                 f"${goal.get('targetAmount', 0):,.2f} ({progress:.1f}%)")
+            lines.append("Active goals: " + "; ".join(goal_text))
         
         # Monthly trend analysis
-        trend_text = ""
         if len(monthly_trend) >= 2:
             recent = monthly_trend[-1].get('amount', 0)
             previous = monthly_trend[-2].get('amount', 0)
             change = ((recent - previous) / previous * 100) if previous > 0 else 0
-            trend_text = f"Monthly spending change: {change:+.1f}% (${recent:,.2f} vs ${previous:,.2f})"
+            lines.append(f"Monthly spending change: {change:+.1f}% (${recent:,.2f} vs ${previous:,.2f})")
         
-        prompt = f"""You are a fun, witty financial advisor for college students. Analyze this financial data and provide insights with humor and actionable advice.
-
-FINANCIAL DATA:
-- Total Income: ${total_income:,.2f}
-- Total Spending: ${total_spending:,.2f}
-- Net Flow: ${net_flow:,.2f}
-- Current Balance: ${current_balance:,.2f}
-
-TOP SPENDING CATEGORIES:
-{category_text}
-
-TOP MERCHANTS:
-{merchant_text}
-
-ACTIVE GOALS:
-{goals_text}
-
-TREND DATA:
-{trend_text}
-
-Please provide insights in this JSON format:
-{{
-  "spendingHighlights": {{
-    "biggestExpense": "Funny comment about the biggest expense",
-    "overspendingAlert": "Witty alert about overspending (if applicable)",
-    "positiveReinforcement": "Encouraging message about good financial behavior"
-  }},
-  "categoryInsights": [
-    {{
-      "category": "Category name",
-      "insight": "Humorous insight about this category",
-      "suggestion": "Actionable tip to improve spending in this category"
-    }}
-  ],
-  "predictions": [
-    {{
-      "type": "goal_timeline",
-      "message": "Prediction about goal achievement timeline",
-      "actionable": "Specific step to improve timeline"
-    }}
-  ],
-  "funFacts": [
-    "Humorous observation about spending patterns",
-    "Light-hearted comparison or joke"
-  ],
-  "actionableRecommendations": [
-    "Specific, realistic step 1",
-    "Specific, realistic step 2",
-    "Specific, realistic step 3"
-  ]
-}}
-
-Keep it fun, relatable, and student-friendly. Use emojis sparingly. Make jokes about relatable college experiences. Be encouraging but honest about spending habits."""
-
-        return prompt
+        return "FINANCIAL DATA:\n" + "\n".join(lines)
     
     def _create_investment_prompt(self, total_value: float, total_gain_loss: float, 
                                  total_gain_loss_percent: float, day_change: float,
-                                 investment_count: int, investments: List[Dict],
-                                 best_performer: Dict, worst_performer: Dict) -> str:
-        """Create a detailed prompt for investment analysis"""
-        
-        # Format investment data
-        investment_text = ""
-        for i, inv in enumerate(investments[:5], 1):  # Top 5 investments
-            symbol = inv.get('symbol', 'Unknown')
-            shares = inv.get('shares', 0)
-            current_price = inv.get('currentPrice', 0)
-            total_value_inv = inv.get('totalValue', 0)
-            gain_loss = inv.get('totalGainLoss', 0)
-            gain_loss_percent = inv.get('totalGainLossPercent', 0)
-            day_change_percent = inv.get('dayChangePercent', 0)
-            
-            investment_text += f"{i}. {symbol}: {shares} shares @ ${current_price:.2f} = ${total_value_inv:,.2f} ({gain_loss_percent:+.1f}% total, {day_change_percent:+.1f}% today)\n"
-        
-        # Best/worst performer info
-        performer_text = ""
-        if best_performer:
-            performer_text += f"BEST: {best_performer.get('symbol', 'N/A')} (+{best_performer.get('totalGainLossPercent', 0):.1f}%)\n"
-        if worst_performer and worst_performer != best_performer:
-            performer_text += f"WORST: {worst_performer.get('symbol', 'N/A')} ({worst_performer.get('totalGainLossPercent', 0):.1f}%)\n"
-        
-        prompt = f"""You are a fun, witty investment advisor for college students. Analyze this investment portfolio and provide insights with humor and actionable advice.
-
-PORTFOLIO DATA:
-- Total Portfolio Value: ${total_value:,.2f}
-- Total Gain/Loss: ${total_gain_loss:,.2f} ({total_gain_loss_percent:+.1f}%)
-- Day Change: ${day_change:,.2f}
-- Number of Holdings: {investment_count}
-
-INVESTMENT HOLDINGS:
-{investment_text}
-
-PERFORMANCE:
-{performer_text}
-
-Please provide insights in this JSON format:
-{{
-  "portfolioHighlights": {{
-    "bestPerformer": "Witty comment about your best performing stock",
-    "worstPerformer": "Humorous observation about your worst performing stock",
-    "diversificationAlert": "Funny comment about portfolio diversification",
-    "riskAssessment": "Witty assessment of portfolio risk level"
-  }},
-  "stockInsights": [
-    {{
-      "symbol": "AAPL",
-      "insight": "Humorous insight about this specific stock",
-      "suggestion": "Actionable tip for this stock",
-      "performance": "Funny performance summary"
-    }}
-  ],
-  "portfolioAnalysis": [
-    {{
-      "type": "performance",
-      "message": "Witty analysis of overall portfolio performance",
-      "actionable": "Specific step to improve portfolio"
-    }}
-  ],
-  "funFacts": [
-    "Humorous observation about the portfolio",
-    "Light-hearted comparison or joke about investing"
-  ],
-  "actionableRecommendations": [
-    {{
-      "roast": "Funny roast about a specific investment decision",
-      "recommendation": "Specific, actionable advice",
-      "impact": "Expected impact of following the recommendation"
-    }}
-  ]
-}}
-
-Keep it fun, relatable, and student-friendly. Use emojis sparingly. Make jokes about relatable college investing experiences. Be encouraging but honest about investment decisions. Focus on education and building good investing habits."""
-
-        return prompt
+                                 investment_count: int, holdings: List[Dict],
+                                 analytics: Dict[str, Any]) -> str:
+        """Create the portfolio message for the LLM (instructions are in INVESTMENT_SYSTEM_PROMPT)"""
+        
+        lines = [f"Value ${total_value:,.2f} | Gain/Loss ${total_gain_loss:,.2f} ({total_gain_loss_percent:+.1f}%) | "
+                 f"Day change ${day_change:,.2f} | Holdings {investment_count}"]
+        
+        if holdings:
+            lines.append("Largest positions:")
+        for inv in holdings:
+            lines.append(f"{_name(inv['symbol'], 'Unknown')}: {inv['shares']:g} @ ${inv['currentPrice']:.2f} "
+                         f"= ${inv['totalValue']:,.2f}, {inv['weightPercent']:.1f}% of portfolio "
+                         f"({inv['totalGainLossPercent']:+.1f}% total, {inv['dayChangePercent']:+.1f}% today)")
+        
+        # Weight of the positions listed, which trimming may have cut below the top N
+        if analytics['count'] > 1 and holdings:
+            listed_weight = sum(inv['weightPercent'] for inv in holdings)
+            lines.append(f"Concentration: largest {len(holdings)} = {listed_weight:.1f}% "
+                         f"of value, HHI {analytics['hhi']:.2f} (~{analytics['effectiveHoldings']:.1f} effective holdings)")
+        
+        # Best/worst performers
+        def performers(entries):
+            return ", ".join(f"{_name(inv['symbol'], 'N/A')} ({inv['totalGainLossPercent']:+.1f}%)" for inv in entries)
+        
+        if analytics['best']:
+            lines.append(f"Best: {performers(analytics['best'])}")
+        if analytics['count'] > 1:
+            lines.append(f"Worst: {performers(analytics['worst'])}")
+        
+        # Which holdings moved the portfolio today
+        movers = [f"{_name(m['symbol'], 'N/A')} {'+' if m['dayChange'] >= 0 else '-'}${abs(m['dayChange']):,.2f}"
+                  for m in analytics['gainers'] + analytics['losers']]
+        if movers:
+            lines.append(f"Today {analytics['dayChangePercent']:+.2f}%, driven by: {', '.join(movers)}")
+        
+        return "PORTFOLIO DATA:\n" + "\n".join(lines)
     
-    def _call_ollama(self, prompt: str) -> Dict[str, Any]:
+    def _call_ollama(self, prompt: str, kind: str = 'insights') -> Dict[str, Any]:
         """Call Ollama API to generate insights"""
+        return self._call_ollama_checked(prompt, kind)[0]
+    
+    def _ollama_request(self, prompt: str, stream: bool, kind: str = 'insights',
+                        model: Optional[str] = None) -> Dict[str, Any]:
+        """Body of an Ollama /api/generate request: the kind's fixed system prompt,
+        the request's data message and, in structured-output mode, the kind's schema"""
+        request = {
+            "model": model or self.model,
+            "system": SYSTEM_PROMPTS[kind],
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {
+                "temperature": 0.8,
+                "top_p": 0.9,
+                "num_predict": 1000
+            }
+        }
+        if self.structured_output:
+            request["format"] = SCHEMAS[kind]
+        return request
+    
+    def warm_up(self, kinds: Optional[List[str]] = None):
+        """Load the model and evaluate each kind's system prompt once (default:
+        all), so the first real requests find the prefix in Ollama's cache"""
+        for kind in kinds or SYSTEM_PROMPTS:
+            request = self._ollama_request("FINANCIAL DATA:", False, kind)
+            request["options"] = {**request["options"], "num_predict": 1}
+            try:
+                self.client.generate(request)
+            except Exception as e:
+                print(f"Ollama warm-up failed: {e}", file=sys.stderr)
+                return
+    
+    def _stream_ollama(self, prompt: str, kind: str = 'insights') -> Iterator[str]:
+        """Yield the completion's text as Ollama generates it (the timeout
+        applies between chunks, not to the whole generation)"""
+        chunks = self.client.stream(self._ollama_request(prompt, True, kind))
         try:
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.8,
-                        "top_p": 0.9,
-                        "max_tokens": 1000
-                    }
-                },
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                response_text = result.get('response', '')
-                
-                # Try to extract JSON from the response
-                try:
-                    # Find JSON in the response
-                    start_idx = response_text.find('{')
-                    end_idx = response_text.rfind('}') + 1
-                    
-                    if start_idx != -1 and end_idx != 0:
-                        json_str = response_text[start_idx:end_idx]
-                        return json.loads(json_str)
-                    else:
-                        # Fallback if no JSON found
-                        return self._create_fallback_insights(response_text)
-                except json.JSONDecodeError:
-                    return self._create_fallback_insights(response_text)
-            else:
-                print(f"Error calling Ollama: {response.status_code}", file=sys.stderr)
-                return self._create_fallback_insights("")
-                
+            for chunk in chunks:
+                if chunk.get('response'):
+                    yield chunk['response']
+                if chunk.get('done'):
+                    return
+        finally:
+            # Frees the generation slot as soon as the caller stops reading
+            chunks.close()
+    
+    def _call_ollama_checked(self, prompt: str, kind: str = 'insights', model: Optional[str] = None,
+                             deadline: Optional[float] = None) -> Tuple[Dict[str, Any], bool]:
+        """Call Ollama, returning (insights, True), or (insights with fallback
+        sections filled in, False) when sections are still missing after
+        re-asking for them"""
+        model = model or self.model
+        start = time.perf_counter()
+        try:
+            result = self.client.generate(self._ollama_request(prompt, False, kind, model), deadline)
         except Exception as e:
-            print(f"Error in LLM call: {e}", file=sys.stderr)
-            return self._create_fallback_insights("")
+            if deadline is None or time.monotonic() < deadline:
+                print(f"Error in LLM call: {e}", file=sys.stderr)
+            elif not isinstance(e, OllamaBusy):
+                # Cut off by the deadline: the model takes at least this long
+                self._observe_latency(model, time.perf_counter() - start)
+            return self._create_fallback_insights("", kind), False
+        
+        seconds = time.perf_counter() - start
+        # Ollama's own timing excludes time queued for a slot
+        self._observe_latency(model, result.get('total_duration', seconds * 1e9) / 1e9)
+        insights = parse_insights(result.get('response', ''))
+        missing = missing_sections(kind, insights)
+        self._record_output(kind, seconds, missing)
+        if missing:
+            insights = {**insights, **self._regenerate_missing(prompt, kind, missing, model, deadline)}
+            missing = missing_sections(kind, insights)
+        if not missing:
+            return insights, True
+        
+        fallback = self._create_fallback_insights(result.get('response', ''), kind)
+        return {**insights, **{section: value for section, value in fallback.items()
+                               if section in missing or section not in insights}}, False
+    
+    def _regenerate_missing(self, prompt: str, kind: str, missing: List[str], model: Optional[str] = None,
+                            deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Re-ask the model for just the missing sections, up to repair_attempts
+        times, returning the ones it produced"""
+        found: Dict[str, Any] = {}
+        for _ in range(self.repair_attempts):
+            request = self._ollama_request(
+                f"{prompt}\n\nRespond with only these sections: {', '.join(missing)}", False, kind, model)
+            if self.structured_output:
+                request["format"] = section_schema(kind, missing)
+            start = time.perf_counter()
+            try:
+                result = self.client.generate(request, deadline)
+            except Exception as e:
+                print(f"Error regenerating {', '.join(missing)}: {e}", file=sys.stderr)
+                break
+            sections = parse_insights(result.get('response', ''))
+            unusable = missing_sections(kind, sections)
+            usable = {section: sections[section] for section in missing if section not in unusable}
+            found.update(usable)
+            still_missing = [section for section in missing if section not in usable]
+            self.output_stats.record(time.perf_counter() - start, len(missing), len(still_missing), repair=True)
+            missing = still_missing
+            if not missing:
+                break
+        return found
     
-    def _create_fallback_insights(self, response_text: str) -> Dict[str, Any]:
-        """Create fallback insights if LLM fails"""
+    def _record_output(self, kind: str, seconds: float, missing: List[str]):
+        self.output_stats.record(seconds, len(SCHEMAS[kind]['properties']), len(missing))
+    
+    def _create_fallback_insights(self, response_text: str, kind: str = 'insights') -> Dict[str, Any]:
+        """Create fallback insights if LLM fails, with every section of the kind's schema"""
+        if kind == 'investment':
+            return self._create_investment_fallback_insights()
         return {
             "spendingHighlights": {
                 "biggestExpense": "Your biggest expense needs some attention! 💸",
@@ -324,6 +607,42 @@ Keep it fun, relatable, and student-friendly. Use emojis sparingly. Make jokes a
             ]
         }
 
+    def _create_investment_fallback_insights(self) -> Dict[str, Any]:
+        """Fallback investment insights, one entry per INVESTMENT_SCHEMA section"""
+        return {
+            "portfolioHighlights": {
+                "bestPerformer": "Your winners are carrying the team! 📈",
+                "worstPerformer": "Every portfolio has a stock it would rather not talk about.",
+                "diversificationAlert": "Check how much of your portfolio sits in just a few positions.",
+                "riskAssessment": "Make sure your mix of holdings matches how much risk you can stomach."
+            },
+            "stockInsights": [
+                {
+                    "symbol": "PORTFOLIO",
+                    "insight": "Your holdings tell a story worth reviewing",
+                    "suggestion": "Look at each position's share of your portfolio",
+                    "performance": "neutral"
+                }
+            ],
+            "portfolioAnalysis": [
+                {
+                    "type": "general",
+                    "message": "Long-term investing rewards patience and consistency",
+                    "actionable": "Review your portfolio allocation quarterly"
+                }
+            ],
+            "funFacts": [
+                "Time in the market beats timing the market! ⏳"
+            ],
+            "actionableRecommendations": [
+                {
+                    "roast": "Checking your portfolio every hour won't make it grow faster.",
+                    "recommendation": "Set a regular schedule to review and rebalance",
+                    "impact": "Less stress and fewer impulsive trades"
+                }
+            ]
+        }
+
 def main():
     """Test the AI insights service"""
     if len(sys.argv) < 2:
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Shared Ollama client
+One keep-alive connection pool for every generation, a semaphore that caps
+how many generations are sent to the model at once (the rest wait their
+turn), retries with jittered backoff on transient failures, and timings that
+separate time spent waiting for a slot from time spent generating. The
+semaphore is per process; with a slots directory the cap also holds across
+processes (e.g. gunicorn workers), through one lock file per slot.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Responses worth retrying: the model is loading, overloaded or restarting
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Recent timings kept for the quantiles in stats()
+TIMING_WINDOW = 1024
+
+class OllamaBusy(Exception):
+    """Raised when no generation slot frees up within queue_timeout"""
+
+class OllamaError(Exception):
+    """Raised when Ollama keeps failing after all retries"""
+
+class _FileSlots:
+    """Generation slots shared by every process using the same directory: a
+    slot is taken while its lock file is flocked, and freed by the kernel if
+    the holder dies. Files are opened per process (flock locks belong to the
+    open file, which forked processes would otherwise share), and a process's
+    threads never take a slot it already holds"""
+
+    # Polling interval bounds (seconds) while every slot is taken
+    MIN_POLL = 0.005
+    MAX_POLL = 0.05
+
+    def __init__(self, directory: str, count: int):
+        import fcntl
+        self.fcntl = fcntl
+        self.directory = directory
+        self.count = count
+        self.pid = None
+        self.files = []
+        self.held = set()
+        self.lock = threading.Lock()
+
+    def _open(self):
+        """Lock files of this process, opened on first use after any fork (lock held)"""
+        if self.pid != os.getpid():
+            os.makedirs(self.directory, exist_ok=True)
+            self.files = [open(os.path.join(self.directory, f"slot-{i}.lock"), 'a')
+                          for i in range(self.count)]
+            self.held = set()
+            self.pid = os.getpid()
+        return self.files
+
+    def _try(self, index: int) -> bool:
+        try:
+            self.fcntl.flock(self.files[index], self.fcntl.LOCK_EX | self.fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    def acquire(self, timeout: float) -> Optional[int]:
+        """Index of the slot taken, or None if none freed up within timeout"""
+        deadline = time.monotonic() + timeout
+        poll = self.MIN_POLL
+        while True:
+            with self.lock:
+                self._open()
+                for index in range(self.count):
+                    if index not in self.held and self._try(index):
+                        self.held.add(index)
+                        return index
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(poll, remaining))
+            poll = min(poll * 2, self.MAX_POLL)
+
+    def release(self, index: int):
+        with self.lock:
+            self.fcntl.flock(self.files[index], self.fcntl.LOCK_UN)
+            self.held.discard(index)
+
+    def held_elsewhere(self) -> int:
+        """Slots currently taken by other processes"""
+        busy = 0
+        with self.lock:
+            self._open()
+            for index in range(self.count):
+                if index in self.held:
+                    continue
+                if self._try(index):
+                    self.fcntl.flock(self.files[index], self.fcntl.LOCK_UN)
+                else:
+                    busy += 1
+        return busy
+
+class _Timings:
+    """Count, sum and recent-window quantiles of one duration"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.recent: deque = deque(maxlen=TIMING_WINDOW)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        ordered = sorted(self.recent)
+        def quantile(q):
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+        return {'count': self.count, 'sum': self.total, 'p50': quantile(0.5), 'p95': quantile(0.95),
+                'p99': quantile(0.99)}
+
+class OllamaClient:
+    """Thread-safe Ollama /api/generate client shared by all requests"""
+
+    def __init__(self, base_url: str = "http://localhost:11434", max_concurrency: int = 2,
+                 pool_size: int = 8, retries: int = 2, backoff_seconds: float = 0.5,
+                 timeout: float = 60, queue_timeout: float = 30, slots_dir: Optional[str] = None):
+        self.base_url = base_url.rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        # Cross-process cap: generations also need one of max_concurrency lock files
+        self.shared_slots = _FileSlots(slots_dir, max_concurrency) if slots_dir else None
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.active = 0
+        self.queue_timings = _Timings()
+        self.generation_timings = _Timings()
+        self.retried = 0
+        self.failed = 0
+        self.rejected = 0
+        # Tokens generated, from Ollama's eval_count
+        self.generated_tokens = 0
+
+    def generate(self, payload: Dict[str, Any], deadline: Optional[float] = None) -> Dict[str, Any]:
+        """POST a non-streaming generation and return Ollama's JSON response;
+        with a deadline (time.monotonic() value), waiting, retries and the
+        request timeout all stop there"""
+        slot = self._acquire(deadline)
+        start = time.perf_counter()
+        try:
+            response = self._post(payload, stream=False, deadline=deadline)
+            with response:
+                result = response.json()
+            self._count_tokens(result)
+            return result
+        finally:
+            self._release(start, slot)
+
+    def stream(self, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """POST a streaming generation and yield each NDJSON chunk; the slot is
+        held until the stream ends or the caller stops iterating"""
+        slot = self._acquire()
+        start = time.perf_counter()
+        try:
+            # Retries only cover getting the response; once chunks flow, a
+            # failure is the caller's to handle
+            with self._post(payload, stream=True) as response:
+                for line in response.iter_lines():
+                    if line:
+                        chunk = json.loads(line)
+                        if chunk.get('done'):
+                            self._count_tokens(chunk)
+                        yield chunk
+        finally:
+            self._release(start, slot)
+
+    def _post(self, payload: Dict[str, Any], stream: bool, deadline: Optional[float] = None) -> requests.Response:
+        """POST to /api/generate, retrying connection errors, timeouts and
+        RETRY_STATUSES with full-jitter exponential backoff"""
+        attempt = 0
+        while True:
+            timeout = self._remaining(self.timeout, deadline)
+            try:
+                if timeout <= 0:
+                    raise requests.Timeout("deadline passed")
+                response = self.session.post(f"{self.base_url}/api/generate", json=payload,
+                                             stream=stream, timeout=timeout)
+                if response.status_code == 200:
+                    return response
+                response.close()
+                error = OllamaError(f"Ollama returned {response.status_code}")
+                retryable = response.status_code in RETRY_STATUSES
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = OllamaError(f"Ollama unreachable: {e}")
+                retryable = True
+            backoff = random.uniform(0, self.backoff_seconds * 2 ** attempt)
+            out_of_time = deadline is not None and deadline - time.monotonic() <= backoff
+            if not retryable or attempt >= self.retries or out_of_time:
+                with self.lock:
+                    self.failed += 1
+                raise error
+            attempt += 1
+            with self.lock:
+                self.retried += 1
+            time.sleep(backoff)
+
+    @staticmethod
+    def _remaining(limit: float, deadline: Optional[float]) -> float:
+        """limit, capped at the seconds left before deadline"""
+        return limit if deadline is None else min(limit, deadline - time.monotonic())
+
+    def _count_tokens(self, result: Dict[str, Any]):
+        with self.lock:
+            self.generated_tokens += result.get('eval_count') or 0
+
+    def _acquire(self, deadline: Optional[float] = None) -> Optional[int]:
+        """Take a generation slot, returning the shared slot index (if any)"""
+        with self.lock:
+            self.waiting += 1
+        start = time.perf_counter()
+        acquired = self.slots.acquire(timeout=max(0.0, self._remaining(self.queue_timeout, deadline)))
+        slot = None
+        if acquired and self.shared_slots:
+            # The rest of the wait goes to a slot free across processes
+            left = self.queue_timeout - (time.perf_counter() - start)
+            slot = self.shared_slots.acquire(max(0.0, self._remaining(left, deadline)))
+            if slot is None:
+                self.slots.release()
+                acquired = False
+        waited = time.perf_counter() - start
+        with self.lock:
+            self.waiting -= 1
+            self.queue_timings.observe(waited)
+            if not acquired:
+                self.rejected += 1
+                raise OllamaBusy(f"no generation slot free after {waited:.1f}s")
+            self.active += 1
+        return slot
+
+    def _release(self, start: float, slot: Optional[int] = None):
+        with self.lock:
+            self.active -= 1
+            self.generation_timings.observe(time.perf_counter() - start)
+        if slot is not None:
+            self.shared_slots.release(slot)
+        self.slots.release()
+
+    def load(self) -> int:
+        """Generations running or waiting in this process, plus those other
+        processes are running on the shared slots"""
+        with self.lock:
+            local = self.active + self.waiting
+        return local + (self.shared_slots.held_elsewhere() if self.shared_slots else 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'maxConcurrency': self.max_concurrency,
+                'sharedSlots': self.shared_slots is not None,
+                'active': self.active,
+                'waiting': self.waiting,
+                'queueSeconds': self.queue_timings.summary(),
+                'generationSeconds': self.generation_timings.summary(),
+                'retried': self.retried,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'generatedTokens': self.generated_tokens
+            }
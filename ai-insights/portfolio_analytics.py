@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Vectorized portfolio analytics
+Reads the holdings into NumPy arrays in one pass, then computes best and
+worst performers (partial selection, no full sort), concentration (HHI,
+effective number of holdings, top-N weight) and which holdings drove today's
+change. Feeds the investment insights prompt, so portfolios of any size are
+summarised by their most significant positions rather than the first five.
+"""
+
+from operator import itemgetter
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Numeric fields read from each holding, in array column order
+FIELDS = ('shares', 'currentPrice', 'totalValue', 'totalGainLossPercent', 'dayChange', 'dayChangePercent')
+SHARES, PRICE, VALUE, GAIN_PERCENT, DAY_CHANGE, DAY_PERCENT = range(len(FIELDS))
+_get_fields = itemgetter(*FIELDS)
+
+def _holding_array(investments: List[Dict[str, Any]]) -> np.ndarray:
+    """(holdings x FIELDS) float array; missing or null fields read as 0"""
+    try:
+        rows = list(map(_get_fields, investments))
+    except KeyError:
+        rows = [[inv.get(field) for field in FIELDS] for inv in investments]
+    # None becomes NaN in a float array
+    data = np.array(rows, dtype=float).reshape(len(investments), len(FIELDS))
+    return np.nan_to_num(data, nan=0.0, posinf=0.0, neginf=0.0)
+
+def _top(values: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest values, largest first, via partial selection"""
+    k = min(k, len(values))
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    candidates = np.argpartition(values, len(values) - k)[len(values) - k:]
+    return candidates[np.argsort(values[candidates])[::-1]]
+
+def _symbol(investment: Dict[str, Any]) -> str:
+    return str(investment.get('symbol') or 'Unknown')
+
+def portfolio_analytics(investments: List[Dict[str, Any]], top_n: int = 5, movers: int = 3) -> Dict[str, Any]:
+    """Performance, concentration and day-change attribution of the holdings.
+    A holding's value is totalValue, or shares * currentPrice when that is
+    missing; its move today is dayChange * shares, or derived from
+    dayChangePercent when dayChange is missing"""
+    count = len(investments)
+    data = _holding_array(investments)
+
+    values = np.where(data[:, VALUE] != 0, data[:, VALUE], data[:, SHARES] * data[:, PRICE])
+    values = np.clip(values, 0, None)
+    total = values.sum()
+    weights = values / total if total > 0 else np.zeros(count)
+
+    # Today's move per holding: per-share change times shares, else back out
+    # yesterday's value from the percentage
+    day_percent = data[:, DAY_PERCENT]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        derived = np.nan_to_num(values - values / (1 + day_percent / 100), posinf=0.0, neginf=0.0)
+    day_changes = np.where(data[:, DAY_CHANGE] != 0, data[:, DAY_CHANGE] * data[:, SHARES], derived)
+    day_total = day_changes.sum()
+    previous_total = total - day_total
+
+    def position(i: int) -> Dict[str, Any]:
+        return {
+            'symbol': _symbol(investments[i]),
+            'shares': float(data[i, SHARES]),
+            'currentPrice': float(data[i, PRICE]),
+            'totalValue': float(values[i]),
+            'totalGainLossPercent': float(data[i, GAIN_PERCENT]),
+            'dayChangePercent': float(day_percent[i]),
+            'weightPercent': float(weights[i] * 100)
+        }
+
+    def mover(i: int) -> Dict[str, Any]:
+        return {
+            'symbol': _symbol(investments[i]),
+            'dayChange': float(day_changes[i]),
+            'sharePercent': float(day_changes[i] / abs(day_total) * 100) if day_total else 0.0
+        }
+
+    largest = _top(values, top_n)
+    hhi = float(np.square(weights).sum())
+    return {
+        'count': count,
+        'totalValue': float(total),
+        'best': [position(i) for i in _top(data[:, GAIN_PERCENT], movers)],
+        'worst': [position(i) for i in _top(-data[:, GAIN_PERCENT], movers)],
+        'largest': [position(i) for i in largest],
+        'topNWeightPercent': float(weights[largest].sum() * 100),
+        'hhi': hhi,
+        'effectiveHoldings': 1 / hhi if hhi > 0 else 0.0,
+        'dayChange': float(day_total),
+        'dayChangePercent': float(day_total / previous_total * 100) if previous_total > 0 else 0.0,
+        'gainers': [mover(i) for i in _top(day_changes, movers) if day_changes[i] > 0],
+        'losers': [mover(i) for i in _top(-day_changes, movers) if day_changes[i] < 0]
+    }
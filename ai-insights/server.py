@@ -3,43 +3,161 @@
 Flask server to expose the AI insights service
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import json
 import sys
 import os
+import threading
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from llm_service import FinancialInsightsAI
+from insights_cache import InsightsCache
+from ollama_client import OllamaClient
+from batch_insights import run_batch
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Initialize the AI service
-ai_service = FinancialInsightsAI()
+# Initialize the AI service. Insights are cached per process for
+# INSIGHTS_CACHE_TTL_SECONDS (0 disables caching but still coalesces identical
+# concurrent requests); amounts are rounded to INSIGHTS_CACHE_AMOUNT_STEP
+# dollars when deciding whether two requests are the same
+insights_cache = InsightsCache(
+    ttl_seconds=float(os.environ.get('INSIGHTS_CACHE_TTL_SECONDS', 3600)),
+    max_entries=int(os.environ.get('INSIGHTS_CACHE_MAX_ENTRIES', 1024))
+)
+# Generations sent to Ollama at once are capped at OLLAMA_MAX_CONCURRENCY (a
+# local model only serves a few in parallel); requests beyond that wait up to
+# OLLAMA_QUEUE_TIMEOUT seconds for a slot before falling back. The cap is per
+# process unless OLLAMA_SLOTS_DIR names a directory of lock files shared by
+# every worker (gunicorn.conf.py sets one)
+ollama_client = OllamaClient(
+    base_url=os.environ.get('OLLAMA_URL', 'http://localhost:11434'),
+    max_concurrency=int(os.environ.get('OLLAMA_MAX_CONCURRENCY', 2)),
+    pool_size=int(os.environ.get('OLLAMA_POOL_SIZE', 8)),
+    retries=int(os.environ.get('OLLAMA_RETRIES', 2)),
+    timeout=float(os.environ.get('OLLAMA_TIMEOUT', 60)),
+    queue_timeout=float(os.environ.get('OLLAMA_QUEUE_TIMEOUT', 30)),
+    slots_dir=os.environ.get('OLLAMA_SLOTS_DIR') or None
+)
+ai_service = FinancialInsightsAI(
+    ollama_url=ollama_client.base_url,
+    client=ollama_client,
+    cache=insights_cache,
+    amount_step=float(os.environ.get('INSIGHTS_CACHE_AMOUNT_STEP', 1.0)),
+    token_budget=int(os.environ.get('INSIGHTS_PROMPT_TOKEN_BUDGET', 256)),
+    keep_alive=os.environ.get('OLLAMA_KEEP_ALIVE', '30m'),
+    structured_output=os.environ.get('OLLAMA_STRUCTURED_OUTPUT', '1') != '0',
+    repair_attempts=int(os.environ.get('INSIGHTS_REPAIR_ATTEMPTS', 1)),
+    fast_model=os.environ.get('OLLAMA_FAST_MODEL') or None
+)
+
+# Latency budget for /generate-insights when the request doesn't set one
+# (deadlineMs in the body or an X-Deadline-Ms header); 0 means no budget
+default_deadline_ms = float(os.environ.get('INSIGHTS_DEADLINE_MS', 0))
+
+def warm_up_in_background():
+    """Evaluate the system prompts once (unless OLLAMA_WARMUP=0) without delaying startup"""
+    if os.environ.get('OLLAMA_WARMUP', '1') != '0':
+        threading.Thread(target=ai_service.warm_up, daemon=True).start()
+
+# Batch requests take at most INSIGHTS_BATCH_MAX_USERS users and run
+# INSIGHTS_BATCH_PARALLELISM generations at once (default: every Ollama slot)
+batch_max_users = int(os.environ.get('INSIGHTS_BATCH_MAX_USERS', 1000))
+batch_parallelism = int(os.environ.get('INSIGHTS_BATCH_PARALLELISM', 0)) or None
+
+def metric_lines(name: str, help_text: str, value: float, kind: str = 'gauge') -> list:
+    """Prometheus text exposition lines for one value"""
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+
+def summary_lines(name: str, help_text: str, timings: dict) -> list:
+    """Prometheus summary lines (recent quantiles, total count and sum)"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} summary"]
+    for quantile, field in (('0.5', 'p50'), ('0.95', 'p95'), ('0.99', 'p99')):
+        lines.append(f'{name}{{quantile="{quantile}"}} {timings[field]}')
+    lines += [f"{name}_sum {timings['sum']}", f"{name}_count {timings['count']}"]
+    return lines
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "service": "AI Insights"})
+    return jsonify({"status": "healthy", "service": "AI Insights", "cache": insights_cache.stats(),
+                    "ollama": ollama_client.stats(), "output": ai_service.output_stats.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of the insights cache, Ollama client and output parsing"""
+    cache = insights_cache.stats()
+    ollama = ollama_client.stats()
+    output = ai_service.output_stats.stats()
+    lines = [
+        *metric_lines('insights_cache_hits_total', 'Requests answered from the cache', cache['hits'], 'counter'),
+        *metric_lines('insights_cache_coalesced_total', 'Requests that waited on an identical in-flight generation',
+                      cache['coalesced'], 'counter'),
+        *metric_lines('insights_cache_misses_total', 'Requests that called the LLM', cache['misses'], 'counter'),
+        *metric_lines('insights_cache_hit_ratio', 'Share of requests served without their own LLM call',
+                      cache['hitRate']),
+        *metric_lines('insights_cache_entries', 'Cached insight responses', cache['entries']),
+        *metric_lines('insights_cache_evictions_total', 'Entries evicted to stay under the size limit',
+                      cache['evictions'], 'counter'),
+        *metric_lines('insights_llm_seconds_total', 'Seconds spent generating insights', cache['llmSeconds'],
+                      'counter'),
+        *metric_lines('insights_llm_saved_seconds_total', 'LLM seconds avoided by cache hits and coalescing',
+                      cache['savedLlmSeconds'], 'counter'),
+        *metric_lines('ollama_active_generations', 'Generations currently running on Ollama', ollama['active']),
+        *metric_lines('ollama_waiting_requests', 'Requests waiting for a generation slot', ollama['waiting']),
+        *summary_lines('ollama_queue_seconds', 'Time spent waiting for a generation slot', ollama['queueSeconds']),
+        *summary_lines('ollama_generation_seconds', 'Time from getting a slot to the end of the generation',
+                       ollama['generationSeconds']),
+        *metric_lines('ollama_retries_total', 'Ollama calls retried after a transient error', ollama['retried'],
+                      'counter'),
+        *metric_lines('ollama_failures_total', 'Ollama calls that failed after all retries', ollama['failed'],
+                      'counter'),
+        *metric_lines('ollama_rejected_total', 'Requests that gave up waiting for a generation slot',
+                      ollama['rejected'], 'counter'),
+        *metric_lines('ollama_generated_tokens_total', 'Tokens generated by Ollama', ollama['generatedTokens'],
+                      'counter'),
+        *metric_lines('insights_generations_total', 'Generations parsed, including repairs', output['generations'],
+                      'counter'),
+        *metric_lines('insights_parse_failures_total', 'Generations missing or mangling required sections',
+                      output['parseFailures'], 'counter'),
+        *metric_lines('insights_parse_failure_ratio', 'Share of generations with unusable sections',
+                      output['parseFailureRate']),
+        *metric_lines('insights_wasted_generation_seconds_total', 'Generation seconds spent on unusable sections',
+                      output['wastedSeconds'], 'counter'),
+        *metric_lines('insights_repairs_total', 'Regenerations of missing sections', output['repairs'], 'counter'),
+        *metric_lines('insights_repaired_total', 'Regenerations that produced every missing section',
+                      output['repaired'], 'counter'),
+    ]
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
 
 @app.route('/generate-insights', methods=['POST'])
 def generate_insights():
-    """Generate financial insights using Llama 3.2 3B"""
+    """Generate financial insights using Llama 3.2 3B, within the request's
+    latency budget: numeric analytics are always returned, and the insights
+    come from the LLM when it can answer in time ("source": "llm" or "cache")
+    or from the local analytic engine ("source": "local")"""
     try:
         data = request.get_json()
         
         if not data:
             return jsonify({"error": "No data provided"}), 400
         
+        try:
+            deadline_ms = float(data.get('deadlineMs') or request.headers.get('X-Deadline-Ms')
+                                or default_deadline_ms)
+        except (TypeError, ValueError):
+            return jsonify({"error": "deadlineMs must be a number"}), 400
+        
         # Generate insights using the AI service
-        insights = ai_service.generate_insights(data)
+        routed = ai_service.route_insights(data, deadline_ms / 1000 if deadline_ms > 0 else None)
         
         return jsonify({
             "success": True,
-            "insights": insights
+            **routed
         })
         
     except Exception as e:
@@ -58,26 +176,8 @@ def generate_investment_insights():
         if not data:
             return jsonify({"error": "No data provided"}), 400
         
-        # Extract investment data
-        portfolio_summary = data.get('portfolioSummary', {})
-        investments = data.get('investments', [])
-        
-        # Create financial data structure for the AI
-        financial_data = {
-            'totalIncome': portfolio_summary.get('totalValue', 0),
-            'totalSpending': 0,  # Not applicable for investments
-            'netFlow': portfolio_summary.get('totalGainLoss', 0),
-            'currentBalance': portfolio_summary.get('totalValue', 0),
-            'spendingByCategory': [],  # Not applicable for investments
-            'topMerchants': [],  # Not applicable for investments
-            'goals': [],  # Could be added later
-            'monthlyTrend': [],  # Could be added later
-            'investments': investments,
-            'portfolioSummary': portfolio_summary
-        }
-        
         # Generate insights using the AI service
-        insights = ai_service.generate_investment_insights(financial_data)
+        insights = ai_service.generate_investment_insights(investment_financial_data(data))
         
         return jsonify({
             "success": True,
@@ -91,7 +191,106 @@ def generate_investment_insights():
             "error": str(e)
         }), 500
 
+def investment_financial_data(data: dict) -> dict:
+    """Financial data structure for the AI from an investment insights request"""
+    # Extract investment data
+    portfolio_summary = data.get('portfolioSummary', {})
+    investments = data.get('investments', [])
+    
+    return {
+        'totalIncome': portfolio_summary.get('totalValue', 0),
+        'totalSpending': 0,  # Not applicable for investments
+        'netFlow': portfolio_summary.get('totalGainLoss', 0),
+        'currentBalance': portfolio_summary.get('totalValue', 0),
+        'spendingByCategory': [],  # Not applicable for investments
+        'topMerchants': [],  # Not applicable for investments
+        'goals': [],  # Could be added later
+        'monthlyTrend': [],  # Could be added later
+        'investments': investments,
+        'portfolioSummary': portfolio_summary
+    }
+
+def stream_events(events):
+    """Stream insight events as NDJSON, or as server-sent events when the client
+    accepts text/event-stream; an exception mid-stream becomes an "error" event"""
+    sse = 'text/event-stream' in request.headers.get('Accept', '')
+    
+    def generate():
+        try:
+            for event in events:
+                if sse:
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                else:
+                    yield json.dumps(event) + '\n'
+        except Exception as e:
+            print(f"Error streaming insights: {e}", file=sys.stderr)
+            event = {"type": "error", "error": str(e)}
+            yield f"event: error\ndata: {json.dumps(event)}\n\n" if sse else json.dumps(event) + '\n'
+    
+    response = Response(stream_with_context(generate()),
+                        mimetype='text/event-stream' if sse else 'application/x-ndjson')
+    # Keep proxies from buffering the stream
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/generate-insights/stream', methods=['POST'])
+def generate_insights_stream():
+    """Stream financial insights section by section: {"type": "section"} events
+    for objects such as spendingHighlights, {"type": "item"} events for each
+    element of lists such as categoryInsights, then {"type": "done"} with the
+    full insights"""
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+    try:
+        events = ai_service.stream_insights(data)
+    except Exception as e:
+        print(f"Error generating insights: {e}", file=sys.stderr)
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+    return stream_events(events)
+
+@app.route('/generate-investment-insights/stream', methods=['POST'])
+def generate_investment_insights_stream():
+    """Stream investment insights section by section (see /generate-insights/stream)"""
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+    try:
+        events = ai_service.stream_investment_insights(investment_financial_data(data))
+    except Exception as e:
+        print(f"Error generating insights: {e}", file=sys.stderr)
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+    return stream_events(events)
+
+@app.route('/generate-insights/batch', methods=['POST'])
+def generate_insights_batch():
+    """Generate insights for many users: {"users": [{"userId", "kind", "priority",
+    "data"}], "parallelism": n}. Streams a {"type": "result"} event per user as
+    their insights finish (identical inputs share one generation), then a
+    {"type": "report"} event with users/min and tokens/s"""
+    data = request.get_json(silent=True)
+    users = data.get('users') if isinstance(data, dict) else None
+    if not isinstance(users, list) or not users:
+        return jsonify({"error": "No users provided"}), 400
+    if len(users) > batch_max_users:
+        return jsonify({"error": f"At most {batch_max_users} users per batch"}), 413
+    try:
+        parallelism = int(data.get('parallelism') or 0) or batch_parallelism
+    except (TypeError, ValueError):
+        return jsonify({"error": "parallelism must be an integer"}), 400
+    return stream_events(run_batch(ai_service, users, parallelism))
+
 if __name__ == '__main__':
+    # Development server; production runs under gunicorn (see gunicorn.conf.py)
     print("Starting AI Insights Server...")
     print("Make sure Ollama is running with llama3.2:3b model")
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    port = int(os.environ.get('PORT', 5001))
+    warm_up_in_background()
+    app.run(host='0.0.0.0', port=port, debug=os.environ.get('FLASK_DEBUG') == '1')
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Local analytic engine for spending insights
+Computes the numeric insights (biggest category, month-over-month change,
+goal ETAs) directly from the request data in microseconds, and phrases them
+as a complete insights response for when the LLM can't answer in time.
+"""
+
+import math
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+# Month-over-month increase (percent) worth an overspending alert
+ALERT_CHANGE_PERCENT = 10.0
+
+def _add_months(start: date, months: int) -> str:
+    """YYYY-MM of the month `months` after start"""
+    index = start.year * 12 + start.month - 1 + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+def spending_analytics(financial_data: Dict[str, Any], today: Optional[date] = None) -> Dict[str, Any]:
+    """Biggest category, month-over-month change and an ETA per active goal.
+    Goals without a monthlyContribution are projected at the average monthly
+    surplus, (totalIncome - totalSpending) over the months in monthlyTrend"""
+    today = today or date.today()
+    total_income = financial_data.get('totalIncome', 0) or 0
+    total_spending = financial_data.get('totalSpending', 0) or 0
+
+    biggest = None
+    categories = [c for c in financial_data.get('spendingByCategory', []) if (c.get('amount') or 0) > 0]
+    if categories:
+        top = max(categories, key=lambda c: c['amount'])
+        biggest = {
+            'category': top.get('category', 'Unknown'),
+            'amount': top['amount'],
+            'sharePercent': top['amount'] / total_spending * 100 if total_spending > 0 else None
+        }
+
+    month_over_month = None
+    monthly_trend = financial_data.get('monthlyTrend', [])
+    if len(monthly_trend) >= 2:
+        recent = monthly_trend[-1].get('amount', 0) or 0
+        previous = monthly_trend[-2].get('amount', 0) or 0
+        month_over_month = {
+            'month': monthly_trend[-1].get('month'),
+            'amount': recent,
+            'previousAmount': previous,
+            'changePercent': (recent - previous) / previous * 100 if previous > 0 else None
+        }
+
+    monthly_surplus = (total_income - total_spending) / max(1, len(monthly_trend))
+    goals = []
+    for goal in financial_data.get('goals', []):
+        if not goal.get('isActive', True):
+            continue
+        target = goal.get('targetAmount', 0) or 0
+        current = goal.get('currentAmount', 0) or 0
+        remaining = max(0.0, target - current)
+        rate = goal.get('monthlyContribution') or max(0.0, monthly_surplus)
+        months = 0 if remaining == 0 else (math.ceil(remaining / rate) if rate > 0 else None)
+        goals.append({
+            'title': goal.get('title', 'Goal'),
+            'progressPercent': current / target * 100 if target > 0 else None,
+            'remaining': remaining,
+            'monthlyRate': rate,
+            'months': months,
+            'eta': _add_months(today, months) if months is not None else None
+        })
+
+    return {
+        'totalIncome': total_income,
+        'totalSpending': total_spending,
+        'net': total_income - total_spending,
+        'biggestCategory': biggest,
+        'monthOverMonth': month_over_month,
+        'monthlySurplus': monthly_surplus,
+        'goals': goals
+    }
+
+def analytic_insights(analytics: Dict[str, Any], financial_data: Dict[str, Any]) -> Dict[str, Any]:
+    """A complete insights response (same sections as the LLM's) stating the numbers plainly"""
+    biggest = analytics['biggestCategory']
+    change = analytics['monthOverMonth']
+    net = analytics['net']
+    total_spending = analytics['totalSpending']
+
+    if biggest:
+        share = f" ({biggest['sharePercent']:.0f}% of spending)" if biggest['sharePercent'] is not None else ""
+        biggest_text = f"{biggest['category']} is your biggest expense at ${biggest['amount']:,.2f}{share}."
+    else:
+        biggest_text = "No spending recorded yet."
+
+    rising = change is not None and change['changePercent'] is not None and change['changePercent'] > ALERT_CHANGE_PERCENT
+    if rising:
+        alert_text = (f"Spending is up {change['changePercent']:.1f}% from last month "
+                      f"(${change['amount']:,.2f} vs ${change['previousAmount']:,.2f}).")
+    elif net < 0:
+        alert_text = f"You spent ${-net:,.2f} more than you earned."
+    else:
+        alert_text = "No overspending this period."
+    praise_text = (f"You kept ${net:,.2f} of your income. Nice work!" if net > 0
+                   else "Tracking your spending is the first step. Keep it up!")
+
+    categories = sorted(financial_data.get('spendingByCategory', []), key=lambda c: c.get('amount', 0) or 0,
+                        reverse=True)[:3]
+    category_insights = [{
+        'category': c.get('category', 'Unknown'),
+        'insight': (f"{c.get('category', 'Unknown')} took ${c.get('amount', 0) or 0:,.2f}"
+                    + (f", {(c.get('amount', 0) or 0) / total_spending * 100:.0f}% of your spending."
+                       if total_spending > 0 else ".")),
+        'suggestion': f"Set a monthly limit for {c.get('category', 'this category')} and check it weekly."
+    } for c in categories] or [{
+        'category': 'General',
+        'insight': "No category breakdown yet.",
+        'suggestion': "Categorize a few weeks of transactions to see where your money goes."
+    }]
+
+    predictions: List[Dict[str, str]] = []
+    for goal in analytics['goals'][:3]:
+        if goal['months'] == 0:
+            message = f"You've reached your {goal['title']} goal!"
+            actionable = "Pick your next goal."
+        elif goal['months'] is not None:
+            message = (f"At ${goal['monthlyRate']:,.2f}/month you'll reach {goal['title']} in "
+                       f"{goal['months']} months ({goal['eta']}).")
+            actionable = "Automate the monthly transfer so it happens before you spend."
+        else:
+            message = f"You need ${goal['remaining']:,.2f} more for {goal['title']}, but nothing is going toward it yet."
+            actionable = "Set up a monthly contribution, even a small one."
+        predictions.append({'type': 'goal_timeline', 'message': message, 'actionable': actionable})
+    if change is not None and change['changePercent'] is not None:
+        direction = 'up' if change['changePercent'] > 0 else 'down'
+        predictions.append({
+            'type': 'spending_trend',
+            'message': f"Monthly spending is {direction} {abs(change['changePercent']):.1f}% from last month.",
+            'actionable': "Review what changed this month." if rising else "Keep your spending steady."
+        })
+    if not predictions:
+        predictions.append({'type': 'general', 'message': "Add a goal to see when you'll reach it.",
+                            'actionable': "Create a savings goal with a monthly contribution."})
+
+    fun_facts = []
+    if total_spending > 0:
+        fun_facts.append(f"You spend about ${total_spending / 30:,.2f} a day.")
+    if analytics['monthlySurplus'] > 0:
+        fun_facts.append(f"At this rate you'd keep ${analytics['monthlySurplus'] * 12:,.2f} over a year.")
+    fun_facts = fun_facts or ["Financial health is a journey, not a destination!"]
+
+    recommendations = []
+    if biggest:
+        recommendations.append(f"Trim {biggest['category']} by 10% to free up ${biggest['amount'] * 0.1:,.2f}.")
+    if rising:
+        recommendations.append("Compare this month's transactions with last month's to find the increase.")
+    recommendations += ["Review your spending categories monthly", "Set up automatic savings transfers"]
+
+    return {
+        'spendingHighlights': {
+            'biggestExpense': biggest_text,
+            'overspendingAlert': alert_text,
+            'positiveReinforcement': praise_text
+        },
+        'categoryInsights': category_insights,
+        'predictions': predictions,
+        'funFacts': fun_facts,
+        'actionableRecommendations': recommendations[:3]
+    }
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Structured output for insight generations
+JSON schemas for each insights kind (sent as Ollama's `format` so the model's
+output is constrained to them), tolerant parsing of the model's text, checks
+for missing sections, and counters for generations whose output couldn't be
+used.
+"""
+
+import threading
+from typing import Any, Dict, List
+
+from json_stream import IncrementalJSONParser
+
+def _object(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Schema of an object requiring every one of its properties"""
+    return {'type': 'object', 'properties': properties, 'required': list(properties)}
+
+def _strings(*names: str) -> Dict[str, Any]:
+    return _object({name: {'type': 'string'} for name in names})
+
+def _list_of(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {'type': 'array', 'items': item, 'minItems': 1}
+
+INSIGHTS_SCHEMA = _object({
+    'spendingHighlights': _strings('biggestExpense', 'overspendingAlert', 'positiveReinforcement'),
+    'categoryInsights': _list_of(_strings('category', 'insight', 'suggestion')),
+    'predictions': _list_of(_strings('type', 'message', 'actionable')),
+    'funFacts': _list_of({'type': 'string'}),
+    'actionableRecommendations': _list_of({'type': 'string'})
+})
+
+INVESTMENT_SCHEMA = _object({
+    'portfolioHighlights': _strings('bestPerformer', 'worstPerformer', 'diversificationAlert', 'riskAssessment'),
+    'stockInsights': _list_of(_strings('symbol', 'insight', 'suggestion', 'performance')),
+    'portfolioAnalysis': _list_of(_strings('type', 'message', 'actionable')),
+    'funFacts': _list_of({'type': 'string'}),
+    'actionableRecommendations': _list_of(_strings('roast', 'recommendation', 'impact'))
+})
+
+SCHEMAS = {'insights': INSIGHTS_SCHEMA, 'investment': INVESTMENT_SCHEMA}
+
+def section_schema(kind: str, sections: List[str]) -> Dict[str, Any]:
+    """The kind's schema restricted to the given top-level sections"""
+    properties = SCHEMAS[kind]['properties']
+    return _object({section: properties[section] for section in sections})
+
+def parse_insights(text: str) -> Dict[str, Any]:
+    """Every complete section of the JSON object in text, ignoring text around
+    it; a truncated object yields the sections before the cut"""
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    return parser.result
+
+def missing_sections(kind: str, insights: Dict[str, Any]) -> List[str]:
+    """Required sections of the kind that are absent, empty or of the wrong type"""
+    missing = []
+    for section, schema in SCHEMAS[kind]['properties'].items():
+        value = insights.get(section)
+        expected = list if schema['type'] == 'array' else dict
+        if not isinstance(value, expected) or not value:
+            missing.append(section)
+    return missing
+
+class OutputStats:
+    """How often generations come back unparseable or incomplete, and the
+    generation seconds whose output had to be thrown away"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generations = 0
+        self.parse_failures = 0
+        self.wasted_seconds = 0.0
+        self.repairs = 0
+        self.repaired = 0
+
+    def record(self, seconds: float, required: int, missing: int, repair: bool = False):
+        """Account for one generation expected to produce `required` sections,
+        of which `missing` were unusable; that share of its time is wasted"""
+        with self.lock:
+            self.generations += 1
+            if missing:
+                self.parse_failures += 1
+                self.wasted_seconds += seconds * missing / required
+            if repair:
+                self.repairs += 1
+                self.repaired += not missing
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'generations': self.generations,
+                'parseFailures': self.parse_failures,
+                'parseFailureRate': self.parse_failures / self.generations if self.generations else 0.0,
+                'wastedSeconds': self.wasted_seconds,
+                'repairs': self.repairs,
+                'repaired': self.repaired
+            }
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Stub Ollama server for load testing
+Answers /api/generate (streaming and not) with canned insights JSON after a
+simulated delay, serving only --slots generations at once like a local model
+(others queue), and failing a share of requests with a 503 to exercise
+retries. Requests with a JSON-schema `format` get a response shaped by the
+schema, and a share of responses can be cut off mid-JSON (--malformed-rate)
+to exercise repair. Prompt evaluation costs time per token, except for the prefix shared
+with the last prompt a slot evaluated, as with Ollama's prompt cache. Point the service at it with OLLAMA_URL=http://localhost:11435.
+
+    python stub_ollama.py --port 11435 --latency 2 --tokens-per-second 60 --slots 2
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_service import FinancialInsightsAI
+
+# Canned completion: the service's own fallback insights, so responses parse
+COMPLETION = "Here are your insights:\n" + json.dumps(FinancialInsightsAI()._create_fallback_insights(""), indent=2)
+
+def sample_for(schema):
+    """Minimal value matching a JSON schema"""
+    kind = schema.get('type')
+    if kind == 'object':
+        return {name: sample_for(prop) for name, prop in schema.get('properties', {}).items()}
+    if kind == 'array':
+        return [sample_for(schema.get('items', {})) for _ in range(max(1, schema.get('minItems', 1)))]
+    if kind in ('number', 'integer'):
+        return 0
+    if kind == 'boolean':
+        return True
+    return "Stub insight text"
+
+def completion_for(body, malformed_rate: float = 0.0) -> str:
+    """Completion text for a request, cut off part-way at malformed_rate"""
+    schema = body.get('format')
+    text = json.dumps(sample_for(schema), indent=2) if isinstance(schema, dict) else COMPLETION
+    if random.random() < malformed_rate:
+        text = text[:int(len(text) * random.uniform(0.3, 0.9))]
+    return text
+
+# Characters per simulated token
+CHARS_PER_TOKEN = 4
+
+class StubOllama(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 1.0, tokens_per_second: float = 50,
+                 slots: int = 2, failure_rate: float = 0.0, prompt_tokens_per_second: float = 0,
+                 malformed_rate: float = 0.0, latency_jitter: float = 0.0):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.slots = threading.Semaphore(slots)
+        # Last prompt each slot evaluated, or None while the slot is busy
+        self.slot_prompts = [''] * slots
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.latency_jitter = latency_jitter
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+
+    def handle_error(self, request, client_address):
+        # Clients hang up on streams they've read enough of
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        if self.path == '/api/tags':
+            self._send_json({'models': [{'name': 'llama3.2:3b'}]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if self.path != '/api/generate':
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        with self.server.lock:
+            self.server.requests += 1
+        if random.random() < self.server.failure_rate:
+            self._send_json({'error': 'model is overloaded'}, 503)
+            return
+
+        server = self.server
+        with server.slots:
+            start = time.perf_counter()
+            prompt = body.get('system', '') + '\n' + body.get('prompt', '')
+            slot, cached = self._take_slot(prompt)
+            try:
+                # Prompt evaluation of the uncached tokens, then output tokens at a steady rate
+                prompt_tokens = (len(prompt) - cached) // CHARS_PER_TOKEN + 1
+                time.sleep(server.latency + random.uniform(0, server.latency_jitter) + (prompt_tokens / server.prompt_tokens_per_second
+                                             if server.prompt_tokens_per_second else 0))
+                completion = completion_for(body, server.malformed_rate)
+                timings = {'prompt_eval_count': prompt_tokens,
+                           'prompt_eval_duration': int((time.perf_counter() - start) * 1e9),
+                           'eval_count': len(completion) // CHARS_PER_TOKEN}
+                self._generate(body, completion, timings, start)
+            finally:
+                with server.lock:
+                    server.slot_prompts[slot] = prompt
+
+    def _take_slot(self, prompt: str):
+        """Free slot whose cached prompt shares the longest prefix with prompt,
+        and that prefix's length"""
+        with self.server.lock:
+            free = [i for i, cached in enumerate(self.server.slot_prompts) if cached is not None]
+            best = max(free, key=lambda i: len(os.path.commonprefix([self.server.slot_prompts[i], prompt])))
+            cached = len(os.path.commonprefix([self.server.slot_prompts[best], prompt]))
+            self.server.slot_prompts[best] = None
+            return best, cached
+
+    def _generate(self, body, completion, timings, start):
+        server = self.server
+        chunk_size = CHARS_PER_TOKEN
+        delay = 1 / server.tokens_per_second if server.tokens_per_second else 0
+        if not body.get('stream', True):
+            time.sleep(delay * len(completion) / chunk_size)
+            self._send_json({'model': body.get('model'), 'response': completion, 'done': True,
+                             'total_duration': int((time.perf_counter() - start) * 1e9), **timings})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for offset in range(0, len(completion), chunk_size):
+            time.sleep(delay)
+            self._send_chunk({'model': body.get('model'), 'response': completion[offset:offset + chunk_size],
+                              'done': False})
+        self._send_chunk({'model': body.get('model'), 'response': '', 'done': True,
+                          'total_duration': int((time.perf_counter() - start) * 1e9), **timings})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_chunk(self, data):
+        line = (json.dumps(data) + "\n").encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+    def _send_json(self, data, status: int = 200):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub(port: int = 0, **options) -> StubOllama:
+    """Run a stub on a background thread (port 0 picks a free port)"""
+    server = StubOllama(('127.0.0.1', port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Ollama server for load tests")
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--latency', type=float, default=1.0, help="Seconds before the first token")
+    parser.add_argument('--tokens-per-second', type=float, default=50)
+    parser.add_argument('--slots', type=int, default=2, help="Generations served at once")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of requests answered with a 503")
+    parser.add_argument('--prompt-tokens-per-second', type=float, default=0,
+                        help="Prompt evaluation speed for uncached tokens (0: free)")
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help="Share of responses cut off mid-JSON")
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    args = parser.parse_args()
+
+    server = StubOllama(('0.0.0.0', args.port), args.latency, args.tokens_per_second, args.slots,
+                        args.failure_rate, args.prompt_tokens_per_second, args.malformed_rate,
+                        args.latency_jitter)
+    print(f"Stub Ollama listening on http://localhost:{args.port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
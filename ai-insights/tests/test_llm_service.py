@@ -0,0 +1,85 @@
+import json
+
+from llm_service import FinancialInsightsAI
+from structured_output import SCHEMAS, missing_sections
+
+HIGHLIGHTS = {
+    "bestPerformer": "NVDA carried you",
+    "worstPerformer": "INTC, again",
+    "diversificationAlert": "80% tech",
+    "riskAssessment": "Spicy",
+}
+
+class FakeClient:
+    """Returns the queued responses in order, as Ollama's non-streaming generate would"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def generate(self, request, deadline=None):
+        self.requests.append(request)
+        if not self.responses:
+            raise ConnectionError("no more responses")
+        return {'response': json.dumps(self.responses.pop(0))}
+
+def investment_ai(*responses):
+    return FinancialInsightsAI(client=FakeClient(*responses), repair_attempts=1)
+
+def test_partial_investment_response_is_repaired():
+    repair = {
+        "stockInsights": [{"symbol": "NVDA", "insight": "Up 80%", "suggestion": "Trim", "performance": "positive"}],
+        "portfolioAnalysis": [{"type": "risk", "message": "Concentrated", "actionable": "Diversify"}],
+        "funFacts": ["You own a lot of chips"],
+        "actionableRecommendations": [{"roast": "All in", "recommendation": "Rebalance", "impact": "Less risk"}],
+    }
+    ai = investment_ai({"portfolioHighlights": HIGHLIGHTS}, repair)
+
+    insights, complete = ai._call_ollama_checked("prompt", 'investment')
+
+    assert complete
+    assert insights == {"portfolioHighlights": HIGHLIGHTS, **repair}
+    assert "Respond with only these sections" in ai.client.requests[1]['prompt']
+
+def test_unrepaired_investment_response_uses_investment_fallback():
+    ai = investment_ai({"portfolioHighlights": HIGHLIGHTS})
+
+    insights, complete = ai._call_ollama_checked("prompt", 'investment')
+
+    assert not complete
+    assert insights["portfolioHighlights"] == HIGHLIGHTS
+    assert set(insights) == set(SCHEMAS['investment']['properties'])
+    assert missing_sections('investment', insights) == []
+
+def test_streamed_investment_fallback_has_investment_sections():
+    ai = investment_ai()
+    ai._stream_ollama = lambda prompt, kind: iter([json.dumps({"portfolioHighlights": HIGHLIGHTS})])
+
+    done = list(ai._stream('investment', {}, "prompt"))[-1]
+
+    assert done['fallback']
+    assert set(done['insights']) == set(SCHEMAS['investment']['properties'])
+    assert done['insights']["portfolioHighlights"] == HIGHLIGHTS
+
+def test_fallback_covers_each_schema():
+    ai = investment_ai()
+    for kind in ('insights', 'investment'):
+        fallback = ai._create_fallback_insights("", kind)
+        assert set(fallback) == set(SCHEMAS[kind]['properties'])
+        assert missing_sections(kind, fallback) == []
+
+def test_trimmed_investment_prompt_reports_the_listed_concentration():
+    investments = [{'symbol': f"S{i:02d}", 'shares': 10, 'currentPrice': 100 + i, 'totalValue': (100 + i) * 10,
+                    'totalGainLossPercent': i - 10, 'dayChange': 0.5, 'dayChangePercent': 0.4}
+                   for i in range(20)]
+    ai = FinancialInsightsAI(client=FakeClient(), token_budget=120)
+
+    _, prompt = ai._investment_request({'investments': investments, 'portfolioSummary': {'investmentCount': 20}})
+
+    weights = [float(line.split('% of portfolio')[0].rsplit(', ', 1)[1])
+               for line in prompt.splitlines() if '% of portfolio' in line]
+    concentration = next(line for line in prompt.splitlines() if line.startswith('Concentration'))
+    assert 0 < len(weights) < 5
+    assert concentration.startswith(f"Concentration: largest {len(weights)} = ")
+    printed = float(concentration.split(' = ')[1].split('%')[0])
+    assert abs(printed - sum(weights)) <= 0.1 * len(weights)
@@ -0,0 +1,89 @@
+"""
+Batch statement processing
+Fans statements out across a process pool, yields per-file results as they
+finish and aggregates a combined summary without aborting on failures
+"""
+
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from pdf_processor import BankStatementProcessor, StatementSummary
+from layout_registry import load_registry
+
+# One statement to process: (name, file path or raw bytes)
+BatchItem = Tuple[str, Union[str, bytes]]
+
+# Processor held by each batch worker process (set by _init_batch_worker)
+_batch_processor = None
+
+def _init_batch_worker(layouts_file: Optional[str] = None):
+    global _batch_processor
+    # Statements are already spread across processes, so extract pages serially
+    _batch_processor = BankStatementProcessor(workers=1, layouts=load_registry(layouts_file))
+
+def _process_item(index: int, item: BatchItem) -> Dict[str, Any]:
+    """Process one statement in a worker, reporting failures instead of raising"""
+    name, source = item
+    start = time.perf_counter()
+    try:
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                result = _batch_processor.process_pdf(f)
+        else:
+            result = _batch_processor.process_pdf(source)
+    except Exception as e:
+        result = {'success': False, 'error': str(e), 'transactions': []}
+    return {'type': 'file', 'index': index, 'file': name, 'seconds': time.perf_counter() - start, **result}
+
+def expand_paths(pattern: str) -> List[str]:
+    """Statement files for a directory (its *.pdf files) or a glob pattern"""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.pdf')
+    return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+
+def iter_batch(items: Iterable[BatchItem], jobs: Optional[int] = None,
+               layouts_file: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Yield a 'file' event per statement in completion order, then a 'batch_summary' event.
+    Events carry the statement's position in items, since names may repeat"""
+    items = list(items)
+    start = time.perf_counter()
+    summary = StatementSummary()
+    seconds: List[Optional[float]] = [None] * len(items)
+    failures = []
+
+    if items:
+        jobs = min(jobs or os.cpu_count() or 1, len(items))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_batch_worker,
+                                 initargs=(layouts_file,)) as executor:
+            futures = {executor.submit(_process_item, index, item): index for index, item in enumerate(items)}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker itself died (e.g. out of memory); report and carry on
+                    result = {'type': 'file', 'index': index, 'file': items[index][0], 'success': False,
+                              'error': str(e), 'transactions': [], 'seconds': None}
+                seconds[index] = result['seconds']
+                if result['success']:
+                    for transaction in result['transactions']:
+                        summary.add(transaction)
+                else:
+                    failures.append({'index': index, 'file': result['file'], 'error': result['error']})
+                yield result
+
+    yield {
+        'type': 'batch_summary',
+        'success': not failures,
+        'files': len(items),
+        'succeeded': len(items) - len(failures),
+        'failed': len(failures),
+        'failures': failures,
+        'summary': summary.to_dict(),
+        'timings': [{'index': index, 'file': item[0], 'seconds': seconds[index]}
+                    for index, item in enumerate(items)],
+        'seconds': time.perf_counter() - start
+    }
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-statement date parsing vs the original try/except format loop
+Usage: python benchmarks/bench_date_parser.py [--lines 20000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from date_parser import StatementDateParser, resolve_dates
+
+# Statement formats, from cheapest to most expensive for the legacy loop
+STATEMENT_FORMATS = ['%m/%d/%Y', '%d/%m/%Y', '%d-%m-%y', '%m-%d']
+
+def legacy_parse_date(date_str):
+    """The original BankStatementProcessor.parse_date loop"""
+    date_formats = [
+        '%m/%d/%Y', '%m-%d-%Y', '%m/%d/%y', '%m-%d-%y',
+        '%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y',
+        '%Y-%m-%d', '%Y/%m/%d', '%m/%d', '%m-%d'
+    ]
+    for fmt in date_formats:
+        try:
+            parsed_date = datetime.strptime(date_str, fmt)
+            if parsed_date.year == 1900:
+                parsed_date = parsed_date.replace(year=2024)
+            return parsed_date
+        except ValueError:
+            continue
+    return None
+
+def statement_dates(lines, fmt, seed=3):
+    """Raw date strings for a statement of the given length, a few rows per
+    day, and the dates they stand for"""
+    rng = random.Random(seed)
+    day = date(2024, 1, 1)
+    dates, truth = [], []
+    for _ in range(lines):
+        if rng.random() < 0.3:
+            day += timedelta(days=1)
+        dates.append(day.strftime(fmt))
+        truth.append(datetime(day.year, day.month, day.day))
+    return dates, truth
+
+def timed(fn, dates):
+    start = time.perf_counter()
+    results = fn(dates)
+    return time.perf_counter() - start, results
+
+def legacy_parse_all(dates):
+    return [legacy_parse_date(d) for d in dates]
+
+def pinned_parse_all(dates):
+    """A statement's dates as the processor reads them, re-dating the samples"""
+    parser = StatementDateParser()
+    return [row[0] for row in resolve_dates(((parser.parse(d),) for d in dates), parser)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark statement date parsing")
+    parser.add_argument('--lines', type=int, default=20000)
+    args = parser.parse_args()
+
+    # "correct" is the share of dates read as the day they stand for
+    print(f"{'format':>10} {'legacy/s':>12} {'pinned/s':>12} {'speedup':>8} {'legacy ok':>10} {'pinned ok':>10}")
+    for fmt in STATEMENT_FORMATS:
+        dates, truth = statement_dates(args.lines, fmt)
+        legacy_time, legacy = timed(legacy_parse_all, dates)
+        pinned_time, pinned = timed(pinned_parse_all, dates)
+        legacy_ok = sum(a == b for a, b in zip(legacy, truth)) / len(dates)
+        pinned_ok = sum(a == b for a, b in zip(pinned, truth)) / len(dates)
+        print(f"{fmt:>10} {args.lines / legacy_time:>12,.0f} {args.lines / pinned_time:>12,.0f} "
+              f"{legacy_time / pinned_time:>7.1f}x {legacy_ok:>10.1%} {pinned_ok:>10.1%}")
+
+if __name__ == "__main__":
+    main()
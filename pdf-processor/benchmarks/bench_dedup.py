@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: dedup index lookups as an account's stored transactions grow
+Fills an on-disk DedupIndex with an account's history, then times an upload
+that half overlaps it (the rows already seen plus as many new ones) the way
+the service handles it: apply checks the upload, then the client records
+the returned rows as it stores them. Per-row time should stay flat from thousands to millions of stored
+transactions; also reports the index size per stored row.
+Usage: python benchmarks/bench_dedup.py [--sizes 10000 100000 1000000] [--upload 1000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup_index import DedupIndex, fingerprints, parse_token
+from synthetic import DESCRIPTIONS
+
+# Transactions recorded per record call while filling the index
+FILL_CHUNK = 50000
+
+def synthetic_transactions(count, seed=5):
+    """Transactions in the process_pdf format, about 20 per day"""
+    rng = random.Random(seed)
+    start = date(2000, 1, 1)
+    return [
+        {'date': (start + timedelta(days=i // 20)).isoformat(), 'description': description,
+         'amount': round(rng.uniform(-1500, 1500), 2), 'merchant': description, 'category': 'Other'}
+        for i, description in enumerate(rng.choice(DESCRIPTIONS) for _ in range(count))
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cross-statement dedup index")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--upload', type=int, default=1000, help="Rows per upload, half already seen")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'stored':>10} {'fill s':>8} {'upload ms':>10} {'us/row':>8} {'bytes/row':>10}   (best of {args.repeat})")
+    for size in args.sizes:
+        history = synthetic_transactions(size + args.upload * args.repeat)
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'dedup.sqlite3')
+            index = DedupIndex(db_path)
+            start = time.perf_counter()
+            for offset in range(0, size, FILL_CHUNK):
+                index.record('account', fingerprints(history[offset:min(size, offset + FILL_CHUNK)]))
+            fill_seconds = time.perf_counter() - start
+
+            best = float('inf')
+            half = args.upload // 2
+            for round_number in range(args.repeat):
+                # Half the upload overlaps stored history, half is new (and becomes stored)
+                new_start = size + round_number * half
+                upload = history[new_start - half:new_start + half]
+                start = time.perf_counter()
+                result = index.apply('account', {'success': True, 'transactions': upload})
+                recorded = index.record('account', [parse_token(token) for token in result['dedup']['fingerprints']])
+                best = min(best, time.perf_counter() - start)
+                assert len(recorded) == half
+            index.db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            bytes_per_row = os.path.getsize(db_path) / size
+            index.db.close()
+        print(f"{size:>10} {fill_seconds:>8.2f} {best * 1000:>10.2f} {best / args.upload * 1e6:>8.2f} "
+              f"{bytes_per_row:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold import time of the server and the CLI, from python -X importtime
+Each target is imported in a fresh interpreter several times; the median
+cumulative import time is compared against a budget and the slowest imports
+are listed. Exits 1 when any target is over budget, so it can gate CI.
+Usage: python benchmarks/bench_import_time.py [--runs 5] [--server-budget-ms 400] [--cli-budget-ms 150]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+PROCESSOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 'import time: self [us] | cumulative | imported package', nested by indentation
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)$')
+
+def import_profile(module):
+    """(cumulative microseconds of module, {imported module: self microseconds})"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROCESSOR_DIR, capture_output=True, text=True, check=True
+    )
+    total = None
+    self_times = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        self_times[name] = int(self_us)
+        if name == module:
+            total = int(cumulative_us)
+    return total, self_times
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget check")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--server-budget-ms', type=float, default=400,
+                        help="Budget for importing server (Flask plus the processor)")
+    parser.add_argument('--cli-budget-ms', type=float, default=150,
+                        help="Budget for importing pdf_processor (what the CLI loads before parsing)")
+    parser.add_argument('--top', type=int, default=8, help="Slowest imports to list per target")
+    args = parser.parse_args()
+
+    over_budget = False
+    for module, budget_ms in (('server', args.server_budget_ms), ('pdf_processor', args.cli_budget_ms)):
+        totals = []
+        self_times = {}
+        for _ in range(args.runs):
+            total, run_self_times = import_profile(module)
+            totals.append(total / 1000)
+            for name, self_us in run_self_times.items():
+                self_times.setdefault(name, []).append(self_us)
+        median_ms = statistics.median(totals)
+        status = 'ok' if median_ms <= budget_ms else 'OVER BUDGET'
+        over_budget = over_budget or median_ms > budget_ms
+        print(f"{module}: median {median_ms:.1f} ms over {args.runs} runs "
+              f"(min {min(totals):.1f}, max {max(totals):.1f}), budget {budget_ms:.0f} ms: {status}")
+
+        slowest = sorted(self_times.items(), key=lambda item: -statistics.median(item[1]))[:args.top]
+        for name, times in slowest:
+            print(f"    {statistics.median(times) / 1000:8.1f} ms  {name}")
+
+        heavy = [name for name in ('pdfplumber', 'pandas', 'numpy') if name in self_times]
+        if heavy:
+            print(f"    note: imports {', '.join(heavy)} eagerly")
+
+    sys.exit(1 if over_budget else 0)
+
+if __name__ == "__main__":
+    main()
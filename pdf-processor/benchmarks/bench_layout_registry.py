@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: layout-registry path vs the generic text and table parsers
+Profiles buy accuracy (pinned columns, date format and sign), not speed:
+matched statements should score 100% in about the generic table parser's
+time, and a registry miss should cost little over no registry at all.
+Also reports registry load time (cold and cached)
+Usage: python benchmarks/bench_layout_registry.py [--pages 10]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_processor import BankStatementProcessor
+from layout_registry import load_registry
+from synthetic import LAYOUTS, layout_statement
+from bench_table_extraction import score
+
+LAYOUTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'layouts.json')
+
+def timed(processor, pdf_data, truth, repeat, **options):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = processor.process_pdf(pdf_data, **options)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    precision, recall = score(result['transactions'], truth)
+    return best, precision, recall, result['metadata'].get('layout', '-')
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the layout registry path")
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    registry = load_registry(LAYOUTS_FILE)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(1000):
+        load_registry(LAYOUTS_FILE)
+    warm = (time.perf_counter() - start) / 1000
+    print(f"registry: {len(registry)} profiles, cold load {cold * 1000:.2f} ms, cached load {warm * 1e6:.1f} us")
+
+    # A registry that knows only the first layout, so the others miss
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        with open(LAYOUTS_FILE) as source:
+            json.dump({'layouts': json.load(source)['layouts'][:1]}, f)
+    partial = load_registry(f.name)
+    os.unlink(f.name)
+
+    runs = [
+        ('text', BankStatementProcessor(), {'extraction': 'text'}),
+        ('table', BankStatementProcessor(), {'extraction': 'table'}),
+        ('registry', BankStatementProcessor(layouts=registry), {'extraction': 'table'}),
+        ('miss', BankStatementProcessor(layouts=partial), {'extraction': 'table'}),
+        ('miss text', BankStatementProcessor(layouts=partial), {'extraction': 'text'}),
+    ]
+    print(f"{args.pages} transaction pages + 2 non-table pages per statement, best of {args.repeat}")
+    print(f"{'layout':>13} {'path':>9} {'seconds':>8} {'precision':>10} {'recall':>7}  profile")
+    for layout in LAYOUTS:
+        pdf_data, truth = layout_statement(layout, args.pages)
+        for name, processor, options in runs:
+            elapsed, precision, recall, profile = timed(processor, pdf_data, truth, args.repeat, **options)
+            print(f"{layout:>13} {name:>9} {elapsed:>8.3f} {precision:>10.1%} {recall:>7.1%}  {profile}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark: compiled line classifier vs the original per-line regex/keyword scans
+Checks that both produce identical transactions on the same synthetic lines
+Usage: python benchmarks/bench_line_classifier.py [--lines 100000]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_processor import BankStatementProcessor
+from synthetic import transaction_lines
+
+NOISE_LINES = [
+    'Date Description Withdrawal Deposit Balance',
+    'Account Summary for 01/01/2024 - 01/31/2024',
+    'Beginning Balance $2,500.00',
+    'Thank you for banking with us!',
+    '$45.00 STARBUCKS on 03/04',
+    'Online Payment 3-15 $120.00 Confirmation 555',
+    'Interest Earned 12/31/23 $0.42',
+    '',
+]
+
+class LegacyParser(BankStatementProcessor):
+    """The pre-classifier line handling, kept verbatim as the reference"""
+
+    def legacy_lines(self, lines):
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if re.search(self.date_pattern, line) and re.search(self.amount_pattern, line):
+                if any(word in line.lower() for word in ['date', 'description', 'withdrawal', 'balance']):
+                    continue
+                transaction = self.legacy_parse_line(line)
+                if transaction:
+                    yield transaction
+
+    def legacy_parse_line(self, line):
+        date_match = re.search(self.date_pattern, line)
+        if not date_match:
+            return None
+        date_str = date_match.group()
+        amount_matches = re.findall(self.amount_pattern, line)
+        if not amount_matches:
+            return None
+        amount_str = amount_matches[0]
+        amount = float(amount_str.replace(',', ''))
+        withdrawal_keywords = ['bill', 'withdrawal', 'debit', 'payment', 'rent', 'electric', 'phone', 'internet', 'tax', 'purchase', 'buy', 'spent', 'fee', 'charge', 'starbucks', 'amazon', 'target', 'spotify', 'gas', 'meijer', 'venmo', 'apple', 'store', 'subscription', 'transfer', 'groceries', 'supplies', 'textbooks', 'campus', 'coffee', 'restaurant', 'food', 'shopping']
+        is_withdrawal = any(keyword in line.lower() for keyword in withdrawal_keywords)
+        amount = -abs(amount) if is_withdrawal else abs(amount)
+        date_end = date_match.end()
+        amount_start = line.find('$' + amount_str)
+        description = line[date_end:amount_start].strip()
+        date = self.parse_date(date_str)
+        if not date:
+            return None
+        transaction_type = 'debit' if amount < 0 else 'credit'
+        category = self.legacy_categorize(description)
+        return {
+            'date': date.strftime('%Y-%m-%d'),
+            'description': description,
+            'amount': amount,
+            'merchant': description,
+            'category': category,
+            'transactionType': transaction_type
+        }
+
+    def legacy_categorize(self, description):
+        desc_lower = description.lower()
+        if any(keyword in desc_lower for keyword in ['rent', 'electric', 'phone', 'internet', 'utilities']):
+            return 'Utilities'
+        elif any(keyword in desc_lower for keyword in ['bill', 'payment']):
+            return 'Bills'
+        elif any(keyword in desc_lower for keyword in ['deposit', 'salary', 'payroll']):
+            return 'Income'
+        elif any(keyword in desc_lower for keyword in ['interest', 'earned']):
+            return 'Interest'
+        elif any(keyword in desc_lower for keyword in ['tax', 'withholding']):
+            return 'Taxes'
+        elif any(keyword in desc_lower for keyword in ['check', 'payment']):
+            return 'Income'
+        else:
+            return 'Other'
+
+def synthetic_lines(count: int, seed: int = 7):
+    """Transaction rows mixed with headers, noise and edge-case layouts"""
+    rng = random.Random(seed)
+    lines = transaction_lines(count, seed)
+    for i in range(0, count, 5):
+        lines[i] = rng.choice(NOISE_LINES)
+    return lines
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compiled line classifier")
+    parser.add_argument('--lines', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    lines = synthetic_lines(args.lines)
+    processor = LegacyParser()
+
+    legacy_time, legacy = best_of(args.repeat, lambda: list(processor.legacy_lines(lines)))
+    compiled_time, compiled = best_of(args.repeat, lambda: list(processor.iter_transactions(["\n".join(lines)])))
+
+    assert compiled == legacy, "compiled classifier output differs from legacy parser"
+    print(f"{args.lines:,} lines, {len(compiled):,} transactions (outputs identical)")
+    print(f"legacy:   {legacy_time:.3f}s  {args.lines / legacy_time:>10,.0f} lines/s")
+    print(f"compiled: {compiled_time:.3f}s  {args.lines / compiled_time:>10,.0f} lines/s")
+    print(f"speedup:  {legacy_time / compiled_time:.2f}x")
+
+if __name__ == "__main__":
+    main()
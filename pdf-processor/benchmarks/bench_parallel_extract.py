@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Benchmark: page extraction throughput vs worker count
+Usage: python benchmarks/bench_parallel_extract.py [--pages 40] [--workers 1,2,4,8]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_processor import BankStatementProcessor
+from synthetic import statement_pdf
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel PDF page extraction")
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--workers', default='1,2,4,8')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pdf_data = statement_pdf(args.pages)
+    processor = BankStatementProcessor()
+    baseline_text = processor.extract_text_from_pdf(pdf_data, workers=1)
+
+    print(f"{args.pages}-page statement, {len(pdf_data):,} bytes, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'best s':>8} {'pages/s':>9} {'speedup':>8}")
+    serial_best = None
+    for workers in (int(w) for w in args.workers.split(',')):
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            text = processor.extract_text_from_pdf(pdf_data, workers=workers)
+            timings.append(time.perf_counter() - start)
+            assert text == baseline_text, f"page order mismatch with {workers} workers"
+        best = min(timings)
+        serial_best = serial_best or best
+        print(f"{workers:>8} {best:>8.3f} {args.pages / best:>9.1f} {serial_best / best:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Benchmark: positional table extraction vs the text regex path on multi-layout statements
+Reports parse time and precision/recall of (date, signed amount) against ground truth
+Usage: python benchmarks/bench_table_extraction.py [--pages 10]
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_processor import BankStatementProcessor
+from synthetic import LAYOUTS, layout_statement
+
+def score(transactions, truth):
+    """Precision and recall of (date, amount) pairs, counting duplicates"""
+    found = Counter((t['date'], t['amount']) for t in transactions)
+    expected = Counter(truth)
+    matched = sum((found & expected).values())
+    precision = matched / sum(found.values()) if found else 0.0
+    return precision, matched / len(truth)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark table-aware extraction")
+    parser.add_argument('--pages', type=int, default=10)
+    args = parser.parse_args()
+
+    processor = BankStatementProcessor()
+    print(f"{args.pages} transaction pages + 2 non-table pages per statement")
+    print(f"{'layout':>13} {'mode':>6} {'seconds':>8} {'rows':>6} {'precision':>10} {'recall':>7}")
+    for layout in LAYOUTS:
+        pdf_data, truth = layout_statement(layout, args.pages)
+        for mode in ('text', 'table'):
+            start = time.perf_counter()
+            result = processor.process_pdf(pdf_data, extraction=mode)
+            elapsed = time.perf_counter() - start
+            precision, recall = score(result['transactions'], truth)
+            print(f"{layout:>13} {mode:>6} {elapsed:>8.3f} {len(result['transactions']):>6} "
+                  f"{precision:>10.1%} {recall:>7.1%}")
+
+if __name__ == "__main__":
+    main()
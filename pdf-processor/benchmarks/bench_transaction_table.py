@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: columnar TransactionTable vs the original list-of-dicts summary passes
+Usage: python benchmarks/bench_transaction_table.py [--rows 1000000]
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_processor import BankStatementProcessor
+from synthetic import DESCRIPTIONS
+from transaction_table import TransactionTable
+
+CATEGORIES = ['Utilities', 'Bills', 'Income', 'Interest', 'Taxes', 'Other']
+
+def synthetic_rows(count, seed=11):
+    """Parser rows: (date, description, amount, is_withdrawal, category)"""
+    rng = random.Random(seed)
+    start = datetime(2023, 1, 1)
+    return [
+        (start + timedelta(days=rng.randint(0, 729)), rng.choice(DESCRIPTIONS),
+         round(rng.uniform(1, 1500), 2), rng.random() < 0.7, rng.choice(CATEGORIES))
+        for _ in range(count)
+    ]
+
+def legacy_summary(transactions):
+    """The original process_pdf summary passes over a list of dicts"""
+    total_income = sum(t['amount'] for t in transactions if t['amount'] > 0)
+    total_expenses = sum(abs(t['amount']) for t in transactions if t['amount'] < 0)
+    merchants = list(set(t['merchant'] for t in transactions if t['merchant']))
+    categories = {}
+    for transaction in transactions:
+        category = transaction['category']
+        if category not in categories:
+            categories[category] = 0
+        categories[category] += abs(transaction['amount'])
+    return {
+        'totalTransactions': len(transactions),
+        'totalIncome': total_income,
+        'totalExpenses': total_expenses,
+        'netFlow': total_income - total_expenses,
+        'uniqueMerchants': len(merchants),
+        'categories': categories
+    }
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark columnar transaction summaries")
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    processor = BankStatementProcessor()
+
+    build_dicts, transactions = timed(lambda: [processor._row_to_transaction(row) for row in rows])
+    summarize_dicts, legacy = timed(lambda: legacy_summary(transactions))
+    build_table, table = timed(lambda: TransactionTable.from_rows(rows))
+    summarize_table, summary = timed(table.summary)
+
+    for key, value in legacy.items():
+        if key == 'categories':
+            assert all(math.isclose(value[c], summary[key][c], rel_tol=1e-9) for c in value), key
+        else:
+            assert math.isclose(value, summary[key], rel_tol=1e-9), key
+
+    print(f"{args.rows:,} rows (legacy summary fields agree to 1e-9)")
+    print(f"{'':>16} {'build s':>8} {'summary s':>10} {'total s':>8}")
+    print(f"{'list of dicts':>16} {build_dicts:>8.2f} {summarize_dicts:>10.2f} {build_dicts + summarize_dicts:>8.2f}")
+    print(f"{'columnar':>16} {build_table:>8.2f} {summarize_table:>10.2f} {build_table + summarize_table:>8.2f}")
+    print(f"summary speedup: {summarize_dicts / summarize_table:.1f}x "
+          f"(columnar also computes {len(summary['monthlyTotals'])} monthly and "
+          f"{len(summary['merchantTotals'])} merchant totals)")
+
+if __name__ == "__main__":
+    main()
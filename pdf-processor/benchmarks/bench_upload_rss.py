@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: server peak RSS for base64 JSON vs raw application/pdf vs multipart uploads
+Starts a fresh server.py per upload mode and reads its VmHWM from /proc (Linux only)
+Usage: python benchmarks/bench_upload_rss.py [--size-mb 20]
+"""
+
+import argparse
+import base64
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, SERVICE_DIR)
+
+from synthetic import statement_pdf
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def start_server(port: int) -> subprocess.Popen:
+    env = dict(os.environ, PORT=str(port), PDF_MAX_UPLOAD_BYTES=str(200 * 1024 * 1024))
+    server = subprocess.Popen([sys.executable, 'server.py'], cwd=SERVICE_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+def multipart_body(pdf_data: bytes):
+    boundary = 'statement-boundary'
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"s.pdf\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n").encode() + pdf_data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark upload peak RSS")
+    parser.add_argument('--size-mb', type=float, default=20)
+    parser.add_argument('--pages', type=int, default=4)
+    args = parser.parse_args()
+
+    pdf_data = statement_pdf(args.pages, padding=int(args.size_mb * 1024 * 1024))
+    modes = {
+        'base64 json': (json.dumps({'pdfData': base64.b64encode(pdf_data).decode()}).encode(), 'application/json'),
+        'application/pdf': (pdf_data, 'application/pdf'),
+        'multipart': multipart_body(pdf_data),
+    }
+
+    print(f"statement: {len(pdf_data) / 1024 / 1024:.1f} MB, {args.pages} pages")
+    print(f"{'mode':>16} {'body MB':>8} {'idle MB':>8} {'peak MB':>8} {'delta MB':>9} {'seconds':>8}")
+    for mode, (body, content_type) in modes.items():
+        port = free_port()
+        server = start_server(port)
+        try:
+            idle = peak_rss_mb(server.pid)
+            request = urllib.request.Request(f"http://127.0.0.1:{port}/process-pdf", data=body,
+                                             headers={'Content-Type': content_type})
+            start = time.perf_counter()
+            with urllib.request.urlopen(request, timeout=600) as response:
+                result = json.load(response)
+            elapsed = time.perf_counter() - start
+            assert result['success'], result
+            peak = peak_rss_mb(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{mode:>16} {len(body) / 1024 / 1024:>8.1f} {idle:>8.1f} {peak:>8.1f} {peak - idle:>9.1f} {elapsed:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Load test for the PDF processing and AI insights services
+Runs a fixed number of concurrent clients against one endpoint for a fixed
+duration and reports requests/second and p50/p90/p99 latency
+Usage:
+    python benchmarks/loadtest.py --service pdf --url http://localhost:5001
+    python benchmarks/loadtest.py --service insights --url http://localhost:5001
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import statement_pdf
+
+# Spending data shaped like the dashboard's /generate-insights request
+INSIGHTS_PAYLOAD = {
+    'totalIncome': 3200, 'totalSpending': 2750.5, 'netFlow': 449.5, 'currentBalance': 1830.25,
+    'spendingByCategory': [
+        {'category': 'Food & Dining', 'amount': 640.2}, {'category': 'Shopping', 'amount': 410},
+        {'category': 'Transportation', 'amount': 220.75}, {'category': 'Bills & Utilities', 'amount': 980},
+    ],
+    'topMerchants': [
+        {'merchant': 'STARBUCKS', 'totalAmount': 84.5, 'count': 17},
+        {'merchant': 'AMAZON', 'totalAmount': 310.99, 'count': 6},
+    ],
+    'goals': [{'title': 'Laptop', 'currentAmount': 450, 'targetAmount': 1500, 'isActive': True}],
+    'monthlyTrend': [{'month': '2024-01', 'amount': 2500}, {'month': '2024-02', 'amount': 2750.5}],
+}
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def build_request(args):
+    """(path, body factory, headers) for the selected service"""
+    if args.service == 'pdf':
+        pdf_data = statement_pdf(args.pages)
+        counter = iter(range(1 << 62))
+        lock = threading.Lock()
+
+        def body():
+            if not args.unique:
+                return pdf_data
+            # Bytes after %%EOF are ignored by PDF readers but change the content
+            # hash, so every request misses the result cache
+            with lock:
+                n = next(counter)
+            return pdf_data + b'%' + str(n).encode() + b'\n'
+
+        return '/process-pdf', body, {'Content-Type': 'application/pdf'}
+
+    payload = json.dumps(INSIGHTS_PAYLOAD).encode()
+    return '/generate-insights', lambda: payload, {'Content-Type': 'application/json'}
+
+def client(url, body, headers, deadline, latencies, statuses, lock):
+    session = requests.Session()
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            status = session.post(url, data=body(), headers=headers, timeout=120).status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] += 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test a Cashly Python service")
+    parser.add_argument('--service', choices=('pdf', 'insights'), default='pdf')
+    parser.add_argument('--url', default='http://localhost:5001', help="Service base URL")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent clients")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to run")
+    parser.add_argument('--pages', type=int, default=5, help="Pages per statement (pdf service)")
+    parser.add_argument('--no-unique', dest='unique', action='store_false',
+                        help="Send identical statements, so repeats hit the result cache")
+    args = parser.parse_args()
+
+    path, body, headers = build_request(args)
+    url = args.url.rstrip('/') + path
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(url, body, headers, deadline, latencies, statuses, lock))
+               for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{url}: {args.concurrency} clients for {elapsed:.1f}s")
+    print(f"requests {len(latencies)}  req/s {len(latencies) / elapsed:.1f}  "
+          f"statuses {dict(statuses)}")
+    print(f"latency p50 {percentile(latencies, 0.50) * 1000:.1f} ms  "
+          f"p90 {percentile(latencies, 0.90) * 1000:.1f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms  "
+          f"max {latencies[-1] * 1000 if latencies else 0:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: the parser's hot paths on synthetic statements, with baselines
+Each case is called in calibrated rounds (enough iterations per round to run
+for at least --min-time) and reports per-call min/median/mean/stddev, in the
+manner of pytest-benchmark. Results can be saved as a named baseline in
+benchmarks/baselines/ and later runs compared against one; the comparison
+exits 1 when any case's median regresses by more than --threshold.
+
+Usage:
+    python benchmarks/suite.py [-k parse] [--save NAME] [--compare NAME] [--threshold 0.15]
+    python benchmarks/suite.py --diff OLD.json NEW.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from line_classifier import HEADER_WORDS
+from pdf_processor import BankStatementProcessor
+from synthetic import StatementSpec, build_pdf, generate_statement
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+# Statements shared by the cases: a short PDF for pdfplumber-bound paths, and
+# a long noisy text statement for the pure-Python parser paths
+PDF_SPEC = StatementSpec(pages=5, noise=0.1)
+TEXT_SPEC = StatementSpec(pages=40, noise=0.1, amount_formats=('dollar', 'plain'))
+
+CASES: List[Tuple[str, Callable[[], Callable[[], Any]]]] = []
+
+def case(name: str):
+    """Register a benchmark; the decorated function does the setup and returns
+    the callable to time"""
+    def register(setup):
+        CASES.append((name, setup))
+        return setup
+    return register
+
+def _statement(spec: StatementSpec):
+    pages, rows = generate_statement(spec)
+    text = "\n".join(line for page in pages for line in page) + "\n"
+    return pages, rows, text
+
+@case('extract_text_from_pdf[pdf-5p]')
+def bench_extract_pdf():
+    processor = BankStatementProcessor()
+    pages, _, _ = _statement(PDF_SPEC)
+    pdf = build_pdf(pages)
+    return lambda: processor.extract_text_from_pdf(pdf)
+
+@case('extract_text_from_pdf[text-40p]')
+def bench_extract_text():
+    processor = BankStatementProcessor()
+    data = _statement(TEXT_SPEC)[2].encode()
+    return lambda: processor.extract_text_from_pdf(data)
+
+@case('parse_line[x1000]')
+def bench_parse_line():
+    processor = BankStatementProcessor()
+    lines = [line for page in _statement(TEXT_SPEC)[0] for line in page][:1000]
+    return lambda: [processor.parse_line(line) for line in lines]
+
+@case('parse_date[x1000]')
+def bench_parse_date():
+    processor = BankStatementProcessor()
+    dates = [row['line'].split(' ', 1)[0] for row in _statement(TEXT_SPEC)[1]][:1000]
+    return lambda: [processor.parse_date(date_str) for date_str in dates]
+
+@case('categorize_transaction[x1000]')
+def bench_categorize():
+    processor = BankStatementProcessor()
+    descriptions = [row['description'] for row in _statement(TEXT_SPEC)[1]][:1000]
+    return lambda: [processor.categorize_transaction(description) for description in descriptions]
+
+@case('process_pdf[pdf-5p]')
+def bench_process_pdf():
+    processor = BankStatementProcessor()
+    pages, rows, _ = _statement(PDF_SPEC)
+    pdf = build_pdf(pages)
+    _check_count(processor.process_pdf(pdf), rows)
+    return lambda: processor.process_pdf(pdf)
+
+@case('process_pdf[text-40p]')
+def bench_process_text():
+    processor = BankStatementProcessor()
+    _, rows, text = _statement(TEXT_SPEC)
+    data = text.encode()
+    _check_count(processor.process_pdf(data), rows)
+    return lambda: processor.process_pdf(data)
+
+def _check_count(result: Dict[str, Any], rows: List[Dict[str, Any]]):
+    """Guard against timing a parser that has stopped finding transactions
+    (rows containing a header word, e.g. "ATM WITHDRAWAL", are skipped by design)"""
+    expected = sum(1 for row in rows if not any(word in row['line'].lower() for word in HEADER_WORDS))
+    found = len(result['transactions'])
+    if not result['success'] or found != expected:
+        raise AssertionError(f"expected {expected} transactions, parsed {found}")
+
+def measure(fn: Callable[[], Any], rounds: int, min_time: float) -> Dict[str, Any]:
+    """Per-call timings over `rounds` rounds of a calibrated iteration count"""
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        iterations = max(iterations * 2, int(iterations * min_time / max(elapsed, 1e-9)))
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        timings.append((time.perf_counter() - start) / iterations)
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+        'stddev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'rounds': rounds,
+        'iterations': iterations,
+    }
+
+def machine_info() -> Dict[str, Any]:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+def baseline_path(name: str) -> str:
+    return name if name.endswith('.json') else os.path.join(BASELINE_DIR, f"{name}.json")
+
+def load_results(name: str) -> Dict[str, Any]:
+    with open(baseline_path(name)) as f:
+        return json.load(f)
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> bool:
+    """Print the median change per case; True if any case regressed past threshold"""
+    if old.get('machine') != new.get('machine'):
+        print("note: baseline was recorded on a different machine or Python; compare with care")
+    regressed = False
+    print(f"{'case':<34} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in new['benchmarks'].items():
+        before = old['benchmarks'].get(name)
+        if before is None:
+            print(f"{name:<34} {'-':>10} {_ms(result['median']):>10}      new")
+            continue
+        change = result['median'] / before['median'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressed = True
+        elif change < -threshold:
+            flag = '  faster'
+        print(f"{name:<34} {_ms(before['median']):>10} {_ms(result['median']):>10} {change:+8.1%}{flag}")
+    return regressed
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.3f}ms"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite with baseline comparison")
+    parser.add_argument('-k', dest='keyword', default='', help="Only run cases whose name contains this")
+    parser.add_argument('--rounds', type=int, default=7)
+    parser.add_argument('--min-time', type=float, default=0.1, help="Minimum seconds per round")
+    parser.add_argument('--save', metavar='NAME', help="Save results as baselines/NAME.json (or a .json path)")
+    parser.add_argument('--compare', metavar='NAME', help="Compare against a saved baseline")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="Median slowdown counted as a regression (default: 0.15 = 15%%)")
+    parser.add_argument('--diff', nargs=2, metavar=('OLD', 'NEW'), help="Compare two saved results and exit")
+    args = parser.parse_args()
+
+    if args.diff:
+        old, new = (load_results(name) for name in args.diff)
+        sys.exit(1 if compare(old, new, args.threshold) else 0)
+
+    results = {'createdAt': datetime.now().isoformat(), 'machine': machine_info(), 'benchmarks': {}}
+    print(f"{'case':<34} {'min':>10} {'median':>10} {'stddev':>10} {'rounds':>12}")
+    for name, setup in CASES:
+        if args.keyword not in name:
+            continue
+        result = measure(setup(), args.rounds, args.min_time)
+        results['benchmarks'][name] = result
+        print(f"{name:<34} {_ms(result['min']):>10} {_ms(result['median']):>10} {_ms(result['stddev']):>10} "
+              f"{result['rounds']:>4} x {result['iterations']:<5}")
+
+    if args.save:
+        path = baseline_path(args.save)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"saved {path}")
+    if args.compare:
+        print()
+        sys.exit(1 if compare(load_results(args.compare), results, args.threshold) else 0)
+
+if __name__ == "__main__":
+    main()
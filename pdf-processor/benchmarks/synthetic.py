@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Synthetic bank statement generator for benchmarks
+Builds plain-text statements and minimal text-only PDFs without extra dependencies.
+Run directly to write a configurable statement as both PDF and text:
+
+    python benchmarks/synthetic.py out/statement --pages 12 --rows 40 \
+        --date-format %m/%d/%y --amount-format plain --noise 0.2
+"""
+
+import argparse
+import os
+import random
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+# A PDF line: plain text at the left margin, or (x, text) cells placed on one baseline
+PdfLine = Union[str, Sequence[Tuple[float, str]]]
+
+DESCRIPTIONS = [
+    'STARBUCKS COFFEE #1234', 'AMAZON PURCHASE', 'PAYROLL DEPOSIT', 'RENT PAYMENT',
+    'ELECTRIC BILL', 'TARGET STORE', 'SPOTIFY SUBSCRIPTION', 'INTEREST EARNED',
+    'VENMO TRANSFER', 'MEIJER GROCERIES', 'CAMPUS BOOKSTORE TEXTBOOKS', 'CHECK DEPOSIT',
+    'PHONE BILL', 'FEDERAL TAX WITHHOLDING', 'ATM WITHDRAWAL', 'SALARY DEPOSIT',
+]
+
+LINES_PER_PAGE = 48
+
+def transaction_lines(rows: int, seed: int = 42) -> List[str]:
+    """Generate statement lines in 'MM/DD/YYYY DESCRIPTION $AMOUNT $BALANCE' form"""
+    rng = random.Random(seed)
+    day = date(2024, 1, 1)
+    balance = 2500.0
+    lines = []
+    for _ in range(rows):
+        day += timedelta(days=rng.randint(0, 2))
+        amount = round(rng.uniform(1, 1500), 2)
+        balance = round(balance + rng.choice((-1, 1)) * amount, 2)
+        lines.append(f"{day:%m/%d/%Y} {rng.choice(DESCRIPTIONS)} ${amount:,.2f} ${abs(balance):,.2f}")
+    return lines
+
+def statement_pages(pages: int, seed: int = 42) -> List[List[str]]:
+    """Generate a statement as a list of pages, each with a header and transaction rows"""
+    rows = transaction_lines(pages * (LINES_PER_PAGE - 2), seed)
+    per_page = LINES_PER_PAGE - 2
+    return [
+        ['ACME BANK STATEMENT', 'Date Description Withdrawal Balance'] + rows[i * per_page:(i + 1) * per_page]
+        for i in range(pages)
+    ]
+
+def statement_text(pages: int, seed: int = 42) -> str:
+    """Plain-text statement, as accepted by extract_text_from_pdf's text short-circuit"""
+    return "\n".join(line for page in statement_pages(pages, seed) for line in page) + "\n"
+
+def _escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def build_pdf(pages: List[List[PdfLine]], padding: int = 0, producer: Optional[str] = None) -> bytes:
+    """Write a minimal PDF with one Helvetica text line per entry; padding adds an
+    unreferenced stream of random bytes, standing in for embedded images, and
+    producer sets the document info /Producer"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once page object ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for lines in pages:
+        stream = "BT /F1 9 Tf\n"
+        for row, line in enumerate(lines):
+            cells = [(36, line)] if isinstance(line, str) else line
+            for x, text in cells:
+                stream += f"1 0 0 1 {x} {748 - 12 * row} Tm ({_escape(text)}) Tj\n"
+        stream += "ET"
+        content = stream.encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+    if padding:
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (padding, os.urandom(padding)))
+    info = b""
+    if producer:
+        objects.append(b"<< /Producer (%s) >>" % _escape(producer).encode('latin-1'))
+        info = b" /Info %d 0 R" % len(objects)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R%s >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, info, xref)
+    return bytes(out)
+
+def statement_pdf(pages: int, seed: int = 42, padding: int = 0) -> bytes:
+    """Synthetic multi-page statement as PDF bytes"""
+    return build_pdf(statement_pages(pages, seed), padding)
+
+# Tabular statement layouts: header cells plus how each row's amount is written
+LAYOUTS = {
+    # Separate withdrawal and deposit columns, '$' amounts
+    'split': [(36, 'Date'), (100, 'Description'), (330, 'Withdrawals'), (420, 'Deposits'), (510, 'Balance')],
+    # One signed amount column
+    'signed': [(36, 'Posting'), (70, 'Date'), (130, 'Transaction'), (190, 'Details'), (400, 'Amount'), (500, 'Balance')],
+    # Debit/credit columns without currency symbols
+    'debit_credit': [(36, 'Date'), (90, 'Payee'), (350, 'Debit'), (430, 'Credit')],
+}
+
+PROMO_LINES = [
+    'Earn 2.50% APY on new savings deposits over $5,000.00 opened by 12/31/2024.',
+    'Refer a friend before 06/30/2024 and get a $50.00 bonus deposit.',
+    'Important information about your account. Member FDIC.',
+]
+
+# /Producer written into layout statements
+LAYOUT_PRODUCER = 'ACME Statement Engine 4.2'
+
+def layout_statement(layout: str, pages: int, seed: int = 42) -> Tuple[bytes, List[Tuple[str, float]]]:
+    """Tabular statement PDF in one of LAYOUTS, with a promo page before and a
+    disclaimer page after the transaction pages. Returns the PDF and the true
+    (YYYY-MM-DD date, signed amount) of every transaction."""
+    rng = random.Random(seed)
+    header = LAYOUTS[layout]
+    day = date(2024, 1, 1)
+    balance = 2500.0
+    truth = []
+    pdf_pages: List[List[PdfLine]] = [['ACME BANK'] + PROMO_LINES]
+    for _ in range(pages):
+        lines: List[PdfLine] = ['ACME BANK STATEMENT', 'Account 0000-1234', header]
+        for _ in range(LINES_PER_PAGE - 4):
+            day += timedelta(days=rng.randint(0, 2))
+            amount = round(rng.uniform(1, 1500), 2)
+            outgoing = rng.random() < 0.6
+            balance = round(balance + (-amount if outgoing else amount), 2)
+            description = rng.choice(DESCRIPTIONS)
+            truth.append((day.isoformat(), -amount if outgoing else amount))
+            if layout == 'split':
+                money = f"${amount:,.2f}"
+                lines.append([(36, f"{day:%m/%d/%Y}"), (100, description),
+                              (330 if outgoing else 420, money), (510, f"${abs(balance):,.2f}")])
+            elif layout == 'signed':
+                money = f"-${amount:,.2f}" if outgoing else f"${amount:,.2f}"
+                lines.append([(36, f"{day:%m/%d/%y}"), (130, description), (400, money),
+                              (500, f"${abs(balance):,.2f}")])
+            else:
+                lines.append([(36, f"{day:%m-%d-%Y}"), (90, description),
+                              (350 if outgoing else 430, f"{amount:,.2f}")])
+        pdf_pages.append(lines)
+    pdf_pages.append(['Disclosures'] + PROMO_LINES[::-1])
+    return build_pdf(pdf_pages, producer=LAYOUT_PRODUCER), truth
+
+# How amounts are written in generated statements (all read by the text parser)
+AMOUNT_FORMATS = {
+    'dollar': lambda amount: f"${amount:,.2f}",      # $1,234.56
+    'plain': lambda amount: f"${amount:.2f}",        # $1234.56
+    'whole': lambda amount: f"${round(amount):,}",   # $1,235
+}
+
+# Lines with no transaction in them, some containing a date or an amount
+NOISE_LINES = [
+    'Account Summary for 01/01/2024 - 01/31/2024',
+    'Beginning Balance $2,500.00',
+    'Thank you for banking with us!',
+    'Questions? Call 1-800-555-0199 24 hours a day',
+    'Interest rate 0.01% effective 01/01/2024',
+    'Continued on next page',
+]
+
+class StatementSpec:
+    """Shape of a generated statement: size, how dates and amounts are written
+    (each row picks one of the given formats) and the share of noise lines"""
+
+    def __init__(self, pages: int = 1, rows_per_page: int = LINES_PER_PAGE - 2,
+                 date_formats: Sequence[str] = ('%m/%d/%Y',), amount_formats: Sequence[str] = ('dollar',),
+                 noise: float = 0.0, seed: int = 42):
+        unknown = [name for name in amount_formats if name not in AMOUNT_FORMATS]
+        if unknown:
+            raise ValueError(f"unknown amount format(s): {', '.join(unknown)}")
+        self.pages = pages
+        self.rows_per_page = rows_per_page
+        self.date_formats = list(date_formats)
+        self.amount_formats = list(amount_formats)
+        self.noise = noise
+        self.seed = seed
+
+def generate_statement(spec: StatementSpec) -> Tuple[List[List[str]], List[Dict[str, object]]]:
+    """Pages of statement lines for a spec, plus one record per transaction row
+    ({'line', 'date', 'description', 'amount'}) to check parser output against"""
+    rng = random.Random(spec.seed)
+    day = date(2024, 1, 1)
+    balance = 2500.0
+    pages = []
+    rows = []
+    for _ in range(spec.pages):
+        lines = ['ACME BANK STATEMENT', 'Date Description Withdrawal Balance']
+        while len(lines) < spec.rows_per_page + 2:
+            if rng.random() < spec.noise:
+                lines.append(rng.choice(NOISE_LINES))
+                continue
+            day += timedelta(days=rng.randint(0, 2))
+            amount = round(rng.uniform(1, 1500), 2)
+            balance = round(balance + rng.choice((-1, 1)) * amount, 2)
+            write_amount = AMOUNT_FORMATS[rng.choice(spec.amount_formats)]
+            description = rng.choice(DESCRIPTIONS)
+            line = f"{day.strftime(rng.choice(spec.date_formats))} {description} {write_amount(amount)} {write_amount(abs(balance))}"
+            lines.append(line)
+            rows.append({'line': line, 'date': day.isoformat(), 'description': description, 'amount': amount})
+        pages.append(lines)
+    return pages, rows
+
+def write_statement(spec: StatementSpec, path_prefix: str) -> Tuple[str, str]:
+    """Write a generated statement to <path_prefix>.pdf and <path_prefix>.txt"""
+    pages, _ = generate_statement(spec)
+    directory = os.path.dirname(path_prefix)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path_prefix + '.pdf', 'wb') as f:
+        f.write(build_pdf(pages))
+    with open(path_prefix + '.txt', 'w') as f:
+        f.write("\n".join(line for page in pages for line in page) + "\n")
+    return path_prefix + '.pdf', path_prefix + '.txt'
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic bank statement as PDF and text")
+    parser.add_argument('path_prefix', help="Output path without extension")
+    parser.add_argument('--pages', type=int, default=1)
+    parser.add_argument('--rows', type=int, default=LINES_PER_PAGE - 2, help="Lines per page below the header")
+    parser.add_argument('--date-format', action='append', dest='date_formats',
+                        help="strftime format for dates; repeat to mix formats (default: %%m/%%d/%%Y)")
+    parser.add_argument('--amount-format', action='append', dest='amount_formats', choices=sorted(AMOUNT_FORMATS),
+                        help="How amounts are written; repeat to mix formats (default: dollar)")
+    parser.add_argument('--noise', type=float, default=0.0, help="Share of lines that are not transactions")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    spec = StatementSpec(args.pages, args.rows, args.date_formats or ['%m/%d/%Y'],
+                         args.amount_formats or ['dollar'], args.noise, args.seed)
+    for path in write_statement(spec, args.path_prefix):
+        print(path)
+
+if __name__ == "__main__":
+    main()
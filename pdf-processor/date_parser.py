@@ -0,0 +1,147 @@
+"""
+Date parsing for bank statement lines
+Statements use one date format throughout, so StatementDateParser infers it
+from the first few dates, pins it, and caches parsed results by raw string;
+rows dated before the format is pinned are re-dated with it (resolve_dates)
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Formats tried in order when the statement's format is unknown
+DATE_FORMATS = [
+    '%m/%d/%Y', '%m-%d-%Y', '%m/%d/%y', '%m-%d-%y',
+    '%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y',
+    '%Y-%m-%d', '%Y/%m/%d', '%m/%d', '%m-%d'
+]
+
+# Year assumed for dates without one (strptime defaults those to 1900)
+DEFAULT_YEAR = 2024
+
+def parse_with_format(date_str: str, fmt: str) -> Optional[datetime]:
+    """Parse date string with a single format, or None if it doesn't match"""
+    try:
+        parsed_date = datetime.strptime(date_str, fmt)
+    except ValueError:
+        return None
+    # If no year specified, assume current year
+    if parsed_date.year == 1900:
+        parsed_date = parsed_date.replace(year=DEFAULT_YEAR)
+    return parsed_date
+
+@lru_cache(maxsize=4096)
+def parse_date_any(date_str: str) -> Optional[datetime]:
+    """Parse date string with the first matching entry of DATE_FORMATS"""
+    for fmt in DATE_FORMATS:
+        parsed_date = parse_with_format(date_str, fmt)
+        if parsed_date:
+            return parsed_date
+    return None
+
+class SampledDate(datetime):
+    """Date parsed while the statement's format was still being inferred; keeps
+    the raw string so it can be parsed again once the format is pinned"""
+
+    raw: str
+
+    @classmethod
+    def of(cls, parsed_date: datetime, raw: str) -> 'SampledDate':
+        sampled = cls(parsed_date.year, parsed_date.month, parsed_date.day)
+        sampled.raw = raw
+        return sampled
+
+class StatementDateParser:
+    """Per-statement date parser that pins the statement's format once inferred
+
+    Each date seen before the format is pinned is parsed against every format
+    and each format that fits gets a vote. Once sample_size dates are in and
+    one format has more votes than any other (so 05/01/2024 alone doesn't
+    decide between MM/DD and DD/MM), or after max_samples dates regardless,
+    the leader is pinned, earliest in DATE_FORMATS on ties. Dates that don't
+    fit the pinned format fall back to the full list. A known format (e.g.
+    from a layout profile) can be pinned up front.
+
+    Dates returned before pinning are provisional SampledDates (parsed as
+    parse_date_any would); resolve_dates holds back the rows carrying them and
+    re-dates them with the pinned format, so a statement never mixes formats.
+    """
+
+    def __init__(self, sample_size: int = 5, cache_size: int = 1024,
+                 date_format: Optional[str] = None, max_samples: int = 100):
+        self.sample_size = sample_size
+        self.max_samples = max_samples
+        self.cache_size = cache_size
+        self.format_votes = dict.fromkeys(DATE_FORMATS, 0)
+        self.samples_seen = 0
+        self.pinned_format: Optional[str] = date_format
+        self.cache: OrderedDict = OrderedDict()
+
+    def parse(self, date_str: str) -> Optional[datetime]:
+        if date_str in self.cache:
+            self.cache.move_to_end(date_str)
+            return self.cache[date_str]
+
+        if not self.pinned_format:
+            # Provisional, so not cached
+            return self._parse_sample(date_str)
+        parsed_date = parse_with_format(date_str, self.pinned_format) or parse_date_any(date_str)
+
+        self.cache[date_str] = parsed_date
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return parsed_date
+
+    def _parse_sample(self, date_str: str) -> Optional[datetime]:
+        """Parse a date while the format is still being inferred"""
+        first_parsed = None
+        for fmt in DATE_FORMATS:
+            parsed_date = parse_with_format(date_str, fmt)
+            if parsed_date:
+                self.format_votes[fmt] += 1
+                first_parsed = first_parsed or parsed_date
+        if first_parsed is None:
+            return None
+
+        self.samples_seen += 1
+        if self.samples_seen >= self.sample_size:
+            first, second = sorted(self.format_votes.values(), reverse=True)[:2]
+            if first > second or self.samples_seen >= self.max_samples:
+                self.pin()
+        return SampledDate.of(first_parsed, date_str)
+
+    def pin(self):
+        """Pin the format with the most votes so far (no-op once pinned or
+        before any date has been seen)"""
+        if not self.pinned_format and self.samples_seen:
+            # max() keeps the first of equal counts, i.e. DATE_FORMATS order
+            self.pinned_format = max(DATE_FORMATS, key=self.format_votes.get)
+
+    def resolve(self, parsed_date: Optional[datetime]) -> Optional[datetime]:
+        """The final date for a value returned by parse, pinning the format
+        with the votes so far if it isn't pinned yet"""
+        if not isinstance(parsed_date, SampledDate):
+            return parsed_date
+        self.pin()
+        return self.parse(parsed_date.raw)
+
+def _redated(row: Tuple, parser: StatementDateParser) -> Tuple:
+    if not isinstance(row[0], SampledDate):
+        return row
+    return (parser.resolve(row[0]),) + tuple(row[1:])
+
+def resolve_dates(rows: Iterable[Tuple], parser: StatementDateParser) -> Iterator[Tuple]:
+    """Rows whose first field is a date from parser, in order, each yielded
+    once its date is final: rows dated before the format is pinned are held
+    back (at most max_samples of them) and re-dated when it is"""
+    rows = iter(rows)
+    held: List[Tuple] = []
+    for row in rows:
+        held.append(row)
+        if parser.pinned_format is not None:
+            break
+    for held_row in held:
+        yield _redated(held_row, parser)
+    # Later rows were parsed with the pinned format
+    yield from rows
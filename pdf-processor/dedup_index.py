@@ -0,0 +1,205 @@
+"""
+Cross-statement transaction dedup index
+Overlapping uploads (a monthly and a quarterly statement, a re-download)
+repeat transactions the account already has. Each transaction gets a stable
+64-bit fingerprint of its date, normalized description, amount and its
+sequence among identical rows that day, and the fingerprints seen per account
+are kept in SQLite, so a new upload is reduced to the rows not seen before
+with one primary-key probe per row
+
+Rows count as seen once the client records them as it stores them, not
+when they are returned, so an upload whose rows never get stored can be
+uploaded again
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from pdf_processor import StatementSummary
+
+# Case, punctuation and spacing differences between renderings of a description
+_SEPARATORS = re.compile(r'[\W_]+')
+
+# Fingerprints per IN (...) lookup; older SQLite builds allow 999 parameters
+LOOKUP_CHUNK = 500
+
+# Fingerprints are stored as signed 64-bit integers and sent to clients as
+# 16 hex digits, since JSON numbers past 2**53 lose precision in JavaScript
+_UNSIGNED = 1 << 64
+
+def fingerprint_token(key: int) -> str:
+    return format(key % _UNSIGNED, '016x')
+
+def parse_token(token: Any) -> int:
+    """Fingerprint from a fingerprint_token; raises ValueError with a client-facing message"""
+    if not isinstance(token, str) or len(token) != 16:
+        raise ValueError('fingerprints must be 16-digit hex strings')
+    try:
+        key = int(token, 16)
+    except ValueError:
+        raise ValueError('fingerprints must be 16-digit hex strings') from None
+    return key - _UNSIGNED if key >= _UNSIGNED // 2 else key
+
+def normalize_description(description: str) -> str:
+    return _SEPARATORS.sub(' ', description.casefold()).strip()
+
+def fingerprints(transactions: Iterable[Dict[str, Any]]) -> List[int]:
+    """Fingerprint of each transaction, in order. Identical rows on the same
+    day (two coffees for the same amount) are told apart by their sequence
+    number, so re-uploading a statement reproduces the same fingerprints.
+
+    The sequence counts identical rows within one upload, so it only holds
+    when each upload has all of the day's identical rows: if one statement
+    ends mid-day with the first coffee and the next starts with the second,
+    both get sequence 0 and the second is dropped as a duplicate. Numbering
+    by position among all of the day's rows would not fix this, since
+    statements that order or cut a day differently would then stop matching
+    at all; a missed same-day twin is the cheaper failure"""
+    occurrences: Dict[str, int] = {}
+    result = []
+    for transaction in transactions:
+        key = (f"{transaction['date']}|{normalize_description(transaction['description'])}|"
+               f"{round(transaction['amount'] * 100)}")
+        sequence = occurrences.get(key, 0)
+        occurrences[key] = sequence + 1
+        digest = hashlib.blake2b(f"{key}|{sequence}".encode('utf-8'), digest_size=8).digest()
+        # Signed so it fits SQLite's INTEGER
+        result.append(int.from_bytes(digest, 'big', signed=True))
+    return result
+
+class DedupIndex:
+    """Fingerprints of the transactions already returned for each account
+
+    Stored in SQLite, in memory by default or in a shared file (db_path) that
+    every web worker uses; a WITHOUT ROWID table keyed on (account,
+    fingerprint) keeps each stored row to a few dozen bytes, and lookups are
+    a B-tree probe whose depth barely grows with millions of rows. apply only
+    checks an upload; record claims its fingerprints in one write transaction
+    and returns the ones not claimed before, so two overlapping uploads for
+    the same account never both store a row, and forget releases them again
+    if storing fails.
+    """
+
+    def __init__(self, db_path: str = ':memory:'):
+        self.db_path = db_path
+        self.db = None
+        self.lock = threading.Lock()
+        self.checked = 0
+        self.duplicates = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        # Opened on first use (lock held), after any web server fork; transactions are explicit
+        if self.db is None:
+            self.db = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+            if self.db_path != ':memory:':
+                self.db.execute('PRAGMA journal_mode=WAL')
+                self.db.execute('PRAGMA synchronous=NORMAL')
+                # Enough pages (64 MB) to keep the upper B-tree levels of millions of rows cached
+                self.db.execute('PRAGMA cache_size=-65536')
+            self.db.execute('CREATE TABLE IF NOT EXISTS accounts (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)')
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS seen (account INTEGER NOT NULL, fingerprint INTEGER NOT NULL, '
+                'PRIMARY KEY (account, fingerprint)) WITHOUT ROWID'
+            )
+        return self.db
+
+    def _account_id(self, account: str, create: bool = True) -> Optional[int]:
+        """Row id of the account, creating it (write transaction held) or None"""
+        if create:
+            self.db.execute('INSERT OR IGNORE INTO accounts (name) VALUES (?)', (account,))
+        row = self.db.execute('SELECT id FROM accounts WHERE name = ?', (account,)).fetchone()
+        return row[0] if row else None
+
+    def _seen(self, account_id: int, keys: List[int]) -> Set[int]:
+        seen = set()
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[start:start + LOOKUP_CHUNK]
+            seen.update(row[0] for row in self.db.execute(
+                f"SELECT fingerprint FROM seen WHERE account = ? AND fingerprint IN "
+                f"({','.join('?' * len(chunk))})", (account_id, *chunk)
+            ))
+        return seen
+
+    def unseen(self, account: str, keys: List[int]) -> List[int]:
+        """The fingerprints not recorded for the account, without recording them"""
+        with self.lock:
+            self._conn()
+            account_id = self._account_id(account, create=False)
+            seen = self._seen(account_id, keys) if account_id is not None else set()
+        return [key for key in keys if key not in seen]
+
+    def record(self, account: str, keys: List[int]) -> List[int]:
+        """Record the fingerprints as seen for the account, returning the ones
+        that were not seen before (the rows this caller should store)"""
+        with self.lock:
+            db = self._conn()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                account_id = self._account_id(account)
+                seen = self._seen(account_id, keys)
+                fresh = [key for key in dict.fromkeys(keys) if key not in seen]
+                db.executemany('INSERT INTO seen (account, fingerprint) VALUES (?, ?)',
+                               [(account_id, key) for key in fresh])
+                db.execute('COMMIT')
+            except Exception:
+                db.execute('ROLLBACK')
+                raise
+        return fresh
+
+    def forget(self, account: str, keys: List[int]) -> int:
+        """Drop the given fingerprints from the account (to undo record when
+        storing the rows failed), so those rows are returned again; returns
+        how many were dropped"""
+        with self.lock:
+            db = self._conn()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                account_id = self._account_id(account, create=False)
+                dropped = 0
+                for start in range(0, len(keys), LOOKUP_CHUNK):
+                    if account_id is None:
+                        break
+                    chunk = keys[start:start + LOOKUP_CHUNK]
+                    dropped += db.execute(
+                        f"DELETE FROM seen WHERE account = ? AND fingerprint IN "
+                        f"({','.join('?' * len(chunk))})", (account_id, *chunk)
+                    ).rowcount
+                db.execute('COMMIT')
+            except Exception:
+                db.execute('ROLLBACK')
+                raise
+        return dropped
+
+    def apply(self, account: str, result: Dict[str, Any], record: bool = False) -> Dict[str, Any]:
+        """Reduce a successful process_pdf result to the account's unseen
+        transactions; its summary becomes the delta those rows add, and
+        "dedup.fingerprints" lists their fingerprints (in order) for the client
+        to record when it stores them. With record, they are recorded now"""
+        if not result.get('success'):
+            return result
+        transactions = result['transactions']
+        keys = fingerprints(transactions)
+        fresh = set(self.record(account, keys) if record else self.unseen(account, keys))
+        with self.lock:
+            self.checked += len(keys)
+            self.duplicates += len(keys) - len(fresh)
+        kept = [(transaction, key) for transaction, key in zip(transactions, keys) if key in fresh]
+        summary = StatementSummary()
+        for transaction, _ in kept:
+            summary.add(transaction)
+        return {
+            **result,
+            'transactions': [transaction for transaction, _ in kept],
+            'summary': summary.to_dict(),
+            'dedup': {'accountId': account, 'parsed': len(transactions), 'new': len(kept),
+                      'duplicates': len(transactions) - len(kept), 'recorded': record,
+                      'fingerprints': [fingerprint_token(key) for _, key in kept]}
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            accounts = self._conn().execute('SELECT COUNT(*) FROM accounts').fetchone()[0]
+            return {'accounts': accounts, 'checked': self.checked, 'duplicates': self.duplicates}
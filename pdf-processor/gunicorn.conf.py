@@ -0,0 +1,49 @@
+"""
+Gunicorn configuration for the PDF processing service
+Usage: gunicorn -c gunicorn.conf.py server:app
+
+The app is imported once in the master (preload_app) with PDF_WARMUP=1, so
+pdfplumber, pandas and the BankStatementProcessor are loaded before workers
+are forked and shared copy-on-write instead of being imported by every worker.
+"""
+
+import multiprocessing
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5001)}"
+
+# Parsing is CPU bound, so one process per core; threads cover uploads and
+# polling while another request is parsing
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread'
+preload_app = True
+
+# Large statements can take a while
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+# No request-count recycling by default: /jobs/<id> polls (one a second per
+# upload) would recycle workers often, and a recycled worker takes its
+# in-flight jobs with it (they are then reported failed). Set
+# WEB_MAX_REQUESTS to recycle anyway, e.g. to bound memory growth
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+# Import pdfplumber and pandas in the master so workers inherit them
+os.environ.setdefault('PDF_WARMUP', '1')
+
+# Every web worker runs its own job pool, so share the cores between them
+# rather than starting cpu_count processes in each
+os.environ.setdefault('PDF_JOB_WORKERS', str(max(1, multiprocessing.cpu_count() // workers)))
+
+# Polls for a job can land on any worker, so job records go in a shared file
+# (which also makes PDF_JOB_MAX_PENDING a limit across all workers)
+os.environ.setdefault('PDF_JOB_DB', os.path.join(tempfile.gettempdir(), 'pdf-processor-jobs.sqlite3'))
+# The dedup index is not defaulted: it must outlive restarts (a temp dir on an
+# ephemeral filesystem would forget every account), so set PDF_DEDUP_DB to a
+# file on persistent storage to enable dedup
+
+accesslog = '-'
+errorlog = '-'
@@ -0,0 +1,286 @@
+"""
+Asynchronous statement processing jobs
+Submitted statements are queued on a bounded process pool and tracked in an
+SQLite job table, so callers get a job id immediately and poll for the
+result instead of holding a request open while the PDF is parsed
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Union
+
+from pdf_processor import BankStatementProcessor
+from layout_registry import load_registry
+
+# Processor held by each job worker process (set by _init_job_worker)
+_job_processor = None
+
+def _init_job_worker(layouts_file: Optional[str] = None):
+    global _job_processor
+    # Jobs are already spread across processes, so extract pages serially
+    _job_processor = BankStatementProcessor(workers=1, layouts=load_registry(layouts_file))
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+# Result recorded for a job whose owning process exited before it finished
+ORPHANED_RESULT = {'success': False, 'error': 'The server process running this job exited; resubmit the statement',
+                   'transactions': []}
+
+def _run_job(source: Union[str, bytes], extraction: Optional[str]) -> Dict[str, Any]:
+    """Process one statement (file path or bytes) in a worker, timing the run
+    and returning the pipeline stats for the parent's metrics"""
+    started_at = time.time()
+    stats = {}
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            result = _job_processor.process_pdf(f, extraction=extraction, stats=stats)
+    else:
+        result = _job_processor.process_pdf(source, extraction=extraction, stats=stats)
+    return {'startedAt': started_at, 'finishedAt': time.time(), 'result': result, 'stats': stats}
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when max_pending jobs are already unfinished"""
+
+class JobQueue:
+    """Bounded pool of statement processing jobs with status lookups by id
+
+    Job records live in SQLite: in memory by default, or in a shared file
+    (db_path) so that any of several web worker processes can answer a poll
+    for a job another one accepted. The pending limit counts every unfinished
+    job in the table, so with a shared file it applies across processes. Each
+    job records the process whose pool runs it; jobs left unfinished by a
+    process that has exited (recycled or crashed) are marked failed instead of
+    staying queued forever.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: int = 32,
+                 retention_seconds: float = 3600, layouts_file: Optional[str] = None,
+                 db_path: str = ':memory:'):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self.layouts_file = layouts_file
+        self.db_path = db_path
+        self.db: Optional[sqlite3.Connection] = None
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.futures: Dict[str, Future] = {}
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.pool_restarts = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Started on first use so importing the server doesn't fork workers
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_job_worker,
+                                                initargs=(self.layouts_file,))
+        return self.executor
+
+    def _submit(self, source: Union[str, bytes], extraction: Optional[str]) -> Future:
+        """Hand a statement to the pool (lock held). A worker that died (e.g.
+        killed for memory) breaks the whole pool, so it is replaced and the
+        submit retried once"""
+        try:
+            return self._pool().submit(_run_job, source, extraction)
+        except BrokenProcessPool:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+            self.pool_restarts += 1
+            return self._pool().submit(_run_job, source, extraction)
+
+    def _conn(self) -> sqlite3.Connection:
+        # Opened on first use (lock held), after any web server fork
+        if self.db is None:
+            self.db = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            if self.db_path != ':memory:':
+                self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, '
+                'submitted_at REAL NOT NULL, started_at REAL, finished_at REAL, result TEXT, owner INTEGER)'
+            )
+            columns = [row[1] for row in self.db.execute('PRAGMA table_info(jobs)')]
+            if 'owner' not in columns:
+                # Job files written before owners were recorded
+                self.db.execute('ALTER TABLE jobs ADD COLUMN owner INTEGER')
+            self.db.execute('CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at)')
+            self.db.commit()
+            # Jobs of processes that exited before this one started (e.g. a recycled web worker)
+            self._fail_orphans()
+        return self.db
+
+    def _fail_orphans(self):
+        """Mark unfinished jobs whose owning process has exited as failed (lock held)"""
+        owners = [row[0] for row in self.db.execute(
+            'SELECT DISTINCT owner FROM jobs WHERE finished_at IS NULL AND owner IS NOT ?', (os.getpid(),)
+        )]
+        dead = [owner for owner in owners if owner is None or not _alive(owner)]
+        if not dead:
+            return
+        now = time.time()
+        for owner in dead:
+            self.db.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, result = ? "
+                "WHERE finished_at IS NULL AND owner IS ?", (now, json.dumps(ORPHANED_RESULT), owner)
+            )
+        self.db.commit()
+
+    def _save(self, job: Dict[str, Any]):
+        """Insert or update a job record (lock held)"""
+        result = json.dumps(job['result']) if 'result' in job else None
+        self._conn().execute(
+            'INSERT OR REPLACE INTO jobs (id, status, submitted_at, started_at, finished_at, result, owner) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (job['id'], job['status'], job['submittedAt'], job.get('startedAt'), job.get('finishedAt'), result,
+             os.getpid())
+        )
+        self.db.commit()
+
+    def submit(self, source: Union[str, bytes], extraction: Optional[str] = None,
+               on_done: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Queue a statement and return its job record; on_done is called with the
+        finished record (from a pool thread) before it becomes visible to pollers"""
+        with self.lock:
+            self._expire()
+            # Count and insert in one write transaction, so processes sharing
+            # the file can't both take the last slot
+            self.db.commit()
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                unfinished = self.db.execute('SELECT COUNT(*) FROM jobs WHERE finished_at IS NULL').fetchone()[0]
+                if unfinished >= self.max_pending:
+                    self.rejected += 1
+                    raise QueueFull(f"{unfinished} jobs already pending")
+                job = {'id': uuid.uuid4().hex, 'status': 'queued', 'submittedAt': time.time()}
+                # Recorded (and committed) before the pool gets it, so running work always has a row
+                self._save(job)
+            except BaseException:
+                self.db.rollback()
+                raise
+            try:
+                future = self._submit(source, extraction)
+            except BaseException:
+                # Never started: give back the slot the row took
+                self.db.execute('DELETE FROM jobs WHERE id = ?', (job['id'],))
+                self.db.commit()
+                raise
+            self.pending += 1
+            self.submitted += 1
+            self.futures[job['id']] = future
+        future.add_done_callback(lambda future: self._finish(job, future, on_done))
+        return self._view(job)
+
+    def add_completed(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Record a job whose result is already known (e.g. from the result cache)"""
+        now = time.time()
+        job = {'id': uuid.uuid4().hex, 'status': 'done', 'submittedAt': now,
+               'startedAt': now, 'finishedAt': now, 'result': result}
+        with self.lock:
+            self._expire()
+            self._save(job)
+            self.submitted += 1
+            self.completed += 1
+        return self._view(job)
+
+    def _finish(self, job: Dict[str, Any], future: Future,
+                on_done: Optional[Callable[[Dict[str, Any]], None]]):
+        try:
+            outcome = future.result()
+            job = {**job, 'status': 'done' if outcome['result']['success'] else 'failed', **outcome}
+        except Exception as e:
+            # The worker itself died (e.g. out of memory)
+            job = {**job, 'status': 'failed', 'finishedAt': time.time(),
+                   'result': {'success': False, 'error': str(e), 'transactions': []}}
+        if on_done:
+            try:
+                on_done(job)
+            except Exception:
+                pass
+        with self.lock:
+            self._save(job)
+            self.futures.pop(job['id'], None)
+            self.pending -= 1
+            if job['status'] == 'done':
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self._conn().execute(
+                'SELECT id, status, submitted_at, started_at, finished_at, result FROM jobs WHERE id = ?',
+                (job_id,)
+            ).fetchone()
+            future = self.futures.get(job_id)
+            if row is not None and row[4] is None and future is None:
+                # Another process's job: fail it now if that process is gone
+                self._fail_orphans()
+                row = self.db.execute(
+                    'SELECT id, status, submitted_at, started_at, finished_at, result FROM jobs WHERE id = ?',
+                    (job_id,)
+                ).fetchone()
+        if row is None:
+            return None
+        job = {'id': row[0], 'status': row[1], 'submittedAt': row[2], 'startedAt': row[3], 'finishedAt': row[4]}
+        if row[5] is not None:
+            job['result'] = json.loads(row[5])
+        if job['status'] == 'queued' and future is not None and future.running():
+            job['status'] = 'running'
+        return self._view(job)
+
+    def _expire(self):
+        """Drop finished jobs older than retention_seconds and fail orphaned ones (lock held)"""
+        self._conn().execute('DELETE FROM jobs WHERE finished_at < ?', (time.time() - self.retention_seconds,))
+        self._fail_orphans()
+
+    def _view(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Job record for API responses, with ISO timestamps and per-job timings"""
+        view = {'id': job['id'], 'status': job['status']}
+        for field in ('submittedAt', 'startedAt', 'finishedAt'):
+            if job.get(field):
+                view[field] = datetime.fromtimestamp(job[field]).isoformat()
+        timing = {}
+        if job.get('startedAt'):
+            timing['queueSeconds'] = job['startedAt'] - job['submittedAt']
+        if job.get('finishedAt'):
+            timing['runSeconds'] = job['finishedAt'] - (job.get('startedAt') or job['submittedAt'])
+            timing['totalSeconds'] = job['finishedAt'] - job['submittedAt']
+        view['timing'] = timing
+        if 'result' in job:
+            view['result'] = job['result']
+        return view
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            tracked = self._conn().execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+            return {
+                'workers': self.workers,
+                'pending': self.pending,
+                'maxPending': self.max_pending,
+                'tracked': tracked,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'failed': self.failed,
+                'poolRestarts': self.pool_restarts
+            }
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
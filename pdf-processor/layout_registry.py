@@ -0,0 +1,157 @@
+"""
+Statement layout registry
+Known bank formats are described in a JSON data file as parsing profiles. A
+statement is fingerprinted (PDF producer, first-page header text, transaction
+table column positions) and, when a profile matches, read with that profile's
+columns, date format, sign convention and crop box instead of the generic
+heuristics. Registries are loaded once per file version and kept in-process.
+
+The point is accuracy on known layouts (fixed columns, a pinned date format
+and sign convention), not speed: pdfminer's page parsing dominates either
+path, so a matched statement takes about as long as the generic table
+parser. No profiles ship with the service; the registry file is given
+explicitly (PDF_LAYOUTS_FILE or --layouts), and without one the registry is
+empty and statements are never fingerprinted.
+
+File format:
+    {"layouts": [{
+        "name": "acme-checking",
+        "producer": "acme statement engine",      # optional, substring of /Producer
+        "headerText": ["ACME BANK"],              # regexes the first-page header must contain
+        "columns": {"date": [36, 56], "description": [100, 147],
+                    "withdrawal": [330, 377], "deposit": [420, 456]},
+        "dateFormat": "%m/%d/%Y",                 # optional, pins the date format
+        "sign": "negative_out",                   # optional, see SIGN_CONVENTIONS
+        "cropBox": [24, 0, 612, 760]              # optional, [left, top, right, bottom]
+    }]}
+Columns map a COLUMN_HEADERS kind to the [x0, x1] span of its header word.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from table_extractor import COLUMN_HEADERS, SIGN_CONVENTIONS, TableLayout, detect_layout, group_lines
+
+# Height (points) of the first-page band whose text identifies the bank
+HEADER_BAND = 120
+
+# Pages searched for the transaction table header while fingerprinting
+FINGERPRINT_PAGES = 3
+
+# Furthest (points) a header word may sit from the profile's column position
+COLUMN_TOLERANCE = 6
+
+# Page lines read while fingerprinting, by page index, so they aren't read twice
+ScannedLines = Dict[int, List[List[Dict[str, Any]]]]
+
+class Fingerprint(NamedTuple):
+    """What identifies a statement's layout"""
+    producer: str
+    # Lowercased first-page header text with digits masked, so account numbers
+    # and dates don't make every statement of a bank look different
+    header_text: str
+    # (kind, x0) of each transaction table column, rounded to whole points
+    columns: Tuple[Tuple[str, int], ...]
+
+def fingerprint_pdf(pdf) -> Tuple[Fingerprint, ScannedLines]:
+    """Fingerprint an open pdfplumber PDF, returning the page lines it read"""
+    producer = str((pdf.metadata or {}).get('Producer', '')).lower()
+    scanned: ScannedLines = {}
+    columns: Tuple[Tuple[str, int], ...] = ()
+    for index, page in enumerate(pdf.pages[:FINGERPRINT_PAGES]):
+        scanned[index] = group_lines(page.extract_words())
+        layout = detect_layout(scanned[index])
+        if layout:
+            columns = tuple((column['kind'], round(column['x0'])) for column in layout.columns)
+            break
+
+    header_words = [word['text'] for line in scanned.get(0, []) if line[0]['bottom'] <= HEADER_BAND
+                    for word in line]
+    header_text = re.sub(r'\d', '#', ' '.join(header_words).lower())
+    return Fingerprint(producer, header_text, columns), scanned
+
+class LayoutProfile:
+    """Compiled parsing profile for one statement layout"""
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.name = spec['name']
+        self.producer = spec.get('producer', '').lower()
+        self.header_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in spec.get('headerText', [])]
+        self.date_format = spec.get('dateFormat')
+        self.sign = spec.get('sign', 'negative_out')
+        if self.sign not in SIGN_CONVENTIONS:
+            raise ValueError(f"{self.name}: sign must be one of {', '.join(SIGN_CONVENTIONS)}")
+
+        columns = []
+        for kind, (x0, x1) in spec['columns'].items():
+            if kind not in COLUMN_HEADERS:
+                raise ValueError(f"{self.name}: unknown column {kind!r}")
+            columns.append({'kind': kind, 'x0': x0, 'center': (x0 + x1) / 2})
+        columns.sort(key=lambda column: column['x0'])
+        self.column_positions = {column['kind']: column['x0'] for column in columns}
+
+        # Same default region as a detected layout: from just left of the first column
+        left, top, right, bottom = spec.get('cropBox') or [max(0, columns[0]['x0'] - 12), 0, None, None]
+        self.layout = TableLayout(columns, top=top, left=left, right=right, bottom=bottom)
+
+    def matches(self, fingerprint: Fingerprint) -> bool:
+        if self.producer and self.producer not in fingerprint.producer:
+            return False
+        if not all(pattern.search(fingerprint.header_text) for pattern in self.header_patterns):
+            return False
+        detected = dict(fingerprint.columns)
+        if detected.keys() != self.column_positions.keys():
+            return False
+        return all(abs(detected[kind] - x0) <= COLUMN_TOLERANCE for kind, x0 in self.column_positions.items())
+
+class LayoutRegistry:
+    """Layout profiles, with fingerprint lookups cached in an LRU"""
+
+    def __init__(self, profiles: List[LayoutProfile], cache_size: int = 1024):
+        self.profiles = profiles
+        self.cache_size = cache_size
+        self.matches: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    def lookup(self, fingerprint: Fingerprint) -> Optional[LayoutProfile]:
+        """First profile matching the fingerprint, or None"""
+        with self.lock:
+            if fingerprint in self.matches:
+                self.matches.move_to_end(fingerprint)
+                return self.matches[fingerprint]
+
+        profile = next((profile for profile in self.profiles if profile.matches(fingerprint)), None)
+        with self.lock:
+            self.matches[fingerprint] = profile
+            if len(self.matches) > self.cache_size:
+                self.matches.popitem(last=False)
+        return profile
+
+def load_registry(path: Optional[str] = None) -> LayoutRegistry:
+    """Registry for a layouts file (PDF_LAYOUTS_FILE by default; empty when
+    neither is set); repeated loads of an unchanged file return the same registry"""
+    path = path or os.environ.get('PDF_LAYOUTS_FILE')
+    if not path:
+        return LayoutRegistry([])
+    path = os.path.abspath(path)
+    try:
+        version = os.stat(path).st_mtime_ns
+    except OSError:
+        version = None
+    return _load_registry(path, version)
+
+@lru_cache(maxsize=16)
+def _load_registry(path: str, version: Optional[int]) -> LayoutRegistry:
+    if version is None:
+        return LayoutRegistry([])
+    with open(path) as f:
+        specs = json.load(f).get('layouts', [])
+    return LayoutRegistry([LayoutProfile(spec) for spec in specs])
@@ -0,0 +1,78 @@
+"""
+Precompiled line classifier for bank statement text
+Finds the date and amount, header words, withdrawal keywords and category
+of a statement line with a handful of compiled regexes instead of repeated
+re.search calls and per-keyword substring scans
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+# Words that mark a column header line rather than a transaction
+HEADER_WORDS = ['date', 'description', 'withdrawal', 'balance']
+
+# Keywords that indicate money going out
+WITHDRAWAL_KEYWORDS = [
+    'bill', 'withdrawal', 'debit', 'payment', 'rent', 'electric', 'phone', 'internet', 'tax',
+    'purchase', 'buy', 'spent', 'fee', 'charge', 'starbucks', 'amazon', 'target', 'spotify',
+    'gas', 'meijer', 'venmo', 'apple', 'store', 'subscription', 'transfer', 'groceries',
+    'supplies', 'textbooks', 'campus', 'coffee', 'restaurant', 'food', 'shopping'
+]
+
+# Category rules in priority order; the first category with a keyword in the description wins
+CATEGORY_KEYWORDS: List[Tuple[str, List[str]]] = [
+    ('Utilities', ['rent', 'electric', 'phone', 'internet', 'utilities']),
+    ('Bills', ['bill', 'payment']),
+    ('Income', ['deposit', 'salary', 'payroll']),
+    ('Interest', ['interest', 'earned']),
+    ('Taxes', ['tax', 'withholding']),
+    ('Income', ['check', 'payment']),
+]
+
+def _alternation(words: List[str]) -> str:
+    return '|'.join(re.escape(word) for word in words)
+
+class LineClassifier:
+    """Single-pass matchers for transaction lines, compiled once per processor"""
+
+    def __init__(self, date_pattern: str, amount_pattern: str):
+        self.date_pattern = date_pattern
+        # Two independent lazy lookaheads find the leftmost date and leftmost amount
+        # in one match call, exactly as separate re.search calls would
+        self.line_regex = re.compile(
+            rf'(?=.*?(?P<date>{date_pattern}))(?=.*?(?P<amount_token>{amount_pattern}))',
+            re.DOTALL
+        )
+        self.header_regex = re.compile(_alternation(HEADER_WORDS))
+        self.withdrawal_regex = re.compile(_alternation(WITHDRAWAL_KEYWORDS))
+
+        # One lookahead alternation with a named group per category rule. Scanning every
+        # position sees overlapping keywords, and listing rules in priority order means
+        # the group reported at each position is the highest-priority rule matching there
+        self.category_names = [category for category, _ in CATEGORY_KEYWORDS]
+        self.category_regex = re.compile('(?=' + '|'.join(
+            f'(?P<c{rank}>{_alternation(keywords)})'
+            for rank, (_, keywords) in enumerate(CATEGORY_KEYWORDS)
+        ) + ')')
+
+    def match(self, line: str) -> Optional[re.Match]:
+        """Match a line containing both a date and a dollar amount
+        (groups: 'date' and 'amount_token', the amount including its '$')"""
+        return self.line_regex.match(line)
+
+    def is_header(self, line_lower: str) -> bool:
+        return self.header_regex.search(line_lower) is not None
+
+    def is_withdrawal(self, line_lower: str) -> bool:
+        return self.withdrawal_regex.search(line_lower) is not None
+
+    def categorize(self, description: str) -> str:
+        """Return the highest-priority category whose keywords appear in the description"""
+        best = None
+        for keyword_match in self.category_regex.finditer(description.lower()):
+            rank = int(keyword_match.lastgroup[1:])
+            if best is None or rank < best:
+                best = rank
+                if rank == 0:
+                    break
+        return self.category_names[best] if best is not None else 'Other'
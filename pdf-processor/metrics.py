@@ -0,0 +1,140 @@
+"""
+Prometheus-style metrics
+Minimal thread-safe counters and histograms rendered in the Prometheus text
+exposition format, plus the PDF pipeline's metric definitions. Values are
+kept per process; under gunicorn each worker reports its own series.
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Stage durations run from sub-millisecond (summaries) to tens of seconds (large PDFs)
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: Any):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = SECONDS_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        # Per label set: [bucket counts..., sum, count]
+        self.values: Dict[Tuple[str, ...], List[float]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, series in sorted(self.values.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together for /metrics"""
+
+    def __init__(self):
+        self.metrics: List[Any] = []
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = SECONDS_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(line for metric in self.metrics for line in metric.render()) + '\n'
+
+def sample_lines(name: str, help_text: str, value: float, kind: str = 'gauge') -> List[str]:
+    """Exposition lines for a single value read from elsewhere (e.g. cache stats)"""
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {_format_value(value)}"]
+
+REGISTRY = MetricsRegistry()
+
+# PDF pipeline
+STAGE_SECONDS = REGISTRY.histogram(
+    'pdf_stage_seconds', 'Time spent per statement in each pipeline stage '
+    '(decode, extract, parse, summary)', ['stage'])
+PAGE_SECONDS = REGISTRY.histogram(
+    'pdf_page_extract_seconds', 'Time to extract one page')
+PAGES = REGISTRY.counter('pdf_pages_total', 'Pages extracted')
+LINES_SCANNED = REGISTRY.counter('pdf_lines_scanned_total', 'Statement lines examined by the parser')
+TRANSACTIONS = REGISTRY.counter('pdf_transactions_matched_total', 'Lines parsed into transactions')
+BYTES_RECEIVED = REGISTRY.counter('pdf_bytes_received_total', 'Decoded statement bytes received')
+STATEMENTS = REGISTRY.counter('pdf_statements_total', 'Statements processed, by outcome', ['outcome'])
+ERRORS = REGISTRY.counter('pdf_errors_total', 'Processing and request errors, by type', ['type'])
+REQUESTS = REGISTRY.counter('http_requests_total', 'HTTP requests, by endpoint and status',
+                            ['endpoint', 'status'])
+REQUEST_SECONDS = REGISTRY.histogram('http_request_seconds', 'HTTP request handling time, by endpoint',
+                                     ['endpoint'])
+
+def record_statement(stats: Dict[str, Any], error: Optional[str] = None):
+    """Record one processed statement from the stats collected by the processor"""
+    for stage, seconds in stats.get('timings', {}).items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    for seconds in stats.get('pageSeconds', ()):
+        PAGE_SECONDS.observe(seconds)
+    PAGES.inc(stats.get('pages', 0))
+    LINES_SCANNED.inc(stats.get('linesScanned', 0))
+    TRANSACTIONS.inc(stats.get('transactions', 0))
+    if error:
+        STATEMENTS.inc(outcome='error')
+        ERRORS.inc(type=error)
+    else:
+        STATEMENTS.inc(outcome='success')
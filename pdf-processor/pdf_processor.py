@@ -4,163 +4,525 @@ PDF Bank Statement Processor - Simple Version
 Extracts transactions from PDF bank statements
 """
 
-import pdfplumber
-import pandas as pd
 import re
 import json
 import sys
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, Callable, Union, BinaryIO
 import io
+import os
 import base64
+from line_classifier import LineClassifier
+from date_parser import StatementDateParser, parse_date_any, resolve_dates
+from transaction_table import TransactionRow, TransactionTable
+from table_extractor import TableExtractor, lines_text
+from layout_registry import LayoutRegistry, ScannedLines, fingerprint_pdf, load_registry
+
+# Row extraction modes: regexes over page text, or positional reading of the
+# transaction table using word bounding boxes
+EXTRACTION_MODES = ('text', 'table')
+
+# Pages handed to each worker per task; small enough to balance uneven pages,
+# large enough that task overhead doesn't dominate short statements
+PAGES_PER_SHARD = 4
+
+# Statement input: raw bytes, or a seekable binary file (e.g. a spooled upload)
+PdfSource = Union[bytes, BinaryIO]
+
+# Open PDF held by each extraction worker process (set by _init_page_worker)
+_worker_pdf = None
+
+def _pdfplumber():
+    """pdfplumber (and pdfminer), imported on first use so startup and plain-text
+    input don't pay for it"""
+    import pdfplumber
+    return pdfplumber
+
+def warmup():
+    """Import the heavy dependencies now rather than on the first statement"""
+    _pdfplumber()
+    TransactionTable.from_rows([]).summary()
+
+def _init_page_worker(pdf_source: Union[bytes, str]):
+    """Open the shared PDF buffer (or file path) once per worker process"""
+    global _worker_pdf
+    if isinstance(pdf_source, str):
+        _worker_pdf = _pdfplumber().open(pdf_source)
+    else:
+        _worker_pdf = _pdfplumber().open(io.BytesIO(pdf_source))
+
+def _open_pdf(pdf_data: PdfSource):
+    """Open a PDF from bytes without copying, or from a file object in place"""
+    if isinstance(pdf_data, (bytes, bytearray, memoryview)):
+        return _pdfplumber().open(io.BytesIO(pdf_data))
+    pdf_data.seek(0)
+    return _pdfplumber().open(pdf_data)
+
+def _worker_source(pdf_data: PdfSource) -> Union[bytes, str]:
+    """What extraction workers open: the file's path when it has one, else its bytes"""
+    if isinstance(pdf_data, (bytes, bytearray, memoryview)):
+        return bytes(pdf_data)
+    name = getattr(pdf_data, 'name', None)
+    if isinstance(name, str) and os.path.isfile(name):
+        return name
+    pdf_data.seek(0)
+    return pdf_data.read()
+
+def _extract_page_shard(shard: Tuple[int, int]) -> List[str]:
+    """Extract text for pages [start, stop) of the worker's PDF"""
+    start, stop = shard
+    texts = []
+    for page in _worker_pdf.pages[start:stop]:
+        texts.append(page.extract_text() or "")
+        page.close()
+    return texts
+
+def new_stats(stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Pipeline stats collected while processing a statement (filling in any
+    missing keys of the dict given)"""
+    stats = {} if stats is None else stats
+    for key in ('extractedTextLength', 'pages', 'linesScanned'):
+        stats.setdefault(key, 0)
+    stats.setdefault('pageSeconds', [])
+    stats.setdefault('timings', {})
+    return stats
+
+def error_type(e: BaseException) -> str:
+    """Name of the underlying exception type, looking through our wrapping"""
+    return type(e.__cause__ or e).__name__
+
+class StatementSummary:
+    """Running totals for a statement, updated one transaction at a time"""
 
-class BankStatementProcessor:
     def __init__(self):
+        self.total_transactions = 0
+        self.total_income = 0
+        self.total_expenses = 0
+        self.categories = {}
+        self.months = {}
+        self.merchants = {}
+
+    def add(self, transaction: Dict[str, Any]):
+        amount = transaction['amount']
+        self.total_transactions += 1
+        month = self.months.setdefault(transaction['date'][:7], [0, 0])
+        if amount > 0:
+            self.total_income += amount
+            month[0] += amount
+        elif amount < 0:
+            self.total_expenses += abs(amount)
+            month[1] += abs(amount)
+        if transaction['merchant']:
+            merchant = self.merchants.setdefault(transaction['merchant'], [0, 0])
+            merchant[0] += abs(amount)
+            merchant[1] += 1
+        category = transaction['category']
+        self.categories[category] = self.categories.get(category, 0) + abs(amount)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'totalTransactions': self.total_transactions,
+            'totalIncome': self.total_income,
+            'totalExpenses': self.total_expenses,
+            'netFlow': self.total_income - self.total_expenses,
+            'uniqueMerchants': len(self.merchants),
+            'categories': self.categories,
+            'monthlyTotals': [
+                {'month': month, 'income': income, 'expenses': expenses, 'netFlow': income - expenses}
+                for month, (income, expenses) in sorted(self.months.items())
+            ],
+            'merchantTotals': [
+                {'merchant': merchant, 'totalAmount': total, 'count': count}
+                for merchant, (total, count) in sorted(self.merchants.items(), key=lambda item: -item[1][0])
+            ]
+        }
+
+class BankStatementProcessor:
+    def __init__(self, workers: int = 1, extraction: str = 'text',
+                 layouts: Optional[LayoutRegistry] = None):
         self.date_pattern = r'\d{1,2}[\/\-]\d{1,2}(?:[\/\-]\d{2,4})?'
         self.amount_pattern = r'\$(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'
+        # Number of processes used for page extraction (1 = serial)
+        self.workers = max(1, workers)
+        self.extraction = extraction
+        # Known statement layouts read by profile before the generic parser
+        self.layouts = layouts
+        self.classifier = LineClassifier(self.date_pattern, self.amount_pattern)
         
-    def extract_text_from_pdf(self, pdf_data: bytes) -> str:
+    def extract_text_from_pdf(self, pdf_data: PdfSource, workers: Optional[int] = None) -> str:
         """Extract text from PDF bytes or plain text"""
+        return "".join(self.iter_page_texts(pdf_data, workers))
+
+    def iter_page_texts(self, pdf_data: PdfSource, workers: Optional[int] = None,
+                        scanned: Optional[ScannedLines] = None) -> Iterator[str]:
+        """Yield statement text one page at a time, each page ending in a newline
+        (plain text input is yielded as a single page, unchanged). Leading pages
+        whose lines were already read (scanned, e.g. while fingerprinting) are
+        rebuilt from those lines instead of being extracted again"""
         try:
             # First try to decode as plain text (for testing)
-            try:
-                text = pdf_data.decode('utf-8')
-                # If it looks like plain text (not PDF), return it
-                if not text.startswith('%PDF'):
-                    return text
-            except:
-                pass
+            text = self._plain_text(pdf_data)
+            if text is not None:
+                yield text
+                return
             
             # If it's a real PDF, use pdfplumber
-            with pdfplumber.open(io.BytesIO(pdf_data)) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-                return text
+            workers = self.workers if workers is None else max(1, workers)
+            scanned = scanned or {}
+            for index in range(len(scanned)):
+                page_text = lines_text(scanned[index])
+                if page_text:
+                    yield page_text + "\n"
+            for page_text in self._iter_pages(pdf_data, workers, len(scanned)):
+                if page_text:
+                    yield page_text + "\n"
         except Exception as e:
-            raise Exception(f"Error extracting text from PDF: {str(e)}")
+            raise Exception(f"Error extracting text from PDF: {str(e)}") from e
 
-    def process_pdf(self, pdf_data: bytes) -> Dict[str, Any]:
-        """Process PDF and extract transactions"""
+    def _plain_text(self, pdf_data: PdfSource) -> Optional[str]:
+        """Return the input as text if it's plain text rather than a PDF"""
+        # Check the header first so real PDFs are never decoded as a whole
+        if isinstance(pdf_data, (bytes, bytearray, memoryview)):
+            if bytes(pdf_data[:4]) == b'%PDF':
+                return None
+            data = pdf_data
+        else:
+            pdf_data.seek(0)
+            if pdf_data.read(4) == b'%PDF':
+                return None
+            pdf_data.seek(0)
+            data = pdf_data.read()
         try:
-            # Extract text
-            text = self.extract_text_from_pdf(pdf_data)
-            
-            # Find transaction lines
-            lines = text.split('\n')
-            transactions = []
-            
-            for line in lines:
+            return bytes(data).decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+
+    def _iter_pages(self, pdf_data: PdfSource, workers: int, first_page: int = 0) -> Iterator[str]:
+        """Extract per-page text from first_page on, sharding pages across a
+        process pool when workers > 1"""
+        with _open_pdf(pdf_data) as pdf:
+            page_count = len(pdf.pages)
+            if workers == 1 or page_count - first_page <= PAGES_PER_SHARD:
+                for page in pdf.pages[first_page:]:
+                    page_text = page.extract_text() or ""
+                    page.close()
+                    yield page_text
+                return
+
+        shards = [(start, min(start + PAGES_PER_SHARD, page_count))
+                  for start in range(first_page, page_count, PAGES_PER_SHARD)]
+        workers = min(workers, len(shards))
+
+        # Each worker opens the PDF once from the buffer (or path) passed to the initializer;
+        # map() returns shards in submission order, so page order is preserved
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_page_worker,
+                                 initargs=(_worker_source(pdf_data),)) as executor:
+            for shard_texts in executor.map(_extract_page_shard, shards):
+                yield from shard_texts
+
+    def iter_rows(self, page_texts: Iterable[str],
+                  stats: Optional[Dict[str, Any]] = None) -> Iterator[TransactionRow]:
+        """Parse raw transaction rows from page texts as they arrive, counting
+        the lines examined in stats['linesScanned'] if given"""
+        # Date format is inferred and pinned per statement; rows dated before
+        # it is pinned are re-dated with it
+        date_parser = StatementDateParser()
+        return resolve_dates(self._scan_rows(page_texts, date_parser.parse, stats), date_parser)
+
+    def _scan_rows(self, page_texts: Iterable[str], parse_date: Callable[[str], Optional[datetime]],
+                   stats: Optional[Dict[str, Any]]) -> Iterator[TransactionRow]:
+        for page_text in page_texts:
+            lines_scanned = 0
+            for line in page_text.split('\n'):
                 line = line.strip()
                 if not line:
                     continue
+                lines_scanned += 1
                     
                 # Look for lines with date and amount
-                if re.search(self.date_pattern, line) and re.search(self.amount_pattern, line):
-                    # Skip header lines
-                    if any(word in line.lower() for word in ['date', 'description', 'withdrawal', 'balance']):
-                        continue
-                    
-                    # Parse the line
-                    transaction = self.parse_line(line)
-                    if transaction:
-                        transactions.append(transaction)
-            
-            # Create summary
-            total_income = sum(t['amount'] for t in transactions if t['amount'] > 0)
-            total_expenses = sum(abs(t['amount']) for t in transactions if t['amount'] < 0)
-            net_flow = total_income - total_expenses
-            
-            # Get unique merchants
-            merchants = list(set(t['merchant'] for t in transactions if t['merchant']))
+                line_match = self.classifier.match(line)
+                if not line_match:
+                    continue
+                
+                # Skip header lines
+                line_lower = line.lower()
+                if self.classifier.is_header(line_lower):
+                    continue
+                
+                # Parse the line
+                row = self._parse_row(line, line_lower, line_match, parse_date)
+                if row:
+                    yield row
+            if stats is not None:
+                stats['linesScanned'] += lines_scanned
+
+    def iter_table_rows(self, pdf_data: PdfSource, stats: Dict[str, Any],
+                        scanned: Optional[ScannedLines] = None) -> Iterator[TransactionRow]:
+        """Parse rows positionally from the statement's transaction table, skipping
+        pages without one; falls back to the text path if no table rows are found.
+        Lines already read from leading pages (scanned) are reused"""
+        scanned = scanned or {}
+        if self._plain_text(pdf_data) is None:
+            date_parser = StatementDateParser()
+            extractor = TableExtractor(self.classifier, date_parser.parse)
+            rows_found = 0
+            try:
+                with _open_pdf(pdf_data) as pdf:
+                    page_rows = (self._timed_page_rows(extractor, page, scanned.get(index), stats)
+                                 for index, page in enumerate(pdf.pages))
+                    for row in resolve_dates(chain.from_iterable(page_rows), date_parser):
+                        rows_found += 1
+                        yield row
+            except Exception as e:
+                raise Exception(f"Error extracting text from PDF: {str(e)}") from e
+            if rows_found:
+                self._table_stats(extractor, stats)
+                return
+        
+        # Plain text input, or no table rows found: use the text regexes
+        yield from self.iter_rows(self._measure_pages(self.iter_page_texts(pdf_data, 1, scanned), stats), stats)
+
+    def _timed_page_rows(self, extractor: TableExtractor, page, lines, stats: Dict[str, Any]) -> List[TransactionRow]:
+        """Rows of one page read by a TableExtractor, timed as that page's extraction"""
+        start = time.perf_counter()
+        rows = list(extractor.page_rows(page, lines))
+        page.close()
+        stats['pageSeconds'].append(time.perf_counter() - start)
+        stats['pages'] += 1
+        return rows
+
+    def _table_stats(self, extractor: TableExtractor, stats: Dict[str, Any]):
+        stats['extractedTextLength'] += extractor.text_length
+        stats['linesScanned'] += extractor.lines_scanned
+        stats['pagesSkipped'] = extractor.pages_skipped
+
+    def iter_layout_rows(self, pdf_data: PdfSource, workers: Optional[int], extraction: str,
+                         stats: Dict[str, Any]) -> Iterator[TransactionRow]:
+        """Parse rows with the registry profile matching the statement's fingerprint,
+        falling back to the generic parser when none matches (or it finds no rows),
+        which reuses the pages read for the fingerprint"""
+        rows_found = 0
+        scanned: ScannedLines = {}
+        try:
+            with _open_pdf(pdf_data) as pdf:
+                fingerprint, scanned = fingerprint_pdf(pdf)
+                profile = self.layouts.lookup(fingerprint)
+                if profile:
+                    extractor = TableExtractor(self.classifier,
+                                               StatementDateParser(date_format=profile.date_format).parse,
+                                               profile.layout, profile.sign)
+                    for index, page in enumerate(pdf.pages):
+                        rows = self._timed_page_rows(extractor, page, scanned.get(index), stats)
+                        rows_found += len(rows)
+                        yield from rows
+        except Exception as e:
+            raise Exception(f"Error extracting text from PDF: {str(e)}") from e
+        if rows_found:
+            self._table_stats(extractor, stats)
+            stats['layout'] = profile.name
+            return
+        
+        yield from self._iter_generic_rows(pdf_data, workers, extraction, stats, scanned)
+
+    def iter_statement_rows(self, pdf_data: PdfSource, workers: Optional[int] = None,
+                            extraction: Optional[str] = None,
+                            stats: Optional[Dict[str, Any]] = None) -> Iterator[TransactionRow]:
+        """Raw rows of a statement: by layout profile for known layouts, otherwise
+        using the given (or default) extraction mode"""
+        extraction = extraction or self.extraction
+        if extraction not in EXTRACTION_MODES:
+            raise ValueError(f"extraction must be one of {', '.join(EXTRACTION_MODES)}")
+        stats = new_stats(stats)
+        if self.layouts and self._plain_text(pdf_data) is None:
+            return self.iter_layout_rows(pdf_data, workers, extraction, stats)
+        return self._iter_generic_rows(pdf_data, workers, extraction, stats)
+
+    def _iter_generic_rows(self, pdf_data: PdfSource, workers: Optional[int], extraction: str,
+                           stats: Dict[str, Any], scanned: Optional[ScannedLines] = None) -> Iterator[TransactionRow]:
+        if extraction == 'table':
+            # Layout detection carries over from page to page, so pages are read serially
+            return self.iter_table_rows(pdf_data, stats, scanned)
+        return self.iter_rows(self._measure_pages(self.iter_page_texts(pdf_data, workers, scanned), stats), stats)
+
+    def iter_transactions(self, page_texts: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """Parse transactions from page texts as they arrive"""
+        for row in self.iter_rows(page_texts):
+            yield self._row_to_transaction(row)
+
+    def _measure_pages(self, page_texts: Iterable[str], stats: Dict[str, Any]) -> Iterator[str]:
+        """Pass pages through, recording their count, length and extraction time
+        (the time spent waiting for each page) in stats"""
+        page_texts = iter(page_texts)
+        while True:
+            start = time.perf_counter()
+            page_text = next(page_texts, None)
+            if page_text is None:
+                return
+            stats['pageSeconds'].append(time.perf_counter() - start)
+            stats['pages'] += 1
+            stats['extractedTextLength'] += len(page_text)
+            yield page_text
+
+    def stream_pdf(self, pdf_data: PdfSource, workers: Optional[int] = None,
+                   extraction: Optional[str] = None, debug: bool = False,
+                   stats: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Process PDF incrementally, yielding a 'transaction' event per parsed row
+        followed by a final 'summary' event (or an 'error' event on failure)"""
+        summary = StatementSummary()
+        stats = new_stats(stats)
+        rows_seconds = 0.0
+
+        try:
+            rows = self.iter_statement_rows(pdf_data, workers, extraction, stats)
+            while True:
+                # Only time spent producing rows counts, not the consumer's
+                start = time.perf_counter()
+                row = next(rows, None)
+                rows_seconds += time.perf_counter() - start
+                if row is None:
+                    break
+                transaction = self._row_to_transaction(row)
+                summary.add(transaction)
+                yield {'type': 'transaction', 'transaction': transaction}
+            self._split_row_time(stats, rows_seconds)
+        except Exception as e:
+            stats['error'] = error_type(e)
+            yield {
+                'type': 'error',
+                'success': False,
+                'error': str(e),
+                'summary': StatementSummary().to_dict()
+            }
+            return
+
+        start = time.perf_counter()
+        summary_dict = summary.to_dict()
+        stats['timings']['summary'] = time.perf_counter() - start
+        stats['transactions'] = summary.total_transactions
+        yield {
+            'type': 'summary',
+            'success': True,
+            'summary': summary_dict,
+            'metadata': self._metadata(stats, summary.total_transactions, debug)
+        }
+
+    def _split_row_time(self, stats: Dict[str, Any], rows_seconds: float):
+        """Split the time spent producing rows into page extraction and line parsing"""
+        extract_seconds = sum(stats['pageSeconds'])
+        stats['timings']['extract'] = extract_seconds
+        stats['timings']['parse'] = max(0.0, rows_seconds - extract_seconds)
+
+    def _metadata(self, stats: Dict[str, Any], transaction_count: int, debug: bool = False) -> Dict[str, Any]:
+        metadata = {
+            'processedAt': datetime.now().isoformat(),
+            'extractedTextLength': stats['extractedTextLength'],
+            'transactionLinesFound': transaction_count
+        }
+        if 'pagesSkipped' in stats:
+            metadata['pagesSkipped'] = stats['pagesSkipped']
+        if 'layout' in stats:
+            metadata['layout'] = stats['layout']
+        if debug:
+            metadata['timings'] = dict(stats['timings'])
+            metadata['pages'] = stats['pages']
+            metadata['linesScanned'] = stats['linesScanned']
+        return metadata
+
+    def process_table(self, pdf_data: PdfSource, workers: Optional[int] = None,
+                      extraction: Optional[str] = None,
+                      stats: Optional[Dict[str, Any]] = None) -> Tuple[TransactionTable, Dict[str, Any]]:
+        """Parse a statement straight into a columnar TransactionTable"""
+        stats = new_stats(stats)
+        start = time.perf_counter()
+        rows = self.iter_statement_rows(pdf_data, workers, extraction, stats)
+        table = TransactionTable.from_rows(rows)
+        self._split_row_time(stats, time.perf_counter() - start)
+        stats['transactions'] = len(table)
+        return table, stats
+
+    def process_pdf(self, pdf_data: PdfSource, workers: Optional[int] = None,
+                    extraction: Optional[str] = None, debug: bool = False,
+                    stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Process PDF and extract transactions; with debug, metadata includes
+        per-stage timings. Pass a stats dict to receive the raw pipeline stats."""
+        stats = new_stats(stats)
+        try:
+            table, stats = self.process_table(pdf_data, workers, extraction, stats)
             
-            # Get category breakdown
-            categories = {}
-            for transaction in transactions:
-                category = transaction['category']
-                if category not in categories:
-                    categories[category] = 0
-                categories[category] += abs(transaction['amount'])
+            start = time.perf_counter()
+            transactions = table.to_records()
+            summary = table.summary()
+            stats['timings']['summary'] = time.perf_counter() - start
             
             return {
                 'success': True,
                 'transactions': transactions,
-                'summary': {
-                    'totalTransactions': len(transactions),
-                    'totalIncome': total_income,
-                    'totalExpenses': total_expenses,
-                    'netFlow': net_flow,
-                    'uniqueMerchants': len(merchants),
-                    'categories': categories
-                },
-                'metadata': {
-                    'processedAt': datetime.now().isoformat(),
-                    'extractedTextLength': len(text),
-                    'transactionLinesFound': len(transactions)
-                }
+                'summary': summary,
+                'metadata': self._metadata(stats, len(table), debug)
             }
             
         except Exception as e:
+            stats['error'] = error_type(e)
             return {
                 'success': False,
                 'error': str(e),
                 'transactions': [],
-                'summary': {
-                    'totalTransactions': 0,
-                    'totalIncome': 0,
-                    'totalExpenses': 0,
-                    'netFlow': 0,
-                    'uniqueMerchants': 0,
-                    'categories': {}
-                }
+                'summary': StatementSummary().to_dict()
             }
     
     def parse_line(self, line: str) -> Optional[Dict[str, Any]]:
         """Parse a single transaction line"""
-        # Find date
-        date_match = re.search(self.date_pattern, line)
-        if not date_match:
+        # Find date and first amount
+        line_match = self.classifier.match(line)
+        if not line_match:
             return None
-            
-        date_str = date_match.group()
         
-        # Find amounts
-        amount_matches = re.findall(self.amount_pattern, line)
-        if not amount_matches:
-            return None
-            
+        row = self._parse_row(line, line.lower(), line_match, self.parse_date)
+        return self._row_to_transaction(row) if row else None
+    
+    def _parse_row(self, line: str, line_lower: str, line_match: re.Match,
+                   parse_date: Callable[[str], Optional[datetime]]) -> Optional[TransactionRow]:
+        """Parse a line already matched by the classifier into a raw row"""
+        date_str = line_match.group('date')
+        
         # Get the first amount (usually the transaction amount)
-        amount_str = amount_matches[0]
+        amount_str = line_match.group('amount_token')[1:]
         amount = float(amount_str.replace(',', ''))
         
         # Determine if it's a withdrawal or deposit
         # Look for keywords that indicate withdrawal (money going out)
-        withdrawal_keywords = ['bill', 'withdrawal', 'debit', 'payment', 'rent', 'electric', 'phone', 'internet', 'tax', 'purchase', 'buy', 'spent', 'fee', 'charge', 'starbucks', 'amazon', 'target', 'spotify', 'gas', 'meijer', 'venmo', 'apple', 'store', 'subscription', 'transfer', 'groceries', 'supplies', 'textbooks', 'campus', 'coffee', 'restaurant', 'food', 'shopping']
-        is_withdrawal = any(keyword in line.lower() for keyword in withdrawal_keywords)
-        
-        if is_withdrawal:
-            amount = -abs(amount)  # Money going out = negative
-        else:
-            amount = abs(amount)   # Money coming in = positive
+        is_withdrawal = self.classifier.is_withdrawal(line_lower)
         
         # Extract description (everything between date and first amount)
-        date_end = date_match.end()
-        amount_start = line.find('$' + amount_str)
-        description = line[date_end:amount_start].strip()
+        description = line[line_match.end('date'):line_match.start('amount_token')].strip()
         
         # Parse date
-        date = self.parse_date(date_str)
+        date = parse_date(date_str)
         if not date:
             return None
-            
-        # Determine transaction type
-        transaction_type = 'debit' if amount < 0 else 'credit'
         
         # Categorize
         category = self.categorize_transaction(description)
         
+        return date, description, amount, is_withdrawal, category
+    
+    def _row_to_transaction(self, row: TransactionRow) -> Dict[str, Any]:
+        """Build the transaction dict for a raw row"""
+        date, description, amount, is_withdrawal, category = row
+        
+        if is_withdrawal:
+            amount = -abs(amount)  # Money going out = negative
+        else:
+            amount = abs(amount)   # Money coming in = positive
+            
+        # Determine transaction type
+        transaction_type = 'debit' if amount < 0 else 'credit'
+        
         return {
             'date': date.strftime('%Y-%m-%d'),
             'description': description,
@@ -172,57 +534,69 @@ class BankStatementProcessor:
     
     def parse_date(self, date_str: str) -> Optional[datetime]:
         """Parse date string to datetime object"""
-        date_formats = [
-            '%m/%d/%Y', '%m-%d-%Y', '%m/%d/%y', '%m-%d-%y',
-            '%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y',
-            '%Y-%m-%d', '%Y/%m/%d', '%m/%d', '%m-%d'
-        ]
-        
-        for fmt in date_formats:
-            try:
-                parsed_date = datetime.strptime(date_str, fmt)
-                # If no year specified, assume current year
-                if parsed_date.year == 1900:
-                    parsed_date = parsed_date.replace(year=2024)
-                return parsed_date
-            except ValueError:
-                continue
-        
-        return None
+        return parse_date_any(date_str)
     
     def categorize_transaction(self, description: str) -> str:
         """Categorize transaction based on description"""
-        desc_lower = description.lower()
-        
-        if any(keyword in desc_lower for keyword in ['rent', 'electric', 'phone', 'internet', 'utilities']):
-            return 'Utilities'
-        elif any(keyword in desc_lower for keyword in ['bill', 'payment']):
-            return 'Bills'
-        elif any(keyword in desc_lower for keyword in ['deposit', 'salary', 'payroll']):
-            return 'Income'
-        elif any(keyword in desc_lower for keyword in ['interest', 'earned']):
-            return 'Interest'
-        elif any(keyword in desc_lower for keyword in ['tax', 'withholding']):
-            return 'Taxes'
-        elif any(keyword in desc_lower for keyword in ['check', 'payment']):
-            return 'Income'
-        else:
-            return 'Other'
+        return self.classifier.categorize(description)
 
 def main():
     """Main function for command line usage"""
-    if len(sys.argv) != 2:
-        print("Usage: python pdf_processor.py <pdf_file>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Extract transactions from a PDF bank statement")
+    parser.add_argument('pdf_file', nargs='?', help="PDF (or plain text) statement to process")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Processes used for page extraction (default: 1, serial)")
+    parser.add_argument('--extraction', choices=EXTRACTION_MODES, default='text',
+                        help="Row extraction: regexes over page text, or positional table reading")
+    parser.add_argument('--layouts', metavar='FILE', default=None,
+                        help="Layout registry file (default: $PDF_LAYOUTS_FILE, else none)")
+    parser.add_argument('--warmup', action='store_true',
+                        help="Import pdfplumber and pandas up front and report how long it took")
+    parser.add_argument('--batch', metavar='DIR_OR_GLOB',
+                        help="Process every statement in a directory or glob, one JSON line per file")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="Statements processed in parallel with --batch (default: CPU count)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Run under cProfile and store the profile by document hash")
+    parser.add_argument('--profile-dir', metavar='DIR', default=None,
+                        help="Where --profile stores profiles (default: $PDF_PROFILE_DIR or a temp dir)")
+    parser.add_argument('--account', metavar='ID', default=None,
+                        help="Print only transactions not already seen for this account, and their summary, "
+                             "recording them as seen")
+    parser.add_argument('--dedup-db', metavar='FILE', default=None,
+                        help="Dedup index used with --account (default: $PDF_DEDUP_DB or dedup-index.sqlite3)")
+    args = parser.parse_args()
     
-    pdf_file = sys.argv[1]
+    if args.warmup:
+        start = time.perf_counter()
+        warmup()
+        print(f"Warmed up in {time.perf_counter() - start:.3f}s", file=sys.stderr)
+        if not args.pdf_file and not args.batch:
+            return
+    if args.batch:
+        run_batch(args.batch, args.jobs, args.layouts)
+        return
+    if not args.pdf_file:
+        parser.error("a pdf_file or --batch is required")
     
     try:
-        with open(pdf_file, 'rb') as f:
+        with open(args.pdf_file, 'rb') as f:
             pdf_data = f.read()
         
-        processor = BankStatementProcessor()
-        result = processor.process_pdf(pdf_data)
+        processor = BankStatementProcessor(workers=args.workers, extraction=args.extraction,
+                                           layouts=load_registry(args.layouts))
+        if args.profile:
+            from profiling import ProfileStore, StatementProfiler
+            from result_cache import content_key
+            profiler = StatementProfiler(ProfileStore(args.profile_dir))
+            result, profile_id = profiler.run(content_key(pdf_data), processor.process_pdf, pdf_data, profile=True)
+            print(f"Profile stored as {profile_id} in {profiler.store.profile_dir}", file=sys.stderr)
+        else:
+            result = processor.process_pdf(pdf_data)
+        if args.account:
+            from dedup_index import DedupIndex
+            dedup_db = args.dedup_db or os.environ.get('PDF_DEDUP_DB') or 'dedup-index.sqlite3'
+            result = DedupIndex(dedup_db).apply(args.account, result, record=True)
         
         print(json.dumps(result, indent=2))
         
@@ -230,5 +604,20 @@ def main():
         print(f"Error: {e}")
         sys.exit(1)
 
+def run_batch(pattern: str, jobs: Optional[int], layouts_file: Optional[str] = None):
+    """Print per-file results as NDJSON as they finish, then the combined summary"""
+    from batch import expand_paths, iter_batch
+    
+    paths = expand_paths(pattern)
+    if not paths:
+        print(f"Error: no statements match {pattern}")
+        sys.exit(1)
+    
+    failed = False
+    for event in iter_batch(((path, path) for path in paths), jobs, layouts_file):
+        print(json.dumps(event), flush=True)
+        failed = failed or not event['success']
+    sys.exit(1 if failed else 0)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Profiling for slow statements
+Runs statement processing under cProfile on request, or under a low-overhead
+stack sampler that keeps the profile only when processing turns out slower
+than a threshold. Profiles are stored by document hash with a JSON sidecar,
+and can be listed, shown and diffed from the command line:
+
+    python profiling.py list
+    python profiling.py show <id> [--top 25]
+    python profiling.py diff <id-a> <id-b> [--top 25]
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Where profiles go unless PDF_PROFILE_DIR (or --dir) says otherwise
+DEFAULT_PROFILE_DIR = os.path.join(tempfile.gettempdir(), 'pdf-profiles')
+
+# Seconds between stack samples while watching for slow statements
+SAMPLE_INTERVAL = 0.005
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """Samples one thread's Python stack on a background thread, counting
+    folded stacks ("outer;...;inner") as flame-graph tools expect"""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self) -> Counter:
+        self.stopped.set()
+        self.thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+class ProfileStore:
+    """Profiles on disk: <dir>/<document hash>/<timestamp>-<mode>.{prof,folded,json}"""
+
+    def __init__(self, profile_dir: Optional[str] = None, max_profiles: int = 200):
+        self.profile_dir = profile_dir or os.environ.get('PDF_PROFILE_DIR') or DEFAULT_PROFILE_DIR
+        self.max_profiles = max_profiles
+
+    def save(self, document_hash: str, mode: str, write: Callable[[str], None],
+             meta: Dict[str, Any]) -> str:
+        """Write a profile artifact via write(path) plus its metadata; returns its id"""
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        profile_id = f"{document_hash[:16]}/{stamp}-{mode}"
+        base = os.path.join(self.profile_dir, profile_id)
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        write(base + ('.prof' if mode == 'cprofile' else '.folded'))
+        with open(base + '.json', 'w') as f:
+            json.dump({'id': profile_id, 'documentHash': document_hash, 'mode': mode,
+                       'capturedAt': datetime.now().isoformat(), **meta}, f, indent=2)
+        self._prune()
+        return profile_id
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadata of every stored profile, newest first"""
+        profiles = []
+        if not os.path.isdir(self.profile_dir):
+            return profiles
+        for document_dir in os.listdir(self.profile_dir):
+            directory = os.path.join(self.profile_dir, document_dir)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if name.endswith('.json'):
+                    try:
+                        with open(os.path.join(directory, name)) as f:
+                            profiles.append(json.load(f))
+                    except (OSError, ValueError):
+                        continue
+        return sorted(profiles, key=lambda meta: meta['capturedAt'], reverse=True)
+
+    def inclusive_seconds(self, profile_id: str) -> Dict[str, float]:
+        """Inclusive (cumulative) seconds per function of a stored profile"""
+        base = os.path.join(self.profile_dir, profile_id)
+        if os.path.exists(base + '.prof'):
+            totals = {}
+            for (filename, line, function), (_, _, _, cumulative, _) in pstats.Stats(base + '.prof').stats.items():
+                totals[f"{function} ({os.path.basename(filename)}:{line})"] = cumulative
+            return totals
+        with open(base + '.json') as f:
+            meta = json.load(f)
+        # Samples arrive less often than the interval while the GIL is busy, so
+        # spread the measured wall time over the samples actually taken
+        per_sample = meta['seconds'] / meta['samples'] if meta.get('samples') else meta['sampleInterval']
+        totals: Counter = Counter()
+        with open(base + '.folded') as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                # Count each function once per sample, however deep it recurses
+                for function in set(stack.split(';')):
+                    totals[function] += int(count) * per_sample
+        return dict(totals)
+
+    def _prune(self):
+        for meta in self.list()[self.max_profiles:]:
+            base = os.path.join(self.profile_dir, meta['id'])
+            for suffix in ('.prof', '.folded', '.json'):
+                if os.path.exists(base + suffix):
+                    os.remove(base + suffix)
+
+class StatementProfiler:
+    """Wraps statement processing: cProfile when asked, otherwise (if a slow
+    threshold is set) a stack sampler whose profile is kept only for slow runs"""
+
+    def __init__(self, store: ProfileStore, slow_seconds: Optional[float] = None,
+                 interval: float = SAMPLE_INTERVAL):
+        self.store = store
+        self.slow_seconds = slow_seconds
+        self.interval = interval
+
+    def run(self, document_hash: str, fn: Callable[..., Any], *args: Any, profile: bool = False,
+            **kwargs: Any) -> Tuple[Any, Optional[str]]:
+        """Call fn(*args, **kwargs), returning its result and the stored profile id (if any)"""
+        if profile:
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            result = profiler.runcall(fn, *args, **kwargs)
+            seconds = time.perf_counter() - start
+            profile_id = self.store.save(document_hash, 'cprofile', profiler.dump_stats,
+                                         {'reason': 'requested', 'seconds': seconds})
+            return result, profile_id
+
+        if not self.slow_seconds:
+            return fn(*args, **kwargs), None
+
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            samples = sampler.stop()
+        if seconds < self.slow_seconds:
+            return result, None
+
+        def write(path):
+            with open(path, 'w') as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+
+        profile_id = self.store.save(document_hash, 'sampling', write, {
+            'reason': 'slow', 'seconds': seconds, 'thresholdSeconds': self.slow_seconds,
+            'sampleInterval': self.interval, 'samples': sum(samples.values())
+        })
+        return result, profile_id
+
+def _print_top(totals: Dict[str, float], top: int):
+    for function, seconds in sorted(totals.items(), key=lambda item: -item[1])[:top]:
+        print(f"{seconds:10.4f}s  {function}")
+
+def main():
+    parser = argparse.ArgumentParser(description="List, show and diff stored statement profiles")
+    parser.add_argument('--dir', default=None, help="Profile directory (default: $PDF_PROFILE_DIR or a temp dir)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="Stored profiles, newest first")
+    show = commands.add_parser('show', help="Functions with the most inclusive time")
+    show.add_argument('profile_id')
+    show.add_argument('--top', type=int, default=25)
+    diff = commands.add_parser('diff', help="Largest per-function changes from profile A to B")
+    diff.add_argument('profile_a')
+    diff.add_argument('profile_b')
+    diff.add_argument('--top', type=int, default=25)
+    args = parser.parse_args()
+
+    store = ProfileStore(args.dir)
+    if args.command == 'list':
+        for meta in store.list():
+            print(f"{meta['id']:<50} {meta['mode']:<9} {meta['reason']:<9} {meta['seconds']:8.3f}s  "
+                  f"{meta['capturedAt']}")
+    elif args.command == 'show':
+        _print_top(store.inclusive_seconds(args.profile_id), args.top)
+    else:
+        before = store.inclusive_seconds(args.profile_a)
+        after = store.inclusive_seconds(args.profile_b)
+        changes = {function: after.get(function, 0) - before.get(function, 0)
+                   for function in set(before) | set(after)}
+        print(f"{'delta':>10} {'A':>10} {'B':>10}  function")
+        for function, delta in sorted(changes.items(), key=lambda item: -abs(item[1]))[:args.top]:
+            print(f"{delta:+10.4f} {before.get(function, 0):10.4f} {after.get(function, 0):10.4f}  {function}")
+
+if __name__ == "__main__":
+    main()
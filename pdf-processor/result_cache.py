@@ -0,0 +1,119 @@
+"""
+Content-hash result cache for processed statements
+In-memory LRU bounded by serialized size, with an optional on-disk tier of
+gzip-compressed JSON files that survives restarts
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Optional, Union
+
+def content_key(pdf_data: Union[bytes, BinaryIO]) -> str:
+    """Cache key for a statement: SHA-256 of the decoded bytes (or file contents)"""
+    if isinstance(pdf_data, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(pdf_data).hexdigest()
+    digest = hashlib.sha256()
+    pdf_data.seek(0)
+    for chunk in iter(lambda: pdf_data.read(1024 * 1024), b''):
+        digest.update(chunk)
+    pdf_data.seek(0)
+    return digest.hexdigest()
+
+class ResultCache:
+    """Two-tier cache of process_pdf results keyed by content hash"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, cache_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.entries: OrderedDict = OrderedDict()
+        self.current_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            payload = self.entries.get(key)
+            if payload is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(payload)
+
+        payload = self._read_disk(key)
+        with self.lock:
+            if payload is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, payload)
+        return json.loads(payload)
+
+    def put(self, key: str, result: Dict[str, Any]):
+        payload = json.dumps(result).encode('utf-8')
+        with self.lock:
+            self._store(key, payload)
+        self._write_disk(key, payload)
+
+    def _store(self, key: str, payload: bytes):
+        """Insert into the memory tier and evict least recently used entries (lock held)"""
+        if len(payload) > self.max_bytes:
+            return
+        if key in self.entries:
+            self.current_bytes -= len(self.entries.pop(key))
+        self.entries[key] = payload
+        self.current_bytes += len(payload)
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.current_bytes -= len(evicted)
+            self.evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json.gz")
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        try:
+            with gzip.open(self._disk_path(key), 'rb') as f:
+                return f.read()
+        except (OSError, EOFError):
+            return None
+
+    def _write_disk(self, key: str, payload: bytes):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(gzip.compress(payload))
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'diskHits': self.disk_hits,
+                'misses': self.misses,
+                'hitRate': (self.hits + self.disk_hits) / lookups if lookups else 0,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.current_bytes,
+                'maxBytes': self.max_bytes,
+                'diskEnabled': bool(self.cache_dir)
+            }
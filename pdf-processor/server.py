@@ -4,48 +4,323 @@ PDF Processing Server
 A simple HTTP server for processing PDF bank statements
 """
 
-from flask import Flask, request, jsonify
-from pdf_processor import BankStatementProcessor
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
+from pdf_processor import BankStatementProcessor, EXTRACTION_MODES, warmup
+from batch import iter_batch
+from result_cache import ResultCache, content_key
+from layout_registry import load_registry
+from jobs import JobQueue, QueueFull
+from dedup_index import DedupIndex, fingerprint_token, parse_token
+from profiling import ProfileStore, StatementProfiler
+from metrics import (REGISTRY, BYTES_RECEIVED, ERRORS, REQUEST_SECONDS, REQUESTS, STAGE_SECONDS, STATEMENTS,
+                     record_statement, sample_lines)
+from datetime import datetime
+import argparse
 import base64
 import io
+import json
 import os
+import tempfile
+import time
+
+# Chunk size used when spooling raw and multipart uploads to disk
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+# Most processes a request may ask for ("workers", "jobs"); defaults to the CPU count
+MAX_REQUEST_WORKERS = int(os.environ.get('PDF_MAX_REQUEST_WORKERS', 0)) or os.cpu_count() or 1
 
 app = Flask(__name__)
-processor = BankStatementProcessor()
+# Upper bound on request bodies (JSON, raw PDF or multipart); larger uploads get a 413
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('PDF_MAX_UPLOAD_BYTES', 50 * 1024 * 1024))
+# Default page-extraction worker count and extraction mode; requests may
+# override them with "workers" and "extraction". Known statement layouts come
+# from the registry file in PDF_LAYOUTS_FILE, if set
+processor = BankStatementProcessor(
+    workers=int(os.environ.get('PDF_WORKERS', 1)),
+    extraction=os.environ.get('PDF_EXTRACTION', 'text'),
+    layouts=load_registry()
+)
+# pdfplumber and pandas load on the first statement unless PDF_WARMUP=1 (set by
+# the gunicorn config, so preforked workers share them) or --warmup is given
+if os.environ.get('PDF_WARMUP') == '1':
+    warmup()
+# Results of successfully processed statements, keyed by content hash;
+# set PDF_CACHE_DIR to keep them on disk across restarts
+result_cache = ResultCache(
+    max_bytes=int(os.environ.get('PDF_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    cache_dir=os.environ.get('PDF_CACHE_DIR') or None
+)
+# Background statement processing for POST /jobs; submissions beyond
+# PDF_JOB_MAX_PENDING unfinished jobs are turned away with a 429. Job records
+# are kept in PDF_JOB_DB (an SQLite file shared by all web workers) if set
+job_queue = JobQueue(
+    workers=int(os.environ.get('PDF_JOB_WORKERS', 0)) or None,
+    max_pending=int(os.environ.get('PDF_JOB_MAX_PENDING', 32)),
+    retention_seconds=float(os.environ.get('PDF_JOB_RETENTION_SECONDS', 3600)),
+    db_path=os.environ.get('PDF_JOB_DB') or ':memory:'
+)
+# Requests with an "accountId" get back only the transactions not already
+# recorded for that account (overlapping or re-downloaded statements), with the
+# summary of just those rows and their fingerprints, which the client records
+# at POST /dedup/<accountId> as it stores them. Seen transactions are kept per
+# account in PDF_DEDUP_DB, an SQLite file shared by all web workers that must
+# outlive restarts; without it dedup is off and accountId is ignored
+dedup_index = DedupIndex(os.environ['PDF_DEDUP_DB']) if os.environ.get('PDF_DEDUP_DB') else None
+# Requests with an "X-Profile: 1" header (or "profile": true) run under
+# cProfile; with PDF_PROFILE_SLOW_SECONDS set, every other statement is
+# stack-sampled and the profile kept if it took longer than that. Profiles are
+# stored by document hash in PDF_PROFILE_DIR (see profiling.py to list/diff)
+statement_profiler = StatementProfiler(
+    ProfileStore(max_profiles=int(os.environ.get('PDF_PROFILE_MAX', 200))),
+    slow_seconds=float(os.environ.get('PDF_PROFILE_SLOW_SECONDS', 0)) or None
+)
 
-@app.route('/process-pdf', methods=['POST'])
-def process_pdf():
+def decode_pdf_data(pdf_data_str: str) -> bytes:
+    """Decode base64 PDF data, falling back to treating the payload as plain text"""
+    # Try to decode as base64 first
+    try:
+        pdf_data = base64.b64decode(pdf_data_str)
+        
+        # Check if it's a valid PDF
+        if pdf_data.startswith(b'%PDF'):
+            return pdf_data
+    except Exception:
+        pass
+    
+    # If base64 decoding fails or isn't a PDF, treat as plain text
+    return pdf_data_str.encode('utf-8')
+
+def spool_upload(stream) -> tempfile.NamedTemporaryFile:
+    """Copy an upload stream to a temp file in chunks, enforcing MAX_CONTENT_LENGTH"""
+    max_bytes = app.config['MAX_CONTENT_LENGTH']
+    spooled = tempfile.NamedTemporaryFile(prefix='statement-', suffix='.pdf')
+    size = 0
+    while True:
+        chunk = stream.read(SPOOL_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if max_bytes and size > max_bytes:
+            spooled.close()
+            raise RequestEntityTooLarge()
+        spooled.write(chunk)
+    spooled.flush()
+    spooled.seek(0)
+    return spooled
+
+def parse_workers(value, name: str = 'workers'):
+    """Optional per-request process count, from 1 to MAX_REQUEST_WORKERS;
+    raises ValueError with a client-facing message when invalid"""
+    if value is None:
+        return None
+    try:
+        workers = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be an integer')
+    if not 1 <= workers <= MAX_REQUEST_WORKERS:
+        raise ValueError(f'{name} must be between 1 and {MAX_REQUEST_WORKERS}')
+    return workers
+
+def parse_flag(value) -> bool:
+    """Boolean option given as JSON true or a "1"/"true"/"yes" string"""
+    return value is True or str(value).lower() in ('1', 'true', 'yes')
+
+def parse_options(params) -> dict:
+    """Per-request processing options ("workers", "extraction", "debug",
+    "profile", "accountId") from a mapping; raises ValueError with a client-facing message
+    when one is invalid"""
+    workers = parse_workers(params.get('workers'))
+    extraction = params.get('extraction')
+    if extraction is not None and extraction not in EXTRACTION_MODES:
+        raise ValueError(f"extraction must be one of {', '.join(EXTRACTION_MODES)}")
+    account_id = params.get('accountId')
+    if account_id is not None and (not isinstance(account_id, str) or not account_id.strip()):
+        raise ValueError('accountId must be a non-empty string')
+    return {'workers': workers, 'extraction': extraction, 'debug': parse_flag(params.get('debug')),
+            'profile': parse_flag(params.get('profile') or request.headers.get('X-Profile')),
+            'accountId': account_id}
+
+def read_pdf_request():
+    """Parse a /process-pdf style request into (pdf_data, options, error_response)
+
+    Accepts a JSON body with base64 "pdfData", a raw application/pdf body, or a
+    multipart/form-data upload with a "file" part. Raw and multipart uploads are
+    spooled to a temp file (bytes or a file object are both valid pdf_data) and
+    their options come from the query string or form fields. Reading and
+    decoding the body is timed as the "decode" stage (options["decodeSeconds"]).
+    """
+    mimetype = request.mimetype
+    start = time.perf_counter()
+    
     try:
+        if mimetype in ('application/pdf', 'application/octet-stream'):
+            options = parse_options(request.args)
+            return received(spool_upload(request.stream), options, start), options, None
+        
+        if mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if upload is None:
+                return None, None, (jsonify({
+                    'success': False,
+                    'error': 'No PDF file provided'
+                }), 400)
+            options = parse_options({**request.args.to_dict(), **request.form.to_dict()})
+            return received(spool_upload(upload.stream), options, start), options, None
+        
         data = request.get_json()
         
         if not data or 'pdfData' not in data:
-            return jsonify({
+            return None, None, (jsonify({
                 'success': False,
                 'error': 'No PDF data provided'
+            }), 400)
+        
+        options = parse_options(data)
+    except ValueError as e:
+        return None, None, (jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400)
+    
+    # Handle both base64 PDF data and plain text
+    return received(decode_pdf_data(data['pdfData']), options, start), options, None
+
+def received(pdf_data, options: dict, start: float):
+    """Record the decoded upload's size and decode time"""
+    options['decodeSeconds'] = time.perf_counter() - start
+    STAGE_SECONDS.observe(options['decodeSeconds'], stage='decode')
+    if isinstance(pdf_data, bytes):
+        BYTES_RECEIVED.inc(len(pdf_data))
+    else:
+        BYTES_RECEIVED.inc(os.fstat(pdf_data.fileno()).st_size)
+    return pdf_data
+
+def close_upload(pdf_data):
+    """Release the temp file behind a spooled upload"""
+    if hasattr(pdf_data, 'close'):
+        pdf_data.close()
+
+def cached_result(cache_key: str):
+    """Cached process_pdf result with its metadata updated for this request, or None"""
+    cached = result_cache.get(cache_key)
+    if cached:
+        metadata = cached['metadata']
+        metadata['cachedAt'] = metadata['processedAt']
+        metadata['processedAt'] = datetime.now().isoformat()
+        metadata['cacheHit'] = True
+    return cached
+
+def deduplicated(result, options: dict):
+    """The result reduced to the account's unseen transactions when the
+    request names an accountId (after caching, which keeps the full result)"""
+    if options['accountId'] is None or dedup_index is None:
+        return result
+    return dedup_index.apply(options['accountId'], result)
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def count_request(response):
+    # Streaming responses are counted when their headers are sent
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    if response.status_code >= 400:
+        ERRORS.inc(type=f"http_{response.status_code}")
+    if 'request_start' in g:
+        REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, endpoint=endpoint)
+    return response
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    return jsonify({
+        'success': False,
+        'error': f"Upload exceeds the {app.config['MAX_CONTENT_LENGTH']} byte limit"
+    }), 413
+
+@app.route('/process-pdf', methods=['POST'])
+def process_pdf():
+    pdf_data = None
+    try:
+        pdf_data, options, error_response = read_pdf_request()
+        if error_response:
+            return error_response
+        
+        # Serve repeat uploads of the same statement from the cache (debug and
+        # profiled requests always process, so their timings are real)
+        extraction = options['extraction'] or processor.extraction
+        document_hash = content_key(pdf_data)
+        cache_key = f"{document_hash}-{extraction}"
+        uncached = options['debug'] or options['profile']
+        cached = None if uncached else cached_result(cache_key)
+        if cached:
+            STATEMENTS.inc(outcome='cache_hit')
+            return jsonify(deduplicated(cached, options))
+        
+        stats = {}
+        result, profile_id = statement_profiler.run(
+            document_hash, processor.process_pdf, pdf_data, options['workers'], extraction,
+            options['debug'], stats, profile=options['profile']
+        )
+        record_statement(stats, stats.get('error'))
+        if result['success']:
+            if options['debug']:
+                result['metadata']['timings']['decode'] = options['decodeSeconds']
+            if not uncached:
+                result_cache.put(cache_key, result)
+            result['metadata']['cacheHit'] = False
+        
+        response = jsonify(deduplicated(result, options))
+        if profile_id:
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+        
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'transactions': []
+        }), 500
+    finally:
+        close_upload(pdf_data)
+
+@app.route('/process-pdf/stream', methods=['POST'])
+def process_pdf_stream():
+    """Stream transactions as NDJSON: one {"type": "transaction"} line per row,
+    then a final {"type": "summary"} (or {"type": "error"}) line. For clients
+    that consume rows as they arrive; the Convex upload goes through /jobs,
+    which it needs for queueing and accountId dedup"""
+    try:
+        pdf_data, options, error_response = read_pdf_request()
+        if error_response:
+            return error_response
+        if options['accountId'] is not None:
+            close_upload(pdf_data)
+            return jsonify({
+                'success': False,
+                'error': 'accountId is not supported when streaming; use /process-pdf or /jobs'
             }), 400
         
-        # Handle both base64 PDF data and plain text
-        pdf_data_str = data['pdfData']
+        def generate():
+            stats = {}
+            for event in processor.stream_pdf(pdf_data, options['workers'], options['extraction'],
+                                              options['debug'], stats):
+                if event['type'] == 'summary' and options['debug']:
+                    event['metadata']['timings']['decode'] = options['decodeSeconds']
+                yield json.dumps(event) + '\n'
+            record_statement(stats, stats.get('error'))
         
-        # Try to decode as base64 first
-        try:
-            pdf_data = base64.b64decode(pdf_data_str)
-            
-            # Check if it's a valid PDF
-            if not pdf_data.startswith(b'%PDF'):
-                # Try to process as text anyway
-                pdf_data = pdf_data_str.encode('utf-8')
-                result = processor.process_pdf(pdf_data)
-            else:
-                # If successful, process as PDF
-                result = processor.process_pdf(pdf_data)
-        except Exception as e:
-            # If base64 decoding fails, treat as plain text
-            pdf_data = pdf_data_str.encode('utf-8')
-            result = processor.process_pdf(pdf_data)
-        
-        return jsonify(result)
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        # The spooled upload must outlive this function, so close it with the response
+        response.call_on_close(lambda: close_upload(pdf_data))
+        return response
         
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
@@ -53,10 +328,200 @@ def process_pdf():
             'transactions': []
         }), 500
 
+@app.route('/process-batch', methods=['POST'])
+def process_batch():
+    """Process many statements in parallel, streaming NDJSON: one {"type": "file"}
+    line per statement as it finishes, then a {"type": "batch_summary"} line.
+    Accepts multipart "files" parts or JSON {"statements": [{"fileName", "pdfData"}]}"""
+    uploads = []
+    streaming = False
+    try:
+        try:
+            jobs = parse_workers(request.args.get('jobs'), 'jobs')
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        if jobs is None and os.environ.get('PDF_BATCH_JOBS'):
+            jobs = int(os.environ['PDF_BATCH_JOBS'])
+        
+        if request.mimetype == 'multipart/form-data':
+            items = []
+            for upload in request.files.getlist('files'):
+                spooled = spool_upload(upload.stream)
+                uploads.append(spooled)
+                # Workers reopen the spooled file by path
+                items.append((upload.filename or spooled.name, spooled.name))
+        else:
+            data = request.get_json()
+            statements = (data or {}).get('statements') or []
+            items = [(statement.get('fileName') or f"statement-{i}", decode_pdf_data(statement['pdfData']))
+                     for i, statement in enumerate(statements) if 'pdfData' in statement]
+        
+        if not items:
+            return jsonify({
+                'success': False,
+                'error': 'No statements provided'
+            }), 400
+        
+        def generate():
+            for event in iter_batch(items, jobs):
+                yield json.dumps(event) + '\n'
+        
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        # Spooled uploads must outlive this function, so close them with the response
+        response.call_on_close(lambda: [close_upload(spooled) for spooled in uploads])
+        streaming = True
+        return response
+        
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+    finally:
+        if not streaming:
+            for spooled in uploads:
+                close_upload(spooled)
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a statement for background processing; accepts the same bodies as
+    /process-pdf and returns 202 with the job id to poll at GET /jobs/<id>"""
+    pdf_data = None
+    queued = False
+    try:
+        pdf_data, options, error_response = read_pdf_request()
+        if error_response:
+            return error_response
+        
+        extraction = options['extraction'] or processor.extraction
+        cache_key = f"{content_key(pdf_data)}-{extraction}"
+        cached = cached_result(cache_key)
+        if cached:
+            STATEMENTS.inc(outcome='cache_hit')
+            job = job_queue.add_completed(deduplicated(cached, options))
+        else:
+            upload = pdf_data
+            
+            def on_done(job):
+                # Runs once the worker finishes; the spooled upload is no longer needed
+                stats = job.get('stats', {})
+                record_statement(stats, None if job['result']['success'] else stats.get('error', 'WorkerError'))
+                if job['result']['success']:
+                    result_cache.put(cache_key, job['result'])
+                    job['result']['metadata']['cacheHit'] = False
+                    job['result'] = deduplicated(job['result'], options)
+                close_upload(upload)
+            
+            # Spooled uploads are reopened by path in the worker rather than pickled
+            source = pdf_data if isinstance(pdf_data, bytes) else pdf_data.name
+            job = job_queue.submit(source, extraction, on_done)
+            queued = True
+        
+        response = jsonify(job)
+        response.status_code = 202
+        response.headers['Location'] = f"/jobs/{job['id']}"
+        return response
+        
+    except QueueFull:
+        response = jsonify({
+            'success': False,
+            'error': 'Too many statements are being processed; retry shortly'
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = '5'
+        return response
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+    finally:
+        if not queued:
+            close_upload(pdf_data)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status ("queued", "running", "done" or "failed"), timings and, once
+    finished, the process_pdf result"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown or expired job'
+        }), 404
+    return jsonify(job)
+
+def read_fingerprints():
+    """Fingerprints from the JSON body's "fingerprints" list; raises ValueError
+    with a client-facing message"""
+    data = request.get_json(silent=True) or {}
+    tokens = data.get('fingerprints')
+    if not isinstance(tokens, list):
+        raise ValueError('fingerprints must be a list')
+    return [parse_token(token) for token in tokens]
+
+@app.route('/dedup/<account_id>', methods=['POST', 'DELETE'])
+def dedup_account(account_id):
+    """POST {"fingerprints": [...]} records the dedup fingerprints of rows the
+    client is storing and returns the ones not recorded before ("recorded"),
+    i.e. the rows to store. DELETE {"fingerprints": [...]} drops the given
+    fingerprints again, to undo a failed store"""
+    if dedup_index is None:
+        return jsonify({
+            'success': False,
+            'error': 'Deduplication is disabled; set PDF_DEDUP_DB to enable it'
+        }), 404
+    try:
+        keys = read_fingerprints()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    if request.method == 'POST':
+        recorded = dedup_index.record(account_id, keys)
+        return jsonify({'success': True, 'recorded': [fingerprint_token(key) for key in recorded]})
+    return jsonify({'success': True, 'forgotten': dedup_index.forget(account_id, keys)})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of pipeline, request, cache, job and dedup metrics"""
+    cache = result_cache.stats()
+    jobs = job_queue.stats()
+    dedup = dedup_index.stats() if dedup_index else {'checked': 0, 'duplicates': 0}
+    lines = [
+        *sample_lines('pdf_cache_hits_total', 'Result cache hits (memory and disk)',
+                      cache['hits'] + cache['diskHits'], 'counter'),
+        *sample_lines('pdf_cache_misses_total', 'Result cache misses', cache['misses'], 'counter'),
+        *sample_lines('pdf_cache_bytes', 'Bytes held in the in-memory result cache', cache['bytes']),
+        *sample_lines('pdf_jobs_pending', 'Unfinished background jobs', jobs['pending']),
+        *sample_lines('pdf_jobs_rejected_total', 'Job submissions rejected with a 429',
+                      jobs['rejected'], 'counter'),
+        *sample_lines('pdf_dedup_checked_total', 'Transactions checked against the dedup index',
+                      dedup['checked'], 'counter'),
+        *sample_lines('pdf_dedup_duplicates_total', 'Transactions dropped as already seen for the account',
+                      dedup['duplicates'], 'counter'),
+    ]
+    return Response(REGISTRY.render() + '\n'.join(lines) + '\n',
+                    mimetype='text/plain; version=0.0.4')
+
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'healthy'})
+    return jsonify({'status': 'healthy', 'cache': result_cache.stats(), 'jobs': job_queue.stats(),
+                    'dedup': dedup_index.stats() if dedup_index else None})
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="PDF processing development server")
+    parser.add_argument('--warmup', action='store_true',
+                        help="Import pdfplumber and pandas before serving the first request")
+    if parser.parse_args().warmup:
+        warmup()
     port = int(os.environ.get('PORT', 5001))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,181 @@
+"""
+Table-aware transaction extraction
+Uses pdfplumber word bounding boxes to find the transaction table header once
+per statement, crops later pages to that table's columns, and reads each row
+positionally instead of re-discovering columns with regexes
+"""
+
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from line_classifier import LineClassifier
+from transaction_table import TransactionRow
+
+# Header words identifying each kind of column
+COLUMN_HEADERS = {
+    'date': {'date'},
+    'description': {'description', 'details', 'transaction', 'payee', 'memo'},
+    'withdrawal': {'withdrawal', 'withdrawals', 'debit', 'debits', 'payments', 'charges'},
+    'deposit': {'deposit', 'deposits', 'credit', 'credits'},
+    'amount': {'amount'},
+    'balance': {'balance'},
+}
+MONEY_COLUMNS = ('withdrawal', 'deposit', 'amount', 'balance')
+
+# A money cell: optional sign or parentheses, optional '$', thousands separators, cents
+MONEY_PATTERN = re.compile(r'^(?P<neg>-|\()?\$?(?P<neg2>-)?(?P<value>\d{1,3}(?:,\d{3})*\.\d{2})\)?$')
+
+# Words whose tops differ by less than this many points belong to the same line
+LINE_TOLERANCE = 3
+
+# How a single amount column is signed: negative amounts are withdrawals (bank
+# accounts), or positive amounts are withdrawals (card statements, where charges
+# are positive and payments negative)
+SIGN_CONVENTIONS = ('negative_out', 'positive_out')
+
+class TableLayout:
+    """Column positions of a statement's transaction table"""
+
+    def __init__(self, columns: List[Dict[str, Any]], top: float, left: float,
+                 right: Optional[float] = None, bottom: Optional[float] = None):
+        # Columns sorted by x0, each {'kind', 'x0', 'center'}
+        self.columns = columns
+        # Table region on each page; right and bottom default to the page edges
+        self.top = top
+        self.left = left
+        self.right = right
+        self.bottom = bottom
+        self.text_columns = [column for column in columns if column['kind'] in ('date', 'description')]
+        self.money_columns = [column for column in columns if column['kind'] in MONEY_COLUMNS]
+
+def group_lines(words: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Group words into lines by vertical position, each line sorted left to right"""
+    lines = []
+    for word in sorted(words, key=lambda w: (round(w['top']), w['x0'])):
+        if lines and abs(lines[-1][0]['top'] - word['top']) < LINE_TOLERANCE:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return [sorted(line, key=lambda w: w['x0']) for line in lines]
+
+def lines_text(lines: List[List[Dict[str, Any]]]) -> str:
+    """Page text rebuilt from grouped lines: words joined by spaces, one line each"""
+    return '\n'.join(' '.join(word['text'] for word in line) for line in lines)
+
+def detect_layout(lines: List[List[Dict[str, Any]]]) -> Optional[TableLayout]:
+    """Find a header line with a date column and at least one money column"""
+    for line in lines:
+        columns = []
+        for word in line:
+            text = word['text'].lower().strip(':')
+            for kind, headers in COLUMN_HEADERS.items():
+                if text in headers and not any(column['kind'] == kind for column in columns):
+                    columns.append({'kind': kind, 'x0': word['x0'], 'center': (word['x0'] + word['x1']) / 2})
+                    break
+        kinds = {column['kind'] for column in columns}
+        if 'date' in kinds and kinds & {'withdrawal', 'deposit', 'amount'}:
+            columns.sort(key=lambda column: column['x0'])
+            # Crop from the header line's left edge (including words like "Posting" that
+            # aren't column keywords), with some slack for cells set left of their header
+            left = max(0, line[0]['x0'] - 12)
+            return TableLayout(columns, top=min(word['top'] for word in line) - 1, left=left)
+    return None
+
+class TableExtractor:
+    """Per-statement positional row reader; the layout is detected on the first
+    page that has a table header (unless a known layout is given) and reused
+    (as a crop box) for later pages"""
+
+    def __init__(self, classifier: LineClassifier, parse_date: Callable[[str], Optional[datetime]],
+                 layout: Optional[TableLayout] = None, sign: str = 'negative_out'):
+        self.classifier = classifier
+        self.parse_date = parse_date
+        self.date_regex = re.compile(f'^(?:{classifier.date_pattern})$')
+        self.layout = layout
+        self.sign = sign
+        self.pages_skipped = 0
+        self.lines_scanned = 0
+        self.text_length = 0
+
+    def page_rows(self, page, lines: Optional[List[List[Dict[str, Any]]]] = None) -> Iterator[TransactionRow]:
+        """Transaction rows of one pdfplumber page (none for pages without a table);
+        lines are the page's already grouped words, if they have been read"""
+        if self.layout is None:
+            lines = lines if lines is not None else group_lines(page.extract_words())
+            self.layout = detect_layout(lines)
+            if self.layout is None:
+                self.pages_skipped += 1
+                return
+            lines = [line for line in lines if line[0]['top'] > self.layout.top + LINE_TOLERANCE]
+        elif lines is not None:
+            # Keep the words of the full page that fall inside the table region
+            right = self.layout.right or page.width
+            bottom = self.layout.bottom or page.height
+            lines = [[word for word in line if self.layout.left <= word['x0'] and word['x1'] <= right]
+                     for line in lines if self.layout.top <= line[0]['top'] and line[0]['bottom'] <= bottom]
+            lines = [line for line in lines if line]
+        else:
+            # Only the table's columns, from the header position down, are read
+            region = page.crop((self.layout.left, max(0, self.layout.top),
+                                min(self.layout.right or page.width, page.width),
+                                min(self.layout.bottom or page.height, page.height)))
+            lines = group_lines(region.extract_words())
+
+        found = False
+        self.lines_scanned += len(lines)
+        for line in lines:
+            row = self._parse_row(line)
+            if row:
+                found = True
+                yield row
+        if not found:
+            self.pages_skipped += 1
+
+    def _column_for(self, word: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Money cells go to the nearest money column by center (they're usually right
+        aligned); other words to the last text column starting at or left of them,
+        or the first one for words left of every header (e.g. under "Posting Date")"""
+        if MONEY_PATTERN.match(word['text']) and self.layout.money_columns:
+            center = (word['x0'] + word['x1']) / 2
+            return min(self.layout.money_columns, key=lambda column: abs(column['center'] - center))
+        if not self.layout.text_columns:
+            return None
+        owner = self.layout.text_columns[0]
+        for column in self.layout.text_columns:
+            if column['x0'] <= word['x0'] + 2:
+                owner = column
+        return owner
+
+    def _parse_row(self, line: List[Dict[str, Any]]) -> Optional[TransactionRow]:
+        cells: Dict[str, List[str]] = {}
+        for word in line:
+            self.text_length += len(word['text']) + 1
+            column = self._column_for(word)
+            if column:
+                cells.setdefault(column['kind'], []).append(word['text'])
+
+        date_cell = cells.get('date')
+        if not date_cell or not self.date_regex.match(date_cell[0]):
+            return None
+        date = self.parse_date(date_cell[0])
+        if not date:
+            return None
+        description = ' '.join(date_cell[1:] + cells.get('description', []))
+
+        # Sign comes from the column: withdrawals out, deposits in, or the sign of
+        # a single amount column under the statement's sign convention
+        for kind in ('withdrawal', 'deposit', 'amount'):
+            for text in cells.get(kind, []):
+                money = MONEY_PATTERN.match(text)
+                if not money:
+                    continue
+                amount = float(money.group('value').replace(',', ''))
+                negative = bool(money.group('neg') or money.group('neg2'))
+                if kind == 'amount':
+                    is_withdrawal = negative if self.sign == 'negative_out' else not negative
+                else:
+                    is_withdrawal = kind == 'withdrawal'
+                category = self.classifier.categorize(description)
+                return date, description, amount, is_withdrawal, category
+        return None
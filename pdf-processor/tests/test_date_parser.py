@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from date_parser import StatementDateParser, resolve_dates
+from pdf_processor import BankStatementProcessor
+
+DD_MM_STATEMENT = """\
+05/01/2024 COFFEE SHOP $4.50
+06/01/2024 GROCERIES $52.10
+08/01/2024 PAYROLL DEPOSIT $1,500.00
+11/01/2024 RENT PAYMENT $900.00
+13/01/2024 ELECTRIC BILL $61.00
+05/01/2024 COFFEE SHOP $4.50
+20/01/2024 PHONE BILL $40.00
+"""
+
+def test_dd_mm_statement_is_read_day_first_throughout():
+    rows = list(BankStatementProcessor().iter_rows([DD_MM_STATEMENT]))
+    assert [row[0] for row in rows] == [
+        datetime(2024, 1, 5), datetime(2024, 1, 6), datetime(2024, 1, 8), datetime(2024, 1, 11),
+        datetime(2024, 1, 13), datetime(2024, 1, 5), datetime(2024, 1, 20),
+    ]
+
+def test_sampled_dates_are_redated_once_pinned():
+    parser = StatementDateParser(sample_size=2)
+    dates = ['05/01/2024', '06/01/2024', '13/01/2024', '05/01/2024']
+    rows = resolve_dates(((parser.parse(raw), raw) for raw in dates), parser)
+    assert [row[0] for row in rows] == [datetime(2024, 1, 5), datetime(2024, 1, 6),
+                                        datetime(2024, 1, 13), datetime(2024, 1, 5)]
+    assert parser.pinned_format == '%d/%m/%Y'
+
+def test_ambiguous_short_statement_pins_month_first():
+    parser = StatementDateParser()
+    rows = list(resolve_dates(((parser.parse(raw),) for raw in ['05/01/2024', '06/01/2024']), parser))
+    assert [row[0] for row in rows] == [datetime(2024, 5, 1), datetime(2024, 6, 1)]
+    assert type(rows[0][0]) is datetime
+
+def test_mm_dd_statement_unchanged():
+    parser = StatementDateParser()
+    dates = ['01/05/2024', '01/06/2024', '01/13/2024', '01/20/2024', '01/21/2024', '01/22/2024']
+    rows = list(resolve_dates(((parser.parse(raw),) for raw in dates), parser))
+    assert [row[0].day for row in rows] == [5, 6, 13, 20, 21, 22]
+    assert parser.pinned_format == '%m/%d/%Y'
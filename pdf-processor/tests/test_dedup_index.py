@@ -0,0 +1,95 @@
+import importlib
+
+from dedup_index import DedupIndex, fingerprint_token, fingerprints, parse_token
+
+STATEMENT = b"01/05/2024 COFFEE SHOP $4.50\n01/06/2024 PAYROLL DEPOSIT $1,500.00\n"
+
+def transaction(date, description, amount):
+    return {'date': date, 'description': description, 'amount': amount, 'merchant': description,
+            'category': 'Other'}
+
+TRANSACTIONS = [
+    transaction('2024-01-05', 'COFFEE SHOP', -4.5),
+    transaction('2024-01-05', 'Coffee  shop', -4.5),
+    transaction('2024-01-06', 'PAYROLL DEPOSIT', 1500.0),
+]
+
+def result_of(transactions):
+    return {'success': True, 'transactions': transactions, 'summary': {}}
+
+def test_returned_rows_are_not_seen_until_recorded():
+    index = DedupIndex()
+    first = index.apply('acct', result_of(TRANSACTIONS))
+    assert first['dedup']['new'] == 3
+    # Returned but never stored: a re-upload gets the same rows back
+    again = index.apply('acct', result_of(TRANSACTIONS))
+    assert again['transactions'] == TRANSACTIONS
+
+    keys = [parse_token(token) for token in again['dedup']['fingerprints']]
+    assert index.record('acct', keys) == keys
+    assert index.record('acct', keys) == []
+    after = index.apply('acct', result_of(TRANSACTIONS + [transaction('2024-01-07', 'RENT', -900.0)]))
+    assert [t['description'] for t in after['transactions']] == ['RENT']
+    assert after['dedup']['duplicates'] == 3
+    assert index.apply('other', result_of(TRANSACTIONS))['dedup']['new'] == 3
+
+def test_forget_returns_rows_again():
+    index = DedupIndex()
+    keys = fingerprints(TRANSACTIONS)
+    index.record('acct', keys)
+    assert index.forget('acct', keys[:1]) == 1
+    assert index.forget('unknown', keys) == 0
+    result = index.apply('acct', result_of(TRANSACTIONS))
+    assert result['transactions'] == TRANSACTIONS[:1]
+    assert result['dedup']['fingerprints'] == [fingerprint_token(keys[0])]
+
+def test_identical_same_day_rows_are_kept_apart():
+    index = DedupIndex()
+    coffee = transaction('2024-01-05', 'COFFEE SHOP', -4.5)
+    first = index.apply('acct', result_of([coffee]), record=True)
+    assert first['dedup']['new'] == 1
+    # The statement with both coffees adds only the second one
+    both = index.apply('acct', result_of([coffee, dict(coffee)]))
+    assert both['dedup'] == {**both['dedup'], 'new': 1, 'duplicates': 1}
+
+def test_tokens_round_trip_signed_fingerprints():
+    for key in fingerprints(TRANSACTIONS) + [-1, 0, -(1 << 63), (1 << 63) - 1]:
+        token = fingerprint_token(key)
+        assert len(token) == 16 and parse_token(token) == key
+
+def test_server_records_rows_only_when_the_client_does(monkeypatch, tmp_path):
+    monkeypatch.setenv('PDF_DEDUP_DB', str(tmp_path / 'dedup.sqlite3'))
+    import server
+    server = importlib.reload(server)
+    client = server.app.test_client()
+
+    def upload():
+        response = client.post('/process-pdf?accountId=acct', data=STATEMENT,
+                               content_type='application/octet-stream')
+        return response.get_json()
+
+    first = upload()
+    assert first['dedup']['new'] == 2
+    assert upload()['dedup']['new'] == 2
+
+    response = client.post('/dedup/acct', json={'fingerprints': first['dedup']['fingerprints']})
+    assert response.get_json()['recorded'] == first['dedup']['fingerprints']
+    assert upload()['dedup']['new'] == 0
+    assert client.post('/dedup/acct', json={'fingerprints': ['xyz']}).status_code == 400
+
+    response = client.delete('/dedup/acct', json={'fingerprints': first['dedup']['fingerprints'][:1]})
+    assert response.get_json()['forgotten'] == 1
+    assert upload()['dedup']['new'] == 1
+    # Resetting the whole account is not exposed
+    assert client.delete('/dedup/acct').status_code == 400
+
+def test_server_ignores_account_without_a_dedup_db(monkeypatch):
+    monkeypatch.delenv('PDF_DEDUP_DB', raising=False)
+    import server
+    server = importlib.reload(server)
+    client = server.app.test_client()
+
+    result = client.post('/process-pdf?accountId=acct', data=STATEMENT,
+                         content_type='application/octet-stream').get_json()
+    assert 'dedup' not in result and len(result['transactions']) == 2
+    assert client.post('/dedup/acct', json={'fingerprints': []}).status_code == 404
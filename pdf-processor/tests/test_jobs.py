@@ -0,0 +1,111 @@
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+from jobs import JobQueue, QueueFull
+
+STATEMENT = b"01/05/2024 COFFEE SHOP $4.50\n01/06/2024 PAYROLL DEPOSIT $1,500.00\n"
+
+def wait_for(queue, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+def test_submit_recovers_after_a_worker_is_killed():
+    queue = JobQueue(workers=1, max_pending=2)
+    try:
+        assert wait_for(queue, queue.submit(STATEMENT)['id'])['status'] == 'done'
+
+        for pid in list(queue.executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        deadline = time.time() + 10
+        while not queue.executor._broken and time.time() < deadline:
+            time.sleep(0.05)
+        assert queue.executor._broken
+
+        job = wait_for(queue, queue.submit(STATEMENT)['id'])
+        assert job['status'] == 'done'
+        assert len(job['result']['transactions']) == 2
+        stats = queue.stats()
+        assert stats['pending'] == 0
+        assert stats['poolRestarts'] == 1
+        assert stats['tracked'] == 2
+    finally:
+        queue.shutdown()
+
+def test_failed_submit_leaves_no_pending_slot_or_queued_row():
+    queue = JobQueue(workers=1, max_pending=1)
+
+    def broken(source, extraction):
+        raise RuntimeError("pool unavailable")
+
+    queue._submit = broken
+    try:
+        for _ in range(3):
+            try:
+                queue.submit(STATEMENT)
+            except RuntimeError:
+                pass
+        stats = queue.stats()
+        assert stats['pending'] == 0
+        assert stats['tracked'] == 0
+    finally:
+        queue.shutdown()
+
+def test_failed_save_starts_no_work():
+    queue = JobQueue(workers=1, max_pending=1)
+    started = []
+
+    def locked(job):
+        raise sqlite3.OperationalError("database is locked")
+
+    queue._save = locked
+    queue._submit = lambda source, extraction: started.append(source)
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            queue.submit(STATEMENT)
+        assert started == []
+        assert queue.stats()['pending'] == 0
+    finally:
+        queue.shutdown()
+
+def insert_unfinished(db_path, job_id, owner):
+    db = sqlite3.connect(db_path)
+    db.execute('CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, '
+               'submitted_at REAL NOT NULL, started_at REAL, finished_at REAL, result TEXT, owner INTEGER)')
+    db.execute("INSERT INTO jobs (id, status, submitted_at, owner) VALUES (?, 'queued', ?, ?)",
+               (job_id, time.time(), owner))
+    db.commit()
+    db.close()
+
+def test_jobs_of_an_exited_process_are_failed(tmp_path):
+    db_path = str(tmp_path / 'jobs.sqlite3')
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    insert_unfinished(db_path, 'orphan', exited.pid)
+
+    queue = JobQueue(workers=1, db_path=db_path)
+    job = queue.get('orphan')
+    assert job['status'] == 'failed'
+    assert job['result']['success'] is False
+    assert 'finishedAt' in job
+
+def test_pending_limit_counts_other_processes_jobs(tmp_path):
+    db_path = str(tmp_path / 'jobs.sqlite3')
+    # Unfinished job of a live process (this one, standing in for another web worker)
+    insert_unfinished(db_path, 'elsewhere', os.getpid())
+
+    queue = JobQueue(workers=1, max_pending=1, db_path=db_path)
+    with pytest.raises(QueueFull):
+        queue.submit(STATEMENT)
+    assert queue.get('elsewhere')['status'] == 'queued'
+    assert queue.stats()['rejected'] == 1
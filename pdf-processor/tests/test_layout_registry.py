@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from benchmarks.synthetic import LAYOUTS, layout_statement
+from layout_registry import LayoutProfile, LayoutRegistry, load_registry
+from pdf_processor import BankStatementProcessor
+
+SAMPLE_LAYOUTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'benchmarks', 'layouts.json')
+
+# Same producer and header as the synthetic statements, columns nowhere near theirs
+MISS = LayoutRegistry([LayoutProfile({
+    'name': 'elsewhere', 'producer': 'acme statement engine', 'headerText': ['^acme bank'],
+    'columns': {'date': [300, 320], 'amount': [500, 530]}
+})])
+
+@pytest.mark.parametrize('extraction', ['text', 'table'])
+@pytest.mark.parametrize('layout', LAYOUTS)
+def test_registry_miss_matches_plain_processing(layout, extraction):
+    pdf_data, _ = layout_statement(layout, 3)
+    plain = BankStatementProcessor().process_pdf(pdf_data, extraction=extraction)
+    missed = BankStatementProcessor(layouts=MISS).process_pdf(pdf_data, extraction=extraction)
+
+    assert 'layout' not in missed['metadata']
+    assert missed['transactions'] == plain['transactions']
+    assert missed['summary'] == plain['summary']
+
+def test_registry_hit_reads_every_transaction():
+    registry = load_registry(SAMPLE_LAYOUTS)
+    for layout in LAYOUTS:
+        pdf_data, truth = layout_statement(layout, 3)
+        result = BankStatementProcessor(layouts=registry).process_pdf(pdf_data, extraction='table')
+        assert result['metadata']['layout']
+        assert len(result['transactions']) == len(truth)
+
+def test_no_registry_without_a_configured_file(monkeypatch):
+    monkeypatch.delenv('PDF_LAYOUTS_FILE', raising=False)
+    assert len(load_registry()) == 0
@@ -0,0 +1,139 @@
+"""
+Columnar transaction table
+Parsed rows are collected into NumPy columns so signs, transaction types and
+summaries (totals, categories, per-month and per-merchant) are computed with
+vectorized operations instead of passes over a list of dicts. NumPy and pandas
+are imported when the first table is built, not when this module is imported
+"""
+
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Parsed line before sign assignment: (date, description, amount, is_withdrawal, category)
+TransactionRow = Tuple[datetime, str, float, bool, str]
+
+# Proleptic ordinal of 1970-01-01, for turning date.toordinal() into datetime64[D]
+EPOCH_ORDINAL = 719163
+
+class TransactionTable:
+    """Transactions of one statement as a DataFrame with one column per field"""
+
+    def __init__(self, frame: 'pd.DataFrame'):
+        self.frame = frame
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[TransactionRow]) -> 'TransactionTable':
+        """Build the table from parser rows, assigning signs and types in bulk"""
+        import numpy as np
+        import pandas as pd
+        
+        ordinals, descriptions, amounts, withdrawals, categories = [], [], [], [], []
+        for date, description, amount, is_withdrawal, category in rows:
+            ordinals.append(date.toordinal())
+            descriptions.append(description)
+            amounts.append(amount)
+            withdrawals.append(is_withdrawal)
+            categories.append(category)
+
+        amounts = np.abs(np.array(amounts, dtype=np.float64))
+        # Money going out = negative, money coming in = positive
+        amounts = np.where(np.array(withdrawals, dtype=bool), -amounts, amounts)
+        dates = (np.array(ordinals, dtype=np.int64) - EPOCH_ORDINAL).astype('datetime64[D]')
+        # Categories keep first-appearance order, like the dict-based summary
+        category_codes, category_names = pd.factorize(np.array(categories, dtype=object))
+        return cls(pd.DataFrame({
+            'date': dates,
+            'description': np.array(descriptions, dtype=object),
+            'amount': amounts,
+            'category': pd.Categorical.from_codes(category_codes, category_names),
+            'transactionType': np.where(amounts < 0, 'debit', 'credit').astype(object),
+        }))
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Transactions in the process_pdf response format"""
+        import numpy as np
+        
+        frame = self.frame
+        dates = np.datetime_as_string(frame['date'].to_numpy().astype('datetime64[D]'), unit='D').tolist()
+        descriptions = frame['description'].tolist()
+        return [
+            {
+                'date': date,
+                'description': description,
+                'amount': amount,
+                'merchant': description,
+                'category': category,
+                'transactionType': transaction_type
+            }
+            for date, description, amount, category, transaction_type in zip(
+                dates, descriptions, frame['amount'].tolist(),
+                frame['category'].astype(object).tolist(), frame['transactionType'].tolist()
+            )
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        """Statement summary, matching StatementSummary.to_dict()
+
+        Every group-by is a np.bincount over integer codes (category codes,
+        months since epoch, factorized merchants) weighted by the same
+        income/expense/magnitude columns.
+        """
+        import numpy as np
+        import pandas as pd
+        
+        frame = self.frame
+        amounts = frame['amount'].to_numpy()
+        magnitudes = np.abs(amounts)
+        income = np.where(amounts > 0, amounts, 0.0)
+        expenses = np.where(amounts < 0, magnitudes, 0.0)
+        total_income = float(income.sum())
+        total_expenses = float(expenses.sum())
+
+        category = frame['category'].array
+        category_totals = np.bincount(category.codes, weights=magnitudes, minlength=len(category.categories))
+        categories = {str(name): float(total) for name, total in zip(category.categories, category_totals)}
+
+        monthly_totals = []
+        if len(frame):
+            months = frame['date'].to_numpy().astype('datetime64[M]').astype(np.int64)
+            first_month = months.min()
+            month_codes = months - first_month
+            month_income = np.bincount(month_codes, weights=income)
+            month_expenses = np.bincount(month_codes, weights=expenses)
+            month_counts = np.bincount(month_codes)
+            for offset in np.flatnonzero(month_counts):
+                month = np.datetime_as_string(np.datetime64(int(first_month + offset), 'M'))
+                monthly_totals.append({
+                    'month': month,
+                    'income': float(month_income[offset]),
+                    'expenses': float(month_expenses[offset]),
+                    'netFlow': float(month_income[offset] - month_expenses[offset])
+                })
+
+        merchant_codes, merchant_names = pd.factorize(frame['description'].to_numpy())
+        merchant_totals_by_code = np.bincount(merchant_codes, weights=magnitudes, minlength=len(merchant_names))
+        merchant_counts = np.bincount(merchant_codes, minlength=len(merchant_names))
+        # Largest first; stable so ties keep first-appearance order
+        merchant_totals = [
+            {'merchant': merchant_names[code], 'totalAmount': float(merchant_totals_by_code[code]),
+             'count': int(merchant_counts[code])}
+            for code in np.argsort(-merchant_totals_by_code, kind='stable')
+            if merchant_names[code]
+        ]
+
+        return {
+            'totalTransactions': len(frame),
+            'totalIncome': total_income,
+            'totalExpenses': total_expenses,
+            'netFlow': total_income - total_expenses,
+            'uniqueMerchants': len(merchant_totals),
+            'categories': categories,
+            'monthlyTotals': monthly_totals,
+            'merchantTotals': merchant_totals
+        }
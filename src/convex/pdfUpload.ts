@@ -3,6 +3,86 @@ import { v } from "convex/values";
 import { api } from "./_generated/api";
 
 
+// PDF processing service (exposed via ngrok)
+const PDF_SERVICE_URL = 'https://28f179779a74.ngrok-free.app';
+const PDF_SERVICE_HEADERS = {
+  'Content-Type': 'application/json',
+  'ngrok-skip-browser-warning': 'true',
+};
+// How often to poll a queued job, and how long to wait for it in total
+const JOB_POLL_INTERVAL_MS = 1000;
+const JOB_TIMEOUT_MS = 5 * 60 * 1000;
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Queue the statement on the PDF service and poll until the job finishes,
+// waiting and resubmitting while the service's queue is full (429). With an
+// accountId the result holds only transactions not yet stored for it.
+// Not /process-pdf/stream: the page reviews the whole result before saving,
+// so rows arriving early would not reach the user sooner, and the stream has
+// neither the queue's backpressure nor accountId dedup
+async function runPdfJob(pdfData: string, fileName: string, accountId?: string): Promise<any> {
+  const deadline = Date.now() + JOB_TIMEOUT_MS;
+
+  let job: any;
+  while (!job) {
+    const response = await fetch(`${PDF_SERVICE_URL}/jobs`, {
+      method: 'POST',
+      headers: PDF_SERVICE_HEADERS,
+      body: JSON.stringify({ pdfData, fileName, accountId }),
+    });
+    if (response.status === 429 && Date.now() < deadline) {
+      const retryAfter = Number(response.headers.get('Retry-After')) || 5;
+      await sleep(retryAfter * 1000);
+      continue;
+    }
+    if (!response.ok) {
+      throw new Error(`PDF service returned ${response.status}`);
+    }
+    job = await response.json();
+  }
+
+  while (job.status === 'queued' || job.status === 'running') {
+    if (Date.now() > deadline) {
+      throw new Error('Timed out waiting for the PDF to be processed');
+    }
+    await sleep(JOB_POLL_INTERVAL_MS);
+    const response = await fetch(`${PDF_SERVICE_URL}/jobs/${job.id}`, {
+      headers: PDF_SERVICE_HEADERS,
+    });
+    if (!response.ok) {
+      throw new Error(`PDF service returned ${response.status}`);
+    }
+    job = await response.json();
+  }
+
+  return job.result;
+}
+
+// Record the dedup fingerprints of transactions about to be stored, returning
+// the ones not recorded before (another upload may have stored the rest)
+async function recordFingerprints(accountId: string, fingerprints: string[]): Promise<string[]> {
+  const response = await fetch(`${PDF_SERVICE_URL}/dedup/${encodeURIComponent(accountId)}`, {
+    method: 'POST',
+    headers: PDF_SERVICE_HEADERS,
+    body: JSON.stringify({ fingerprints }),
+  });
+  if (!response.ok) {
+    throw new Error(`PDF service returned ${response.status}`);
+  }
+  return (await response.json()).recorded;
+}
+
+// Undo recordFingerprints when storing the transactions failed, so a
+// re-upload returns them again
+async function forgetFingerprints(accountId: string, fingerprints: string[]): Promise<void> {
+  await fetch(`${PDF_SERVICE_URL}/dedup/${encodeURIComponent(accountId)}`, {
+    method: 'DELETE',
+    headers: PDF_SERVICE_HEADERS,
+    body: JSON.stringify({ fingerprints }),
+  });
+}
+
 export const processPDFUpload = action({
   args: {
     pdfData: v.string(), // Base64 encoded PDF data
@@ -10,25 +90,15 @@ export const processPDFUpload = action({
   },
   handler: async (ctx, args) => {
     try {
-      // Call the PDF processing service via ngrok
-      const response = await fetch('https://28f179779a74.ngrok-free.app/process-pdf', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'ngrok-skip-browser-warning': 'true',
-        },
-        body: JSON.stringify({
-          pdfData: args.pdfData,
-          fileName: args.fileName
-        })
-      });
-
-      if (!response.ok) {
-        throw new Error(`PDF service returned ${response.status}`);
+      // Process the PDF as a background job on the PDF service; transactions
+      // already stored for the user (overlapping statements) are left out
+      const user = await ctx.runQuery(api.users.currentUser);
+      const result = await runPdfJob(args.pdfData, args.fileName, user?._id);
+      
+      if (result.success && result.dedup && result.dedup.parsed > 0 && result.transactions.length === 0) {
+        throw new Error('All transactions in this statement have already been imported.');
       }
 
-      const result = await response.json();
-      
       // Check if any transactions were extracted
       if (!result.success || !result.transactions || result.transactions.length === 0) {
         throw new Error('No transactions could be extracted from the PDF. The PDF may be scanned or not contain readable text.');
@@ -74,21 +144,35 @@ export const saveExtractedTransactions = action({
       transactionType: v.union(v.literal("debit"), v.literal("credit")),
     })),
     fileName: v.string(),
+    // The PDF service's dedup fingerprints, one per transaction
+    fingerprints: v.optional(v.array(v.string())),
   },
   handler: async (ctx, args): Promise<{ success: boolean; savedCount: number; transactionIds: string[] }> => {
     const user = await ctx.runQuery(api.users.currentUser);
     if (!user) throw new Error("Not authenticated");
 
+    // Claim the rows with the PDF service before storing them, keeping only
+    // the ones no other upload has stored; rows that fail to store are
+    // released again. claimed[i] is the fingerprint of transactions[i]
+    let transactions = args.transactions;
+    let claimed: string[] = [];
+    if (args.fingerprints && args.fingerprints.length === args.transactions.length) {
+      const fingerprints = args.fingerprints;
+      const fresh = new Set(await recordFingerprints(user._id, fingerprints));
+      const kept = transactions.map((_, index) => index).filter((index) => fresh.has(fingerprints[index]));
+      transactions = kept.map((index) => args.transactions[index]);
+      claimed = kept.map((index) => fingerprints[index]);
+    }
+    const savedTransactions: string[] = [];
+
     try {
       // Create a bank statement record using a mutation
       const statementId = await ctx.runMutation(api.pdfUpload.createBankStatement, {
         fileName: args.fileName,
-        totalTransactions: args.transactions.length,
+        totalTransactions: transactions.length,
       });
 
-      const savedTransactions: string[] = [];
-      
-      for (const transaction of args.transactions) {
+      for (const transaction of transactions) {
         const transactionId: string = await ctx.runMutation(api.transactions.addTransaction, {
           statementId: statementId as any,
           date: transaction.date,
@@ -110,6 +194,12 @@ export const saveExtractedTransactions = action({
       
     } catch (error) {
       console.error('Error saving transactions:', error);
+      // Rows are stored in order, so the ones past savedTransactions were not
+      const unsaved = claimed.slice(savedTransactions.length);
+      if (unsaved.length > 0) {
+        await forgetFingerprints(user._id, unsaved).catch((forgetError) =>
+          console.error('Error releasing dedup fingerprints:', forgetError));
+      }
       throw new Error(`Failed to save transactions: ${error instanceof Error ? error.message : 'Unknown error'}`);
     }
   },
@@ -31,6 +31,13 @@ interface ProcessingResult {
     uniqueMerchants: number;
     categories: Record<string, number>;
   };
+  // Present when the PDF service left out transactions already imported
+  dedup?: {
+    parsed: number;
+    new: number;
+    duplicates: number;
+    fingerprints: string[];
+  };
   error?: string;
 }
 
@@ -152,6 +159,7 @@ export default function Upload() {
       const result = await saveTransactions({
         transactions: processingResult.transactions,
         fileName: file?.name || 'unknown.pdf',
+        fingerprints: processingResult.dedup?.fingerprints,
       });
 
       setSaveResult({